@@ -6,14 +6,26 @@ This is the main application file for the Agent Angus Core Service.
 It provides a REST API for interacting with the Agent Angus functionality.
 """
 import os
-import json
+import sys
+import math
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
 
-from flask import Flask, request, jsonify
+import requests
+from flask import Flask, Response, request, stream_with_context
 from dotenv import load_dotenv
 
-from coral_client import CoralProtocolClient
+# Modules shared by both services, such as tracing, are in the repository's
+# shared/ directory; the Docker images copy them next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+
+import metrics
+import tracing
+from fast_json import get_json, jsonify
+from health import HealthChecker, tcp_check
+from coral_client import IDEMPOTENCY_REJECTION_REASON, NDJSON_MEDIA_TYPE, CoralProtocolClient, CoralServiceUnavailable
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,9 +36,174 @@ load_dotenv()
 
 # Create Flask app
 app = Flask(__name__)
+metrics.init_app(app)
+tracing.init_app(app, "angus-core")
+
+# Coral Protocol Client, created once per process
+coral_client = None
+
+def init_coral_client() -> CoralProtocolClient:
+    """
+    Create this process's Coral Protocol Client.
+    
+    Called at import time and again by gunicorn's post_fork hook when the app
+    is preloaded, so every worker gets its own connection pool.
+    """
+    global coral_client
+    coral_client = CoralProtocolClient(os.getenv("CORAL_SERVICE_URL", "http://coral-service:8001"))
+    return coral_client
+
+init_coral_client()
+
+# Cached readiness of the Coral Protocol Service, connection pool and database
+health = HealthChecker()
+
+def check_coral_service() -> Dict[str, Any]:
+    """Check the Coral Protocol Service answers and report the connection pool."""
+    coral_client.live(timeout=health.timeout)
+    return {"pool": coral_client.pool_stats()}
+
+health.add("coral_service", check_coral_service)
+if os.getenv("DB_HOST"):
+    health.add("postgres", tcp_check(os.getenv("DB_HOST"), int(os.getenv("DB_PORT", "5432")), health.timeout), critical=False)
+health.ensure_started()
+
+# Relay /coral/* requests to the Coral Protocol Service unparsed and return its responses as-is
+PROXY_MODE = os.getenv("ANGUS_CORAL_PROXY_MODE", "false").lower() == "true"
+PROXY_REQUEST_HEADERS = ("Content-Type", "Content-Encoding", "Accept", "Accept-Encoding", "If-None-Match", "Idempotency-Key")
+PROXY_RESPONSE_HEADERS = (
+    "Content-Type", "Content-Length", "Content-Encoding", "Accept-Encoding", "Vary",
+    "ETag", "Cache-Control", "Retry-After", "X-Next-Cursor", "Idempotent-Replayed"
+)
+PROXY_CHUNK_SIZE = 64 * 1024
+
+# Relayed GET responses with an ETag, revalidated with If-None-Match instead of downloaded again
+PROXY_CACHE_SIZE = int(os.getenv("ANGUS_PROXY_CACHE_SIZE", "32"))
+PROXY_CACHE_MAX_BODY = int(os.getenv("ANGUS_PROXY_CACHE_MAX_BODY", str(1024 * 1024)))
+proxy_cache: "OrderedDict[str, Tuple[str, bytes, Dict[str, str]]]" = OrderedDict()
+proxy_cache_lock = threading.Lock()
+
+def proxy(method: str, path: str, operation: Optional[str] = None) -> Response:
+    """
+    Forward the current request's body and query string to the Coral Protocol
+    Service and relay its status, headers and body back without decoding them.
+    
+    Args:
+        method: HTTP method
+        path: Path on the Coral Protocol Service
+        operation: Metrics label for the request, defaults to the path
+        
+    Returns:
+        Response: The service's response
+    """
+    query = request.query_string.decode("latin-1")
+    headers = {name: request.headers[name] for name in PROXY_REQUEST_HEADERS if name in request.headers}
+    key = cached = None
+    if method == "GET" and PROXY_CACHE_SIZE > 0 and "If-None-Match" not in headers:
+        key = f"{path}?{query}|{headers.get('Accept', '')}|{headers.get('Accept-Encoding', '')}"
+        with proxy_cache_lock:
+            cached = proxy_cache.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+            
+    upstream = coral_client.forward(
+        method,
+        path,
+        body=request.get_data(cache=True) if method == "POST" else None,
+        query=query,
+        headers=headers,
+        operation=operation
+    )
+    if cached is not None and upstream.status_code == 304:
+        upstream.close()
+        return Response(cached[1], status=200, headers=cached[2])
+        
+    response_headers = {name: upstream.headers[name] for name in PROXY_RESPONSE_HEADERS if name in upstream.headers}
+    cacheable = key is not None and upstream.status_code == 200 and "ETag" in upstream.headers
+    length = upstream.headers.get("Content-Length")
+    if length is not None and int(length) <= (PROXY_CACHE_MAX_BODY if cacheable else PROXY_CHUNK_SIZE):
+        with upstream:
+            body = upstream.raw.read(decode_content=False)
+        if cacheable:
+            with proxy_cache_lock:
+                proxy_cache[key] = (upstream.headers["ETag"], body, response_headers)
+                proxy_cache.move_to_end(key)
+                while len(proxy_cache) > PROXY_CACHE_SIZE:
+                    proxy_cache.popitem(last=False)
+        return Response(body, status=upstream.status_code, headers=response_headers)
+        
+    def stream():
+        with upstream:
+            yield from upstream.raw.stream(PROXY_CHUNK_SIZE, decode_content=False)
+            
+    return Response(stream(), status=upstream.status_code, headers=response_headers)
+
+def proxy_unvalidated(method: str, path: str, failure: str) -> Response:
+    """
+    Relay a request whose body angus-core doesn't decode in proxy mode.
+    
+    The Coral Protocol Service validates the same required fields and answers
+    a missing one with 422, so the body is forwarded without being parsed here.
+    
+    Args:
+        method: HTTP method
+        path: Path on the Coral Protocol Service
+        failure: Start of the error message if the service can't be reached
+        
+    Returns:
+        Response: The service's response, or the error
+    """
+    try:
+        return proxy(method, path)
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"{failure}: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"{failure}: {str(e)}"
+        }), 500
 
-# Create Coral Protocol Client
-coral_client = CoralProtocolClient(os.getenv("CORAL_SERVICE_URL", "http://coral-service:8001"))
+def service_unavailable(e: CoralServiceUnavailable):
+    """Pass a load-shedding 503 from the Coral Protocol Service through with its Retry-After."""
+    logger.warning(str(e))
+    response = jsonify({
+        "status": "error",
+        "message": str(e)
+    })
+    response.status_code = 503
+    if e.retry_after is not None:
+        response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+    return response
+
+def idempotency_rejected(e: requests.HTTPError):
+    """
+    Pass the Coral Protocol Service's rejection of an Idempotency-Key through.
+    
+    Only errors whose body carries the service's idempotency rejection reason
+    are passed through; other 400/409/422 responses are upstream failures.
+    
+    Returns:
+        The response to send, or None if the error is not about the key
+    """
+    response = e.response
+    if response is None or response.status_code not in (400, 409, 422):
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict) or body.get("reason") != IDEMPOTENCY_REJECTION_REASON:
+        return None
+    message = body.get("message") or response.text
+    result = jsonify({
+        "status": "error",
+        "message": message
+    })
+    result.status_code = response.status_code
+    if "Retry-After" in response.headers:
+        result.headers["Retry-After"] = response.headers["Retry-After"]
+    return result
 
 @app.route("/")
 def health_check():
@@ -36,6 +213,17 @@ def health_check():
         "message": "Agent Angus Core Service is running"
     })
 
+@app.route("/live", methods=["GET"])
+def live():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe answered from the cached background dependency checks."""
+    health.ensure_started()
+    return jsonify(health.report()), 200 if health.ready else 503
+
 @app.route("/coral/health", methods=["GET"])
 def coral_health():
     """Check if the Coral Protocol Service is running."""
@@ -55,7 +243,9 @@ def coral_health():
 @app.route("/coral/register", methods=["POST"])
 def register_agent():
     """Register an agent with the Coral Protocol."""
-    data = request.json
+    if PROXY_MODE:
+        return proxy_unvalidated("POST", "/agents/register", "Failed to register agent")
+    data = get_json()
     agent_name = data.get("agent_name")
     capabilities = data.get("capabilities", [])
     
@@ -71,6 +261,8 @@ def register_agent():
             "status": "success",
             "result": result
         })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
         logger.error(f"Failed to register agent: {str(e)}")
         return jsonify({
@@ -81,10 +273,13 @@ def register_agent():
 @app.route("/coral/send_message", methods=["POST"])
 def send_message():
     """Send a message to another agent."""
-    data = request.json
+    if PROXY_MODE:
+        return proxy_unvalidated("POST", "/messages/send", "Failed to send message")
+    data = get_json()
     recipient = data.get("recipient")
     content = data.get("content")
     thread_id = data.get("thread_id")
+    delivery = data.get("delivery", "sync")
     
     if not recipient:
         return jsonify({
@@ -98,12 +293,31 @@ def send_message():
             "message": "Missing required parameter: content"
         }), 400
         
+    if delivery not in ("sync", "queued"):
+        return jsonify({
+            "status": "error",
+            "message": "Invalid parameter: delivery must be 'sync' or 'queued'"
+        }), 400
+        
     try:
-        result = coral_client.send_message(recipient, content, thread_id)
+        result = coral_client.send_message(
+            recipient, content, thread_id, delivery, request.headers.get("Idempotency-Key"), data.get("sender")
+        )
         return jsonify({
             "status": "success",
             "result": result
         })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except requests.HTTPError as e:
+        rejected = idempotency_rejected(e)
+        if rejected is not None:
+            return rejected
+        logger.error(f"Failed to send message: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to send message: {str(e)}"
+        }), 500
     except Exception as e:
         logger.error(f"Failed to send message: {str(e)}")
         return jsonify({
@@ -111,17 +325,123 @@ def send_message():
             "message": f"Failed to send message: {str(e)}"
         }), 500
 
+@app.route("/coral/message_status/<message_id>", methods=["GET"])
+def message_status(message_id):
+    """Get the delivery status of a queued message."""
+    try:
+        if PROXY_MODE:
+            return proxy("GET", f"/messages/status/{message_id}", operation="/messages/status/{message_id}")
+        result = coral_client.get_message_status(message_id)
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to get message status: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to get message status: {str(e)}"
+        }), 500
+
+@app.route("/coral/register_batch", methods=["POST"])
+def register_agents_batch():
+    """Register several agents with the Coral Protocol."""
+    if PROXY_MODE:
+        return proxy_unvalidated("POST", "/agents/register_batch", "Failed to register agents")
+    data = get_json()
+    agents = data.get("agents")
+    
+    if not agents or not isinstance(agents, list):
+        return jsonify({
+            "status": "error",
+            "message": "Missing required parameter: agents"
+        }), 400
+        
+    if any(not isinstance(agent, dict) or not agent.get("agent_name") for agent in agents):
+        return jsonify({
+            "status": "error",
+            "message": "Every agent requires an agent_name"
+        }), 400
+        
+    try:
+        result = coral_client.register_agents(agents)
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to register agents: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to register agents: {str(e)}"
+        }), 500
+
+@app.route("/coral/send_batch", methods=["POST"])
+def send_messages_batch():
+    """Send several messages to other agents."""
+    if PROXY_MODE:
+        return proxy_unvalidated("POST", "/messages/send_batch", "Failed to send messages")
+    data = get_json()
+    messages = data.get("messages")
+    
+    if not messages or not isinstance(messages, list):
+        return jsonify({
+            "status": "error",
+            "message": "Missing required parameter: messages"
+        }), 400
+        
+    if any(not isinstance(message, dict) or not message.get("recipient") or not message.get("content") for message in messages):
+        return jsonify({
+            "status": "error",
+            "message": "Every message requires a recipient and content"
+        }), 400
+        
+    try:
+        result = coral_client.send_messages(messages)
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to send messages: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to send messages: {str(e)}"
+        }), 500
+
 @app.route("/coral/list_agents", methods=["GET"])
 def list_agents():
-    """List available agents registered with the Coral Protocol."""
+    """
+    List available agents registered with the Coral Protocol.
+    
+    Pass limit/cursor to get one page at a time. A client accepting
+    application/x-ndjson gets the list relayed from the Coral Protocol
+    Service chunk by chunk, one agent per line.
+    """
     include_details = request.args.get("include_details", "true").lower() == "true"
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
     
     try:
-        result = coral_client.list_agents(include_details)
+        if PROXY_MODE:
+            return proxy("GET", "/agents/list")
+        if NDJSON_MEDIA_TYPE in request.headers.get("Accept", ""):
+            chunks, next_cursor = coral_client.stream_agents(include_details, limit=limit, cursor=cursor)
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            return Response(stream_with_context(chunks), mimetype=NDJSON_MEDIA_TYPE, headers=headers)
+        result = coral_client.list_agents(include_details, limit=limit, cursor=cursor)
         return jsonify({
             "status": "success",
             "result": result
         })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
         logger.error(f"Failed to list agents: {str(e)}")
         return jsonify({
@@ -129,12 +449,49 @@ def list_agents():
             "message": f"Failed to list agents: {str(e)}"
         }), 500
 
+@app.route("/coral/find_agents", methods=["GET"])
+def find_agents():
+    """Find agents by capability."""
+    capabilities = request.args.getlist("capability")
+    
+    if not capabilities:
+        return jsonify({
+            "status": "error",
+            "message": "Missing required parameter: capability"
+        }), 400
+        
+    try:
+        if PROXY_MODE:
+            return proxy("GET", "/agents/search")
+        result = coral_client.find_agents(
+            capabilities,
+            match=request.args.get("match", "all"),
+            limit=request.args.get("limit", 100, type=int),
+            cursor=request.args.get("cursor"),
+            include_details=request.args.get("include_details", "false").lower() == "true"
+        )
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to find agents: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to find agents: {str(e)}"
+        }), 500
+
 @app.route("/coral/create_thread", methods=["POST"])
 def create_thread():
     """Create a new thread with participants."""
-    data = request.json
+    if PROXY_MODE:
+        return proxy_unvalidated("POST", "/threads/create", "Failed to create thread")
+    data = get_json()
     participants = data.get("participants")
     initial_message = data.get("initial_message")
+    delivery = data.get("delivery", "sync")
     
     if not participants:
         return jsonify({
@@ -142,12 +499,30 @@ def create_thread():
             "message": "Missing required parameter: participants"
         }), 400
         
+    if delivery not in ("sync", "background"):
+        return jsonify({
+            "status": "error",
+            "message": "Invalid parameter: delivery must be 'sync' or 'background'"
+        }), 400
+        
     try:
-        result = coral_client.create_thread(participants, initial_message)
+        result = coral_client.create_thread(participants, initial_message, delivery, request.headers.get("Idempotency-Key"))
+        # The thread exists even if its initial message missed some participants
         return jsonify({
             "status": "success",
             "result": result
-        })
+        }), 207 if result.get("status") == "partial" else 200
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except requests.HTTPError as e:
+        rejected = idempotency_rejected(e)
+        if rejected is not None:
+            return rejected
+        logger.error(f"Failed to create thread: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to create thread: {str(e)}"
+        }), 500
     except Exception as e:
         logger.error(f"Failed to create thread: {str(e)}")
         return jsonify({
@@ -155,6 +530,78 @@ def create_thread():
             "message": f"Failed to create thread: {str(e)}"
         }), 500
 
+@app.route("/coral/thread_delivery/<thread_id>", methods=["GET"])
+def thread_delivery(thread_id):
+    """Get the delivery status of a thread's initial message."""
+    try:
+        if PROXY_MODE:
+            return proxy("GET", f"/threads/{thread_id}/delivery", operation="/threads/{thread_id}/delivery")
+        result = coral_client.get_thread_delivery(thread_id)
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to get thread delivery status: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to get thread delivery status: {str(e)}"
+        }), 500
+
+@app.route("/coral/threads/<thread_id>", methods=["GET"])
+def get_thread(thread_id):
+    """Look up a thread by ID."""
+    try:
+        if PROXY_MODE:
+            return proxy("GET", f"/threads/{thread_id}", operation="/threads/{thread_id}")
+        result = coral_client.get_thread(thread_id)
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to get thread: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to get thread: {str(e)}"
+        }), 500
+
+@app.route("/coral/threads", methods=["GET"])
+def find_threads():
+    """List the threads an agent participates in."""
+    participant = request.args.get("participant")
+    
+    if not participant:
+        return jsonify({
+            "status": "error",
+            "message": "Missing required parameter: participant"
+        }), 400
+        
+    try:
+        if PROXY_MODE:
+            return proxy("GET", "/threads")
+        result = coral_client.find_threads(
+            participant,
+            limit=request.args.get("limit", 100, type=int),
+            cursor=request.args.get("cursor")
+        )
+        return jsonify({
+            "status": "success",
+            "result": result
+        })
+    except CoralServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to find threads: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Failed to find threads: {str(e)}"
+        }), 500
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     app.run(host="0.0.0.0", port=port)
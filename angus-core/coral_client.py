@@ -7,13 +7,54 @@ It allows the Agent Angus Core Service to communicate with the Coral Protocol
 without directly depending on the langchain-mcp-adapters package.
 """
 import os
+import sys
 import json
+import gzip
+import time
+import uuid
+import random
+import socket
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import functools
+import contextlib
+from typing import AsyncIterator, Dict, Iterator, List, Any, Optional, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ACCEPT_ENCODING
 from dotenv import load_dotenv
 
+# Modules shared by both services, such as tracing, are in the repository's
+# shared/ directory; the Docker images copy them next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+
+from fanout import gather_bounded
+from tracing import NOOP_SPAN, tracer
+
+try:
+    from prometheus_client import Histogram
+except ImportError:
+    Histogram = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# httpx decodes zstd responses from 0.27 on, when zstandard is installed
+HTTPX_DECODES_ZSTD = zstandard is not None and tuple(int(part) for part in httpx.__version__.split(".")[:2]) >= (0, 27)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,26 +62,520 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Default Coral service URL
+# Default Coral service URL; unix:///path/to/socket connects over a Unix domain socket
 DEFAULT_CORAL_SERVICE_URL = os.getenv("CORAL_SERVICE_URL", "http://coral-service:8001")
 
+# Scheme of a base URL naming the service's Unix domain socket, and the URL used for its requests
+UNIX_SOCKET_SCHEME = "unix://"
+UNIX_SOCKET_BASE_URL = "http://coral-service"
+
+# Default connection pool settings
+DEFAULT_POOL_SIZE = int(os.getenv("CORAL_CLIENT_POOL_SIZE", "20"))
+DEFAULT_KEEP_ALIVE = os.getenv("CORAL_CLIENT_KEEP_ALIVE", "true").lower() == "true"
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("CORAL_CLIENT_CONNECT_TIMEOUT", "3.05"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("CORAL_CLIENT_READ_TIMEOUT", "30"))
+DEFAULT_MAX_RETRIES = int(os.getenv("CORAL_CLIENT_MAX_RETRIES", "3"))
+DEFAULT_BACKOFF_FACTOR = float(os.getenv("CORAL_CLIENT_BACKOFF_FACTOR", "0.2"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv("CORAL_CLIENT_KEEPALIVE_EXPIRY", "30"))
+
+# Default number of concurrent requests for fan-out helpers
+DEFAULT_FANOUT_CONCURRENCY = int(os.getenv("CORAL_CLIENT_FANOUT_CONCURRENCY", "10"))
+
+# Message stream: seconds without data (the service sends keep-alives) before reconnecting
+DEFAULT_STREAM_READ_TIMEOUT = float(os.getenv("CORAL_CLIENT_STREAM_READ_TIMEOUT", "60"))
+DEFAULT_STREAM_MAX_RECONNECT_DELAY = float(os.getenv("CORAL_CLIENT_STREAM_MAX_RECONNECT_DELAY", "30"))
+
+# Agents fetched per request by iter_agents()
+DEFAULT_AGENT_PAGE_SIZE = int(os.getenv("CORAL_CLIENT_AGENT_PAGE_SIZE", "500"))
+
+# Media type of the streamed agent list
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Wire format asked of the service: "json", or "msgpack" to exchange MessagePack when installed
+DEFAULT_WIRE_FORMAT = os.getenv("CORAL_CLIENT_WIRE_FORMAT", "json").lower()
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Services without MessagePack support keep answering in JSON
+MSGPACK_ACCEPT = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"
+
+# Compression of request and response bodies: "default" to keep the HTTP library's own Accept-Encoding,
+# "none" for uncompressed responses, "gzip", or "zstd" when zstandard is installed. With gzip or zstd,
+# request bodies of at least the minimum size are compressed once the service has said it accepts them.
+DEFAULT_COMPRESSION = os.getenv("CORAL_CLIENT_COMPRESSION", "default").lower()
+COMPRESSION_SETTINGS = ("default", "none", "gzip", "zstd")
+DEFAULT_COMPRESSION_MIN_SIZE = int(os.getenv("CORAL_CLIENT_COMPRESSION_MIN_SIZE", "1024"))
+DEFAULT_GZIP_LEVEL = int(os.getenv("CORAL_CLIENT_GZIP_LEVEL", "1"))
+DEFAULT_ZSTD_LEVEL = int(os.getenv("CORAL_CLIENT_ZSTD_LEVEL", "3"))
+
+# Only these methods are retried after the request may have reached the service,
+# plus requests carrying this header, which the service runs at most once
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# "reason" of the service's error responses rejecting an Idempotency-Key
+IDEMPOTENCY_REJECTION_REASON = "idempotency_key"
+# 503 is not retried: the service sheds load with it and says when to come back
+RETRY_STATUS_CODES = (502, 504)
+
+# Latency of the angus-core -> coral-service hop, when prometheus_client is installed
+UPSTREAM_LATENCY = Histogram(
+    "coral_client_request_duration_seconds",
+    "Time spent on requests from angus-core to the Coral Protocol Service",
+    ["operation", "status"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+) if Histogram is not None else None
+
+class CoralServiceUnavailable(Exception):
+    """The Coral Protocol Service rejected a request to protect the upstream Coral server."""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """
+        Initialize the error.
+        
+        Args:
+            message: Error message from the service
+            retry_after: Seconds the service asked callers to wait before retrying
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+        
+    @classmethod
+    def from_response(cls, response: Any) -> "CoralServiceUnavailable":
+        """Build the error from a 503 response of either HTTP client."""
+        try:
+            message = response.json().get("message") or response.text
+        except ValueError:
+            message = response.text
+        try:
+            retry_after = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = None
+        return cls(f"Coral Protocol Service unavailable: {message}", retry_after)
+
+class _SSEParser:
+    """Incremental parser for the message events of a server-sent event stream."""
+    
+    def __init__(self):
+        self.event_id: Optional[str] = None
+        self._event = "message"
+        self._data: List[str] = []
+        
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """
+        Consume one line of the stream.
+        
+        Returns:
+            Dict: {"id": ..., "message": ...} when the line completes a message event
+        """
+        if line:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "id":
+                self.event_id = value
+            elif field == "event":
+                self._event = value
+            elif field == "data":
+                self._data.append(value)
+            return None
+        event, data = self._event, "\n".join(self._data)
+        self._event, self._data = "message", []
+        if event != "message" or not data:
+            return None
+        return {"id": self.event_id, "message": json.loads(data)}
+
+def split_base_url(base_url: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a service base URL into the HTTP base URL for requests and a Unix socket path.
+    
+    Args:
+        base_url: http(s):// URL, or unix:// followed by the socket path
+        
+    Returns:
+        Tuple[str, Optional[str]]: Base URL, and the socket path for unix:// URLs
+    """
+    if base_url.startswith(UNIX_SOCKET_SCHEME):
+        return UNIX_SOCKET_BASE_URL, base_url[len(UNIX_SOCKET_SCHEME):]
+    return base_url.rstrip("/"), None
+
+class _UnixSocketConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket instead of TCP."""
+    
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+        
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixSocketConnection
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """Transport adapter sending every http:// request to one Unix domain socket, with pooled connections."""
+    
+    def __init__(self, socket_path: str, **kwargs):
+        self.socket_path = socket_path
+        super().__init__(**kwargs)
+        
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(_UnixSocketConnectionPool, socket_path=self.socket_path)
+        }
+
+def _wire_format(wire_format: str) -> str:
+    """Validate a wire format, falling back to JSON when msgpack isn't installed."""
+    if wire_format not in ("json", "msgpack"):
+        raise ValueError(f"Unknown wire format: {wire_format}")
+    if wire_format == "msgpack" and msgpack is None:
+        logger.warning("msgpack is not installed, using JSON with the Coral Protocol Service")
+        return "json"
+    return wire_format
+
+def _is_msgpack(response: Any) -> bool:
+    return response.headers.get("Content-Type", "").startswith(MSGPACK_MEDIA_TYPE)
+
+def _decode(response: Any) -> Any:
+    """Decode a JSON or MessagePack response body of either HTTP client."""
+    if _is_msgpack(response):
+        return msgpack.unpackb(response.content, raw=False)
+    return response.json()
+
+def _encode_msgpack(kwargs: Dict[str, Any], body_argument: str):
+    """Replace a json= request body with its MessagePack encoding."""
+    if "json" not in kwargs:
+        return
+    kwargs[body_argument] = msgpack.packb(kwargs.pop("json"), use_bin_type=True)
+    kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"Content-Type": MSGPACK_MEDIA_TYPE})
+
+def _compression(compression: str) -> str:
+    """Validate a compression setting, falling back to gzip when zstandard isn't installed."""
+    if compression not in COMPRESSION_SETTINGS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed, using gzip with the Coral Protocol Service")
+        return "gzip"
+    return compression
+
+def _compresses_requests(compression: str) -> bool:
+    """Whether a compression setting compresses request bodies the service accepts."""
+    return compression in ("gzip", "zstd")
+
+def _accept_encoding(compression: str, decodes_zstd: bool) -> Optional[str]:
+    """
+    Accept-Encoding asked of the service, limited to what the HTTP client can decode.
+    
+    Returns:
+        Optional[str]: The header value, or None with the "default" setting to keep
+            the HTTP client's own, e.g. "gzip, deflate" for requests
+    """
+    if compression == "default":
+        return None
+    if compression == "none":
+        return "identity"
+    if compression == "zstd" and decodes_zstd:
+        return "zstd, gzip"
+    return "gzip"
+
+def _request_encoding(compression: str, response: Any) -> Optional[str]:
+    """The request coding to use with a service advertising its accepted codings on this response."""
+    accepted = [item.split(";")[0].strip().lower() for item in response.headers.get("Accept-Encoding", "").split(",")]
+    if compression in accepted:
+        return compression
+    return "gzip" if "gzip" in accepted else None
+
+def _compress_body(kwargs: Dict[str, Any], body_argument: str, encoding: str, min_size: int):
+    """Compress a json= or bytes request body of at least min_size bytes."""
+    if "json" in kwargs:
+        kwargs[body_argument] = json.dumps(kwargs.pop("json")).encode("utf-8")
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"Content-Type": "application/json"})
+    body = kwargs.get(body_argument)
+    if not isinstance(body, bytes) or len(body) < min_size:
+        return
+    if encoding == "zstd":
+        kwargs[body_argument] = zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compress(body)
+    else:
+        kwargs[body_argument] = gzip.compress(body, compresslevel=DEFAULT_GZIP_LEVEL, mtime=0)
+    kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"Content-Encoding": encoding})
+
+def _stream_params(agent: Optional[str], thread_id: Optional[str]) -> Dict[str, str]:
+    params = {}
+    if agent:
+        params["agent"] = agent
+    if thread_id:
+        params["thread_id"] = thread_id
+    return params
+
+def _retries_exhausted(error: requests.RequestException) -> bool:
+    """Whether the session's urllib3 Retry already retried a failed request, as it does for connection failures."""
+    return bool(error.args) and isinstance(error.args[0], MaxRetryError)
+
+def _client_span(method: str, operation: str, path: str):
+    """Span of a request to the service, or NOOP_SPAN without building one when tracing is off."""
+    if not tracer.active():
+        return contextlib.nullcontext(NOOP_SPAN)
+    return tracer.span(f"{method} {operation}", "client", attributes={"http.method": method, "http.target": path})
+
+def _observe(operation: str, status: str, started: float):
+    """Record the duration of one request to the Coral Protocol Service."""
+    if UPSTREAM_LATENCY is not None:
+        UPSTREAM_LATENCY.labels(operation, status).observe(time.perf_counter() - started)
+
 class CoralProtocolClient:
     """
     Client for interacting with the Coral Protocol Service.
     
     This client makes HTTP requests to the Coral Protocol Service instead of
     directly using the langchain-mcp-adapters package.
+    
+    All requests go through a single pooled, keep-alive session, so one
+    client instance can be shared by every Flask worker thread.
     """
     
-    def __init__(self, base_url: str = DEFAULT_CORAL_SERVICE_URL):
+    def __init__(
+        self,
+        base_url: str = DEFAULT_CORAL_SERVICE_URL,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keep_alive: bool = DEFAULT_KEEP_ALIVE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        wire_format: str = DEFAULT_WIRE_FORMAT,
+        compression: str = DEFAULT_COMPRESSION,
+        compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+    ):
         """
         Initialize the Coral Protocol Client.
         
         Args:
-            base_url: URL of the Coral Protocol Service
+            base_url: URL of the Coral Protocol Service, or unix:// followed by the
+                path of its Unix domain socket when the services share a host
+            pool_size: Maximum number of pooled connections to the service
+            keep_alive: Whether to reuse connections between requests
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the service to send a response
+            max_retries: Retries for failed connections, idempotent and keyed requests
+            backoff_factor: Exponential backoff factor between retries
+            wire_format: "json", or "msgpack" to ask for MessagePack responses and
+                send MessagePack bodies once the service has answered in it
+            compression: "default" to send the HTTP library's own Accept-Encoding,
+                "none" to ask for uncompressed responses, or "gzip" or "zstd" to ask for
+                compressed responses and compress request bodies once the service has
+                said it accepts them
+            compression_min_size: Smallest request body compressed, in bytes
+        """
+        self.base_url, self.socket_path = split_base_url(base_url)
+        self.wire_format = _wire_format(wire_format)
+        # Set when the service has answered in MessagePack, so it can also read it
+        self._msgpack_bodies = False
+        self.compression = _compression(compression)
+        self.compression_min_size = compression_min_size
+        # Set when the service has listed the codings it accepts for request bodies
+        self._request_encoding: Optional[str] = None
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.session = self._create_session(pool_size, keep_alive, max_retries, backoff_factor, self.socket_path)
+        if self.wire_format == "msgpack":
+            self.session.headers["Accept"] = MSGPACK_ACCEPT
+        accept_encoding = _accept_encoding(self.compression, "zstd" in URLLIB3_ACCEPT_ENCODING)
+        if accept_encoding is not None:
+            self.session.headers["Accept-Encoding"] = accept_encoding
+        # Last agent list per level of detail, revalidated with its ETag
+        self._agent_lists: Dict[bool, Tuple[str, Dict[str, Any]]] = {}
+        logger.info(f"Initialized Coral Protocol Client with URL: {base_url}")
+        
+    @staticmethod
+    def _create_session(
+        pool_size: int,
+        keep_alive: bool,
+        max_retries: int,
+        backoff_factor: float,
+        socket_path: Optional[str] = None,
+    ) -> requests.Session:
+        """
+        Create the pooled HTTP session used for all requests.
+        
+        With a socket path, connections go to that Unix domain socket instead
+        of over TCP, pooled and kept alive the same way.
+        
+        Connection failures are retried for every method because the request
+        never reached the service; read failures and 502/504 responses are only
+        retried for idempotent methods. A 503 means the service is shedding
+        load and is raised as CoralServiceUnavailable without retrying.
+        """
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        adapter_kwargs = {
+            "pool_connections": 1,
+            "pool_maxsize": pool_size,
+            "max_retries": retry,
+            "pool_block": False,
+        }
+        adapter = _UnixSocketAdapter(socket_path, **adapter_kwargs) if socket_path else HTTPAdapter(**adapter_kwargs)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+        
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the Coral Protocol Service through the pooled session.
+        
+        Requests carrying an Idempotency-Key header are also retried here on
+        read failures and 502/504 responses, since the service runs them once.
+        Connection failures have already been retried by the session, so they
+        are not retried again here.
+        The request runs in a client span whose traceparent header lets the
+        service continue the caller's trace; with tracing off and no trace to
+        continue, neither is created.
+        
+        Args:
+            method: HTTP method
+            path: Path relative to the service base URL
+            operation: Metrics label for the request, defaults to the path
+            **kwargs: Extra arguments passed to requests
+            
+        Returns:
+            requests.Response: Successful response from the service
+        """
+        operation = kwargs.pop("operation", path)
+        kwargs.setdefault("timeout", self.timeout)
+        if self._msgpack_bodies:
+            _encode_msgpack(kwargs, "data")
+        if self._request_encoding:
+            _compress_body(kwargs, "data", self._request_encoding, self.compression_min_size)
+        keyed = method not in IDEMPOTENT_METHODS and IDEMPOTENCY_KEY_HEADER in (kwargs.get("headers") or {})
+        retries = self.max_retries if keyed else 0
+        with _client_span(method, operation, path) as span:
+            kwargs["headers"] = tracer.inject(kwargs.get("headers"))
+            attempt = 0
+            while True:
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    _observe(operation, "error", started)
+                    if attempt >= retries or _retries_exhausted(e):
+                        raise
+                except Exception:
+                    _observe(operation, "error", started)
+                    raise
+                else:
+                    _observe(operation, str(response.status_code), started)
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code == 503:
+                        raise CoralServiceUnavailable.from_response(response)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                        response.raise_for_status()
+                        if self.wire_format == "msgpack" and _is_msgpack(response):
+                            self._msgpack_bodies = True
+                        if _compresses_requests(self.compression) and self._request_encoding is None:
+                            self._request_encoding = _request_encoding(self.compression, response)
+                        return response
+                    response.close()
+                attempt += 1
+                span.set_attribute("retries", attempt)
+                time.sleep(self.backoff_factor * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+        
+    def forward(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        query: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        operation: Optional[str] = None,
+    ) -> requests.Response:
+        """
+        Send a raw request to the Coral Protocol Service and return its
+        response unread, whatever its status.
+        
+        Used to proxy requests without decoding and re-encoding their bodies;
+        the caller must close the response.
+        
+        Args:
+            method: HTTP method
+            path: Path relative to the service base URL
+            body: Request body bytes
+            query: Raw query string
+            headers: Request headers to send
+            operation: Metrics label for the request, defaults to the path
+            
+        Returns:
+            requests.Response: Streaming response from the service
+        """
+        url = f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}"
+        with _client_span(method, operation or path, path) as span:
+            headers = tracer.inject(headers)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, data=body, headers=headers, stream=True, timeout=self.timeout)
+            except Exception:
+                _observe(operation or path, "error", started)
+                raise
+            _observe(operation or path, str(response.status_code), started)
+            span.set_attribute("http.status_code", response.status_code)
+        return response
+        
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the pooled connections to the service.
+        
+        Returns:
+            Dict: Pool size limit, connections opened and idle connections per host
+        """
+        pools = self.session.get_adapter(self.base_url).poolmanager.pools
+        hosts = {}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            idle = list(pool.pool.queue) if pool.pool is not None else []
+            hosts[self.socket_path or f"{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "idle": sum(1 for conn in idle if conn is not None)
+            }
+        return {"max_size": self.pool_size, "hosts": hosts}
+        
+    def live(self, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
-        self.base_url = base_url
-        logger.info(f"Initialized Coral Protocol Client with URL: {self.base_url}")
+        Call the service's liveness endpoint.
+        
+        Args:
+            timeout: Seconds to wait, defaults to the client timeouts
+            
+        Returns:
+            Dict: Response from the service
+        """
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        return _decode(self._request("GET", "/live", **kwargs))
         
     def health_check(self) -> Dict[str, Any]:
         """
@@ -50,9 +585,8 @@ class CoralProtocolClient:
             Dict: Response from the service
         """
         try:
-            response = requests.get(f"{self.base_url}/")
-            response.raise_for_status()
-            return response.json()
+            response = self._request("GET", "/")
+            return _decode(response)
         except Exception as e:
             logger.error(f"Failed to connect to Coral Protocol Service: {str(e)}")
             raise
@@ -72,17 +606,25 @@ class CoralProtocolClient:
             capabilities = []
             
         try:
-            response = requests.post(
-                f"{self.base_url}/agents/register",
+            response = self._request(
+                "POST",
+                "/agents/register",
                 json={"agent_name": agent_name, "capabilities": capabilities}
             )
-            response.raise_for_status()
-            return response.json()
+            return _decode(response)
         except Exception as e:
             logger.error(f"Failed to register agent: {str(e)}")
             raise
             
-    def send_message(self, recipient: str, content: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+    def send_message(
+        self,
+        recipient: str,
+        content: str,
+        thread_id: Optional[str] = None,
+        delivery: str = "sync",
+        idempotency_key: Optional[str] = None,
+        sender: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Send a message to another agent.
         
@@ -90,6 +632,12 @@ class CoralProtocolClient:
             recipient: Name of the recipient agent
             content: Message content
             thread_id: Optional thread ID
+            delivery: "sync" to deliver before returning, or "queued" to have
+                the service persist the message and deliver it in the background
+            idempotency_key: Key under which the service runs the send at most once;
+                a random key is used when not given, so retries are safe
+            sender: Name of the sending agent, whose rate limit and fair share
+                of send capacity the message counts against
             
         Returns:
             Dict: Response from the service
@@ -103,44 +651,247 @@ class CoralProtocolClient:
             if thread_id:
                 data["thread_id"] = thread_id
                 
-            response = requests.post(
-                f"{self.base_url}/messages/send",
-                json=data
+            if sender:
+                data["sender"] = sender
+                
+            if delivery != "sync":
+                data["delivery"] = delivery
+                
+            response = self._request(
+                "POST",
+                "/messages/send",
+                json=data,
+                headers={IDEMPOTENCY_KEY_HEADER: idempotency_key or str(uuid.uuid4())}
             )
-            response.raise_for_status()
-            return response.json()
+            return _decode(response)
         except Exception as e:
             logger.error(f"Failed to send message: {str(e)}")
             raise
             
-    def list_agents(self, include_details: bool = True) -> Dict[str, Any]:
+    def register_agents(self, agents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Register several agents with the Coral Protocol in one request.
+        
+        Args:
+            agents: Agents as {"agent_name": ..., "capabilities": [...]} dicts
+            
+        Returns:
+            Dict: Response from the service with a result per agent
+        """
+        try:
+            response = self._request(
+                "POST",
+                "/agents/register_batch",
+                json={"agents": agents}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to register agents: {str(e)}")
+            raise
+            
+    def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        """
+        Get the delivery status of a queued message.
+        
+        Args:
+            message_id: ID returned when the message was queued
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            response = self._request("GET", f"/messages/status/{message_id}", operation="/messages/status/{message_id}")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get message status: {str(e)}")
+            raise
+            
+    def send_messages(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send several messages in one request.
+        
+        Args:
+            messages: Messages as {"recipient": ..., "content": ..., "thread_id": ...} dicts
+            
+        Returns:
+            Dict: Response from the service with a result per message
+        """
+        try:
+            response = self._request(
+                "POST",
+                "/messages/send_batch",
+                json={"messages": messages}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to send messages: {str(e)}")
+            raise
+            
+    def list_agents(
+        self,
+        include_details: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         List available agents registered with the Coral Protocol.
         
+        The full list is revalidated with its ETag and served from a local
+        copy while unchanged. With `limit` or `cursor` a single page is
+        fetched instead, in name order.
+        
         Args:
             include_details: Whether to include agent details
+            limit: Maximum number of agents to return
+            cursor: next_cursor from the previous page
             
         Returns:
             Dict: Response from the service
         """
+        if limit is not None or cursor is not None:
+            params = {"include_details": include_details}
+            if limit is not None:
+                params["limit"] = limit
+            if cursor:
+                params["cursor"] = cursor
+            try:
+                response = self._request("GET", "/agents/list", params=params)
+                return _decode(response)
+            except Exception as e:
+                logger.error(f"Failed to list agents: {str(e)}")
+                raise
         try:
-            response = requests.get(
-                f"{self.base_url}/agents/list",
-                params={"include_details": include_details}
+            cached = self._agent_lists.get(include_details)
+            headers = {"If-None-Match": cached[0]} if cached else {}
+            response = self._request(
+                "GET",
+                "/agents/list",
+                params={"include_details": include_details},
+                headers=headers
             )
-            response.raise_for_status()
-            return response.json()
+            if response.status_code == 304 and cached:
+                return cached[1]
+            result = _decode(response)
+            etag = response.headers.get("ETag")
+            if etag:
+                self._agent_lists[include_details] = (etag, result)
+            return result
         except Exception as e:
             logger.error(f"Failed to list agents: {str(e)}")
             raise
             
-    def create_thread(self, participants: List[str], initial_message: Optional[str] = None) -> Dict[str, Any]:
+    def iter_agents(self, include_details: bool = True, page_size: int = DEFAULT_AGENT_PAGE_SIZE) -> Iterator[Any]:
+        """
+        Iterate over all agents, fetching them a page at a time in name order.
+        
+        Args:
+            include_details: Whether to yield agent dicts instead of names
+            page_size: Agents fetched per request
+            
+        Yields:
+            Agent dicts, or names
+        """
+        cursor = None
+        while True:
+            page = self.list_agents(include_details, limit=page_size, cursor=cursor)
+            yield from page["agents"]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+            
+    def stream_agents(
+        self,
+        include_details: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[Iterator[bytes], Optional[str]]:
+        """
+        Open the agent list as a stream of newline-delimited JSON, one agent per line.
+        
+        The body is read as it arrives, so it can be relayed without holding
+        the whole list in memory. Errors from the service are raised here,
+        before any data is returned.
+        
+        Args:
+            include_details: Whether each line is an agent dict instead of a name
+            limit: Maximum number of agents, or None for all
+            cursor: Start after this agent name
+            
+        Returns:
+            Tuple[Iterator[bytes], Optional[str]]: Body chunks, and the cursor of
+                the agents after `limit`, if any
+        """
+        params = {"include_details": include_details}
+        if limit is not None:
+            params["limit"] = limit
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            response = self._request(
+                "GET",
+                "/agents/list",
+                params=params,
+                headers={"Accept": NDJSON_MEDIA_TYPE},
+                stream=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to stream agents: {str(e)}")
+            raise
+            
+        def chunks():
+            with response:
+                yield from response.iter_content(chunk_size=None)
+                
+        return chunks(), response.headers.get("X-Next-Cursor")
+            
+    def find_agents(
+        self,
+        capabilities: List[str],
+        match: str = "all",
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_details: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Find agents by capability.
+        
+        Args:
+            capabilities: Capabilities to look for
+            match: "all" for agents with every capability, "any" for at least one
+            limit: Maximum number of agents to return
+            cursor: next_cursor from the previous page
+            include_details: Whether to include each agent's capabilities
+            
+        Returns:
+            Dict: Matching agents in name order and the cursor of the next page, if any
+        """
+        params = {"capability": list(capabilities), "match": match, "limit": limit, "include_details": include_details}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            response = self._request("GET", "/agents/search", params=params)
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to find agents: {str(e)}")
+            raise
+            
+    def create_thread(
+        self,
+        participants: List[str],
+        initial_message: Optional[str] = None,
+        delivery: str = "sync",
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Create a new thread with participants.
         
         Args:
             participants: List of participant agent names
             initial_message: Optional initial message
+            delivery: "sync" to deliver the initial message before returning,
+                or "background" to return immediately and poll get_thread_delivery()
+            idempotency_key: Key under which the service creates the thread at most
+                once; a random key is used when not given, so retries are safe
             
         Returns:
             Dict: Response from the service
@@ -153,15 +904,749 @@ class CoralProtocolClient:
             if initial_message:
                 data["initial_message"] = initial_message
                 
-            response = requests.post(
-                f"{self.base_url}/threads/create",
-                json=data
+            if delivery != "sync":
+                data["delivery"] = delivery
+                
+            response = self._request(
+                "POST",
+                "/threads/create",
+                json=data,
+                headers={IDEMPOTENCY_KEY_HEADER: idempotency_key or str(uuid.uuid4())}
             )
-            response.raise_for_status()
-            return response.json()
+            return _decode(response)
         except Exception as e:
             logger.error(f"Failed to create thread: {str(e)}")
             raise
+            
+    def get_thread_delivery(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Get the per-participant delivery status of a thread's initial message.
+        
+        Args:
+            thread_id: ID of the thread
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            response = self._request("GET", f"/threads/{thread_id}/delivery", operation="/threads/{thread_id}/delivery")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get thread delivery status: {str(e)}")
+            raise
+            
+    def get_thread(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Look up a thread in the service's local registry.
+        
+        Args:
+            thread_id: ID of the thread
+            
+        Returns:
+            Dict: Thread ID, participants and creation time
+        """
+        try:
+            response = self._request("GET", f"/threads/{thread_id}", operation="/threads/{thread_id}")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get thread: {str(e)}")
+            raise
+            
+    def find_threads(self, participant: str, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List the threads an agent participates in, newest first.
+        
+        Args:
+            participant: Agent name
+            limit: Maximum number of threads to return
+            cursor: next_cursor from the previous page
+            
+        Returns:
+            Dict: Threads and the cursor of the next page, if any
+        """
+        params = {"participant": participant, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            response = self._request("GET", "/threads", params=params)
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to find threads: {str(e)}")
+            raise
+            
+    def iter_messages(
+        self,
+        agent: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        last_event_id: Optional[str] = None,
+        reconnect: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Receive inbound messages pushed by the service's /messages/stream.
+        
+        The stream is resumed with Last-Event-ID after a dropped connection,
+        with exponential backoff between attempts.
+        
+        Args:
+            agent: Only receive messages addressed to this agent
+            thread_id: Only receive messages in this thread
+            last_event_id: Resume after this event ID
+            reconnect: Reconnect when the connection drops instead of returning
+            
+        Yields:
+            Dict: {"id": event ID, "message": message dict}
+        """
+        delay = self.backoff_factor or 0.1
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_event_id is not None:
+                headers["Last-Event-ID"] = last_event_id
+            try:
+                with self.session.get(
+                    f"{self.base_url}/messages/stream",
+                    params=_stream_params(agent, thread_id),
+                    headers=headers,
+                    stream=True,
+                    timeout=(self.timeout[0], DEFAULT_STREAM_READ_TIMEOUT)
+                ) as response:
+                    response.raise_for_status()
+                    delay = self.backoff_factor or 0.1
+                    parser = _SSEParser()
+                    for line in response.iter_lines(decode_unicode=True):
+                        event = parser.feed(line)
+                        if event is not None:
+                            last_event_id = event["id"]
+                            yield event
+            except requests.exceptions.RequestException as e:
+                if not reconnect:
+                    raise
+                logger.warning(f"Message stream interrupted, reconnecting in {delay:.1f}s: {str(e)}")
+            if not reconnect:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, DEFAULT_STREAM_MAX_RECONNECT_DELAY)
+
+class AsyncCoralProtocolClient:
+    """
+    Asyncio client for interacting with the Coral Protocol Service.
+    
+    Offers the same methods as CoralProtocolClient as coroutines, backed by a
+    pooled httpx.AsyncClient, plus fan-out helpers such as send_many() that
+    run independent requests concurrently.
+    """
+    
+    def __init__(
+        self,
+        base_url: str = DEFAULT_CORAL_SERVICE_URL,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keep_alive: bool = DEFAULT_KEEP_ALIVE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        wire_format: str = DEFAULT_WIRE_FORMAT,
+        compression: str = DEFAULT_COMPRESSION,
+        compression_min_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+    ):
+        """
+        Initialize the async Coral Protocol Client.
+        
+        Args:
+            base_url: URL of the Coral Protocol Service, or unix:// followed by the
+                path of its Unix domain socket when the services share a host
+            pool_size: Maximum number of pooled connections to the service
+            keep_alive: Whether to reuse connections between requests
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the service to send a response
+            max_retries: Retries for failed connections, idempotent and keyed requests
+            backoff_factor: Exponential backoff factor between retries
+            keepalive_expiry: Seconds an idle pooled connection is kept open
+            wire_format: "json", or "msgpack" to ask for MessagePack responses and
+                send MessagePack bodies once the service has answered in it
+            compression: "default" to send the HTTP library's own Accept-Encoding,
+                "none" to ask for uncompressed responses, or "gzip" or "zstd" to ask for
+                compressed responses and compress request bodies once the service has
+                said it accepts them
+            compression_min_size: Smallest request body compressed, in bytes
+        """
+        self.base_url, self.socket_path = split_base_url(base_url)
+        self.wire_format = _wire_format(wire_format)
+        # Set when the service has answered in MessagePack, so it can also read it
+        self._msgpack_bodies = False
+        self.compression = _compression(compression)
+        self.compression_min_size = compression_min_size
+        # Set when the service has listed the codings it accepts for request bodies
+        self._request_encoding: Optional[str] = None
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # Last agent list per level of detail, revalidated with its ETag
+        self._agent_lists: Dict[bool, Tuple[str, Dict[str, Any]]] = {}
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if keep_alive else 0,
+            keepalive_expiry=keepalive_expiry,
+        )
+        headers = {}
+        accept_encoding = _accept_encoding(self.compression, HTTPX_DECODES_ZSTD)
+        if accept_encoding is not None:
+            headers["Accept-Encoding"] = accept_encoding
+        if self.wire_format == "msgpack":
+            headers["Accept"] = MSGPACK_ACCEPT
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=max_retries, uds=self.socket_path),
+            headers=headers,
+        )
+        logger.info(f"Initialized async Coral Protocol Client with URL: {base_url}")
+        
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send a request to the Coral Protocol Service through the pooled client.
+        
+        Connection failures are only retried by the transport; read failures
+        and 502/504 responses are retried here for idempotent methods and for
+        requests carrying an Idempotency-Key header. A 503
+        is raised as CoralServiceUnavailable without retrying. The request
+        runs in a client span whose traceparent header lets the service
+        continue the caller's trace; with tracing off and no trace to
+        continue, neither is created.
+        
+        Args:
+            method: HTTP method
+            path: Path relative to the service base URL
+            operation: Metrics label for the request, defaults to the path
+            **kwargs: Extra arguments passed to httpx
+            
+        Returns:
+            httpx.Response: Successful response from the service
+        """
+        operation = kwargs.pop("operation", path)
+        if self._msgpack_bodies:
+            _encode_msgpack(kwargs, "content")
+        if self._request_encoding:
+            _compress_body(kwargs, "content", self._request_encoding, self.compression_min_size)
+        keyed = IDEMPOTENCY_KEY_HEADER in (kwargs.get("headers") or {})
+        retries = self.max_retries if method in IDEMPOTENT_METHODS or keyed else 0
+        with _client_span(method, operation, path) as span:
+            kwargs["headers"] = tracer.inject(kwargs.get("headers"))
+            attempt = 0
+            while True:
+                started = time.perf_counter()
+                try:
+                    response = await self.client.request(method, path, **kwargs)
+                    _observe(operation, str(response.status_code), started)
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code == 503:
+                        raise CoralServiceUnavailable.from_response(response)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                        response.raise_for_status()
+                        if self.wire_format == "msgpack" and _is_msgpack(response):
+                            self._msgpack_bodies = True
+                        if _compresses_requests(self.compression) and self._request_encoding is None:
+                            self._request_encoding = _request_encoding(self.compression, response)
+                        return response
+                except httpx.TransportError as e:
+                    _observe(operation, "error", started)
+                    if attempt >= retries or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                        raise
+                attempt += 1
+                span.set_attribute("retries", attempt)
+                await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+            
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.client.aclose()
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Check if the Coral Protocol Service is running.
+        
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            response = await self._request("GET", "/")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to connect to Coral Protocol Service: {str(e)}")
+            raise
+            
+    async def register_agent(self, agent_name: str, capabilities: List[str] = None) -> Dict[str, Any]:
+        """
+        Register an agent with the Coral Protocol.
+        
+        Args:
+            agent_name: Name of the agent
+            capabilities: List of agent capabilities
+            
+        Returns:
+            Dict: Response from the service
+        """
+        if capabilities is None:
+            capabilities = []
+            
+        try:
+            response = await self._request(
+                "POST",
+                "/agents/register",
+                json={"agent_name": agent_name, "capabilities": capabilities}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to register agent: {str(e)}")
+            raise
+            
+    async def send_message(
+        self,
+        recipient: str,
+        content: str,
+        thread_id: Optional[str] = None,
+        delivery: str = "sync",
+        idempotency_key: Optional[str] = None,
+        sender: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a message to another agent.
+        
+        Args:
+            recipient: Name of the recipient agent
+            content: Message content
+            thread_id: Optional thread ID
+            delivery: "sync" to deliver before returning, or "queued" to have
+                the service persist the message and deliver it in the background
+            idempotency_key: Key under which the service runs the send at most once;
+                a random key is used when not given, so retries are safe
+            sender: Name of the sending agent, whose rate limit and fair share
+                of send capacity the message counts against
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            data = {
+                "recipient": recipient,
+                "content": content
+            }
+            
+            if thread_id:
+                data["thread_id"] = thread_id
+                
+            if sender:
+                data["sender"] = sender
+                
+            if delivery != "sync":
+                data["delivery"] = delivery
+                
+            response = await self._request(
+                "POST",
+                "/messages/send",
+                json=data,
+                headers={IDEMPOTENCY_KEY_HEADER: idempotency_key or str(uuid.uuid4())}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to send message: {str(e)}")
+            raise
+            
+    async def register_agents(self, agents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Register several agents with the Coral Protocol in one request.
+        
+        Args:
+            agents: Agents as {"agent_name": ..., "capabilities": [...]} dicts
+            
+        Returns:
+            Dict: Response from the service with a result per agent
+        """
+        try:
+            response = await self._request(
+                "POST",
+                "/agents/register_batch",
+                json={"agents": agents}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to register agents: {str(e)}")
+            raise
+            
+    async def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        """
+        Get the delivery status of a queued message.
+        
+        Args:
+            message_id: ID returned when the message was queued
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            response = await self._request("GET", f"/messages/status/{message_id}", operation="/messages/status/{message_id}")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get message status: {str(e)}")
+            raise
+            
+    async def send_messages(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send several messages in one request.
+        
+        Args:
+            messages: Messages as {"recipient": ..., "content": ..., "thread_id": ...} dicts
+            
+        Returns:
+            Dict: Response from the service with a result per message
+        """
+        try:
+            response = await self._request(
+                "POST",
+                "/messages/send_batch",
+                json={"messages": messages}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to send messages: {str(e)}")
+            raise
+            
+    async def list_agents(
+        self,
+        include_details: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List available agents registered with the Coral Protocol.
+        
+        The full list is revalidated with its ETag and served from a local
+        copy while unchanged. With `limit` or `cursor` a single page is
+        fetched instead, in name order.
+        
+        Args:
+            include_details: Whether to include agent details
+            limit: Maximum number of agents to return
+            cursor: next_cursor from the previous page
+            
+        Returns:
+            Dict: Response from the service
+        """
+        if limit is not None or cursor is not None:
+            params = {"include_details": include_details}
+            if limit is not None:
+                params["limit"] = limit
+            if cursor:
+                params["cursor"] = cursor
+            try:
+                response = await self._request("GET", "/agents/list", params=params)
+                return _decode(response)
+            except Exception as e:
+                logger.error(f"Failed to list agents: {str(e)}")
+                raise
+        try:
+            cached = self._agent_lists.get(include_details)
+            headers = {"If-None-Match": cached[0]} if cached else {}
+            response = await self._request(
+                "GET",
+                "/agents/list",
+                params={"include_details": include_details},
+                headers=headers
+            )
+            if response.status_code == 304 and cached:
+                return cached[1]
+            result = _decode(response)
+            etag = response.headers.get("ETag")
+            if etag:
+                self._agent_lists[include_details] = (etag, result)
+            return result
+        except Exception as e:
+            logger.error(f"Failed to list agents: {str(e)}")
+            raise
+            
+    async def iter_agents(self, include_details: bool = True, page_size: int = DEFAULT_AGENT_PAGE_SIZE) -> AsyncIterator[Any]:
+        """
+        Iterate over all agents, fetching them a page at a time in name order.
+        
+        Args:
+            include_details: Whether to yield agent dicts instead of names
+            page_size: Agents fetched per request
+            
+        Yields:
+            Agent dicts, or names
+        """
+        cursor = None
+        while True:
+            page = await self.list_agents(include_details, limit=page_size, cursor=cursor)
+            for agent in page["agents"]:
+                yield agent
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+            
+    async def find_agents(
+        self,
+        capabilities: List[str],
+        match: str = "all",
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_details: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Find agents by capability.
+        
+        Args:
+            capabilities: Capabilities to look for
+            match: "all" for agents with every capability, "any" for at least one
+            limit: Maximum number of agents to return
+            cursor: next_cursor from the previous page
+            include_details: Whether to include each agent's capabilities
+            
+        Returns:
+            Dict: Matching agents in name order and the cursor of the next page, if any
+        """
+        params = {"capability": list(capabilities), "match": match, "limit": limit, "include_details": include_details}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            response = await self._request("GET", "/agents/search", params=params)
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to find agents: {str(e)}")
+            raise
+            
+    async def create_thread(
+        self,
+        participants: List[str],
+        initial_message: Optional[str] = None,
+        delivery: str = "sync",
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a new thread with participants.
+        
+        Args:
+            participants: List of participant agent names
+            initial_message: Optional initial message
+            delivery: "sync" to deliver the initial message before returning,
+                or "background" to return immediately and poll get_thread_delivery()
+            idempotency_key: Key under which the service creates the thread at most
+                once; a random key is used when not given, so retries are safe
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            data = {
+                "participants": participants
+            }
+            
+            if initial_message:
+                data["initial_message"] = initial_message
+                
+            if delivery != "sync":
+                data["delivery"] = delivery
+                
+            response = await self._request(
+                "POST",
+                "/threads/create",
+                json=data,
+                headers={IDEMPOTENCY_KEY_HEADER: idempotency_key or str(uuid.uuid4())}
+            )
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to create thread: {str(e)}")
+            raise
+            
+    async def get_thread_delivery(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Get the per-participant delivery status of a thread's initial message.
+        
+        Args:
+            thread_id: ID of the thread
+            
+        Returns:
+            Dict: Response from the service
+        """
+        try:
+            response = await self._request("GET", f"/threads/{thread_id}/delivery", operation="/threads/{thread_id}/delivery")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get thread delivery status: {str(e)}")
+            raise
+            
+    async def get_thread(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Look up a thread in the service's local registry.
+        
+        Args:
+            thread_id: ID of the thread
+            
+        Returns:
+            Dict: Thread ID, participants and creation time
+        """
+        try:
+            response = await self._request("GET", f"/threads/{thread_id}", operation="/threads/{thread_id}")
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to get thread: {str(e)}")
+            raise
+            
+    async def find_threads(self, participant: str, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List the threads an agent participates in, newest first.
+        
+        Args:
+            participant: Agent name
+            limit: Maximum number of threads to return
+            cursor: next_cursor from the previous page
+            
+        Returns:
+            Dict: Threads and the cursor of the next page, if any
+        """
+        params = {"participant": participant, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            response = await self._request("GET", "/threads", params=params)
+            return _decode(response)
+        except Exception as e:
+            logger.error(f"Failed to find threads: {str(e)}")
+            raise
+            
+    async def iter_messages(
+        self,
+        agent: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        last_event_id: Optional[str] = None,
+        reconnect: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Receive inbound messages pushed by the service's /messages/stream.
+        
+        The stream is resumed with Last-Event-ID after a dropped connection,
+        with exponential backoff between attempts.
+        
+        Args:
+            agent: Only receive messages addressed to this agent
+            thread_id: Only receive messages in this thread
+            last_event_id: Resume after this event ID
+            reconnect: Reconnect when the connection drops instead of returning
+            
+        Yields:
+            Dict: {"id": event ID, "message": message dict}
+        """
+        delay = self.backoff_factor or 0.1
+        timeout = httpx.Timeout(self.client.timeout.connect, read=DEFAULT_STREAM_READ_TIMEOUT, write=None, pool=None)
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_event_id is not None:
+                headers["Last-Event-ID"] = last_event_id
+            try:
+                async with self.client.stream(
+                    "GET",
+                    "/messages/stream",
+                    params=_stream_params(agent, thread_id),
+                    headers=headers,
+                    timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    delay = self.backoff_factor or 0.1
+                    parser = _SSEParser()
+                    async for line in response.aiter_lines():
+                        event = parser.feed(line.rstrip("\r\n"))
+                        if event is not None:
+                            last_event_id = event["id"]
+                            yield event
+            except httpx.HTTPError as e:
+                if not reconnect:
+                    raise
+                logger.warning(f"Message stream interrupted, reconnecting in {delay:.1f}s: {str(e)}")
+            if not reconnect:
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DEFAULT_STREAM_MAX_RECONNECT_DELAY)
+            
+    async def send_many(
+        self,
+        recipients: List[str],
+        content: str,
+        thread_id: Optional[str] = None,
+        concurrency: int = DEFAULT_FANOUT_CONCURRENCY,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Send the same message to several agents in parallel.
+        
+        Args:
+            recipients: Names of the recipient agents
+            content: Message content
+            thread_id: Optional thread ID
+            concurrency: Maximum number of sends in flight at once
+            
+        Returns:
+            Dict: Per-recipient result, either {"status": "success", "result": ...}
+                or {"status": "error", "message": ...}
+        """
+        results = await gather_bounded(
+            [self.send_message(recipient, content, thread_id) for recipient in recipients],
+            concurrency
+        )
+        return {
+            recipient: _fanout_result(result)
+            for recipient, result in zip(recipients, results)
+        }
+        
+    async def health_check_many(
+        self,
+        base_urls: List[str],
+        concurrency: int = DEFAULT_FANOUT_CONCURRENCY,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Check several Coral Protocol Service instances in parallel.
+        
+        Each instance is checked through its own single-connection client with
+        this client's timeouts, retries and formats, so neither this client's
+        pool nor its Unix socket carries requests meant for another instance.
+        
+        Args:
+            base_urls: Base URLs of the service instances, each either an HTTP
+                URL or unix:// followed by the path of its Unix domain socket
+            concurrency: Maximum number of checks in flight at once
+            
+        Returns:
+            Dict: Per-URL result, either {"status": "success", "result": ...}
+                or {"status": "error", "message": ...}
+        """
+        async def check(base_url):
+            async with AsyncCoralProtocolClient(
+                base_url,
+                pool_size=1,
+                keep_alive=False,
+                connect_timeout=self.client.timeout.connect,
+                read_timeout=self.client.timeout.read,
+                max_retries=self.max_retries,
+                backoff_factor=self.backoff_factor,
+                wire_format=self.wire_format,
+                compression=self.compression,
+            ) as client:
+                return await client.health_check()
+                
+
+        results = await gather_bounded([check(base_url) for base_url in base_urls], concurrency)
+        return {
+            base_url: _fanout_result(result)
+            for base_url, result in zip(base_urls, results)
+        }
+
+def _fanout_result(result: Any) -> Dict[str, Any]:
+    """Convert a gather_bounded() result into a per-item status dict."""
+    if isinstance(result, Exception):
+        return {"status": "error", "message": str(result)}
+    return {"status": "success", "result": result}
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the Agent Angus Core Service
+
+Production entry point:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Worker count, threads, keep-alive and shutdown timeouts are read from the
+environment. Each worker creates its own Coral Protocol Client after fork.
+
+One worker with GUNICORN_THREADS threads is the default. angus-core's only
+per-worker state is the proxy response cache and the client's agent list
+cache, both revalidated with ETags, so GUNICORN_WORKERS can be raised to use
+more cores.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+
+# Aggregate Prometheus metrics across workers
+_metrics_dir_created = False
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    _metrics_dir_created = True
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="angus-core-metrics-")
+
+def on_starting(server):
+    """Start every run with empty multiprocess metric files."""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def post_fork(server, worker):
+    """Give a worker its own Coral Protocol Client if the app was preloaded."""
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.init_coral_client()
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    """Remove the multiprocess metrics directory created for this run."""
+    if _metrics_dir_created:
+        shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Readiness Checks
+
+This module runs the service's dependency checks in a background thread and
+caches the outcome, so /ready answers from memory instead of making a round
+trip to the Coral Protocol Service on every orchestrator probe. Each
+dependency is reported with its status, check latency and last error.
+"""
+import os
+import time
+import socket
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default readiness check settings
+DEFAULT_HEALTH_INTERVAL = float(os.getenv("ANGUS_HEALTH_INTERVAL", "10"))
+DEFAULT_HEALTH_TIMEOUT = float(os.getenv("ANGUS_HEALTH_TIMEOUT", "2"))
+
+def tcp_check(host: str, port: int, timeout: float = DEFAULT_HEALTH_TIMEOUT) -> Callable[[], None]:
+    """
+    Build a check that opens (and closes) a TCP connection.
+
+    Args:
+        host: Host to connect to
+        port: Port to connect to
+        timeout: Seconds to wait for the connection
+
+    Returns:
+        Callable: Function raising if the connection fails
+    """
+    def check():
+        socket.create_connection((host, port), timeout=timeout).close()
+
+    return check
+
+class HealthChecker:
+    """
+    Periodically runs dependency checks in a daemon thread and caches the
+    readiness report.
+
+    The service is ready once every critical check has passed in the most
+    recent round. Non-critical checks are reported but don't affect readiness.
+    Checks are expected to enforce their own timeouts.
+    """
+
+    def __init__(self, interval: float = DEFAULT_HEALTH_INTERVAL, timeout: float = DEFAULT_HEALTH_TIMEOUT):
+        """
+        Initialize the checker.
+
+        Args:
+            interval: Seconds between check rounds
+            timeout: Seconds each check is given, used to judge staleness
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self._checks: Dict[str, Tuple[Callable[[], Any], bool]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._ready = False
+        self._checked_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, check: Callable[[], Any], critical: bool = True):
+        """
+        Register a dependency check.
+
+        Args:
+            name: Dependency name used in the report
+            check: Function that raises if the dependency is unhealthy and
+                may return a dict of details to report
+            critical: Whether a failure makes the service not ready
+        """
+        self._checks[name] = (check, critical)
+
+    def _run_check(self, name: str, check: Callable[[], Any], critical: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = {"status": "up", "critical": critical}
+        try:
+            details = check()
+            if details:
+                result["details"] = details
+        except Exception as e:
+            result.update(status="down", error=str(e))
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        if result["status"] != self._results.get(name, {}).get("status", "up"):
+            logger.warning(f"Dependency '{name}' is now {result['status']}: {result.get('error', 'ok')}")
+        return result
+
+    def check_now(self):
+        """Run every check once and update the cached report."""
+        results = {name: self._run_check(name, check, critical) for name, (check, critical) in self._checks.items()}
+        self._results = results
+        self._ready = all(result["status"] == "up" for result in results.values() if result["critical"])
+        self._checked_at = time.time()
+
+    def _loop(self):
+        while True:
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.error(f"Readiness check round failed: {str(e)}")
+            time.sleep(self.interval)
+
+    def ensure_started(self):
+        """Start the checker thread in this process if it isn't running (e.g. after a fork)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._checked_at = None
+            self._thread = threading.Thread(target=self._loop, name="angus-health", daemon=True)
+            self._thread.start()
+
+    def _fresh(self) -> bool:
+        # A stalled checker must not keep reporting an old result
+        return self._checked_at is not None and time.time() - self._checked_at < self.interval * 3 + self.timeout
+
+    @property
+    def ready(self) -> bool:
+        """Whether the last, recent check round found every critical dependency up."""
+        return self._ready and self._fresh()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the cached readiness report.
+
+        Returns:
+            Dict: Overall status, when the checks last ran and per-dependency results
+        """
+        if self._checked_at is None:
+            status = "starting"
+        elif not self._fresh():
+            status = "stale"
+        else:
+            status = "ready" if self._ready else "not_ready"
+        return {
+            "status": status,
+            "checked_at": self._checked_at,
+            "age_s": round(time.time() - self._checked_at, 3) if self._checked_at else None,
+            "dependencies": self._results
+        }
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics
+
+This module instruments the Agent Angus Core Service with per-route request
+counts, in-flight gauges and latency histograms, and renders them for the
+/metrics endpoint. The angus-core -> coral-service hop is measured separately
+inside CoralProtocolClient.
+"""
+import os
+import time
+import logging
+
+from flask import Flask, Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond to the client read timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "angus_http_requests_total",
+    "HTTP requests handled by angus-core",
+    ["method", "route", "status"]
+)
+IN_FLIGHT = Gauge(
+    "angus_http_requests_in_flight",
+    "HTTP requests currently being handled by angus-core",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+LATENCY = Histogram(
+    "angus_http_request_duration_seconds",
+    "Time spent handling HTTP requests in angus-core",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+
+def _route() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_labels = (request.method, _route())
+    IN_FLIGHT.labels(*g.metrics_labels).inc()
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    labels = g.pop("metrics_labels", None)
+    if labels is None:
+        return
+    LATENCY.labels(*labels).observe(time.perf_counter() - g.pop("metrics_start"))
+    IN_FLIGHT.labels(*labels).dec()
+    REQUESTS.labels(*labels, str(g.pop("metrics_status", 500))).inc()
+
+def metrics_view():
+    """
+    Render all metrics in the Prometheus text format.
+    
+    Under a multi-worker server PROMETHEUS_MULTIPROC_DIR is set and the
+    metrics of all worker processes are aggregated.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+def init_app(app: Flask):
+    """
+    Instrument a Flask app and add its /metrics endpoint.
+
+    Args:
+        app: Flask application to instrument
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,127 @@
+"""Make the Agent Angus Core modules, and those it shares with coral-service, importable from the tests."""
+import os
+import sys
+import json
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+# Scripted response that closes the connection without answering
+_DROP = "drop"
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+class StubService:
+    """
+    Local keep-alive stand-in for the Coral Protocol Service.
+
+    Answers with the scripted responses in order, then with `default`, and
+    records every request with the client port it arrived on. Requests for
+    the paths in `unscripted` always get `default`. Given a socket path it
+    listens on that Unix domain socket instead of a TCP port, and records
+    the port as None.
+    """
+
+    def __init__(self, socket_path: str = None):
+        self.requests = []
+        self.responses = []
+        self.default = (200, {}, {"status": "success"})
+        self.unscripted = set()
+        self._lock = threading.Lock()
+        if socket_path:
+            self._server = _UnixHTTPServer(socket_path, self._handler())
+            self.url = f"unix://{socket_path}"
+        else:
+            self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+            self._server.daemon_threads = True
+            self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def reply(self, status: int = 200, body=None, headers=None):
+        """Queue a response; body is JSON-encoded unless it is bytes."""
+        self.responses.append((status, headers or {}, {"status": "success"} if body is None else body))
+
+    def drop(self):
+        """Queue closing the connection without answering."""
+        self.responses.append(_DROP)
+
+    def _next(self, request):
+        with self._lock:
+            self.requests.append(request)
+            if request["path"] in self.unscripted or not self.responses:
+                return self.default
+            return self.responses.pop(0)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length", 0))
+                response = stub._next({
+                    "method": self.command,
+                    "path": self.path,
+                    "headers": dict(self.headers),
+                    "body": self.rfile.read(length) if length else b"",
+                    "port": self.client_address[1] if isinstance(self.client_address, tuple) else None
+                })
+                if response == _DROP:
+                    self.close_connection = True
+                    return
+                status, headers, body = response
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **headers}
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)) if status != 304 else "0")
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def stub_service():
+    """A running StubService, shut down after the test."""
+    stub = StubService()
+    yield stub
+    stub.close()
+
+@pytest.fixture
+def angus_app(monkeypatch, stub_service):
+    """
+    The app module with its Coral Protocol Client pointed at the stub service.
+
+    The app's original client and proxy mode are restored after the test.
+    The readiness checker also uses the client, so the stub can receive
+    GET /live requests besides the test's own; they don't use up the
+    scripted responses.
+    """
+    monkeypatch.setenv("CORAL_SERVICE_URL", stub_service.url)
+    stub_service.unscripted.add("/live")
+    import app
+    from coral_client import CoralProtocolClient
+
+    monkeypatch.setattr(app, "coral_client", CoralProtocolClient(stub_service.url, max_retries=0, backoff_factor=0))
+    monkeypatch.setattr(app, "PROXY_MODE", app.PROXY_MODE)
+    yield app
+    app.coral_client.close()
@@ -0,0 +1,46 @@
+"""Tests for the Agent Angus Core Service's /coral routes."""
+import pytest
+
+def send(app, key="key-1"):
+    return app.app.test_client().post(
+        "/coral/send_message", json={"recipient": "agent_1", "content": "hello"}, headers={"Idempotency-Key": key}
+    )
+
+@pytest.mark.parametrize("status", [400, 409, 422])
+def test_key_rejections_are_passed_through(angus_app, stub_service, status):
+    stub_service.reply(status, {"status": "error", "reason": "idempotency_key", "message": "key reused"}, {"Retry-After": "1"})
+    response = send(angus_app)
+    assert response.status_code == status
+    assert response.get_json() == {"status": "error", "message": "key reused"}
+    assert response.headers["Retry-After"] == "1"
+    sent, = [request for request in stub_service.requests if request["path"] == "/messages/send"]
+    assert sent["headers"]["Idempotency-Key"] == "key-1"
+
+@pytest.mark.parametrize("body", [
+    {"detail": [{"loc": ["body", "content"], "msg": "field required"}]},
+    {"status": "error", "reason": "other", "message": "bad request"},
+    b"not json",
+])
+def test_other_client_errors_are_upstream_failures(angus_app, stub_service, body):
+    stub_service.reply(422, body)
+    response = send(angus_app)
+    assert response.status_code == 500
+    assert response.get_json()["message"].startswith("Failed to send message")
+
+def test_proxy_mode_forwards_the_body_without_decoding_it(angus_app, stub_service, monkeypatch):
+    monkeypatch.setattr(angus_app, "PROXY_MODE", True)
+    stub_service.reply(422, {"detail": [{"loc": ["body", "content"], "msg": "field required"}]})
+    body = b'{"recipient": "agent_1"}'
+    response = angus_app.app.test_client().post("/coral/send_message", data=body, headers={"Content-Type": "application/json"})
+    # coral-service's validation error is relayed as it is
+    assert response.status_code == 422
+    assert response.get_json()["detail"][0]["loc"] == ["body", "content"]
+    sent, = [request for request in stub_service.requests if request["path"] == "/messages/send"]
+    assert sent["body"] == body
+
+def test_proxy_mode_reports_an_unreachable_service(angus_app, stub_service, monkeypatch):
+    monkeypatch.setattr(angus_app, "PROXY_MODE", True)
+    stub_service.close()
+    response = angus_app.app.test_client().post("/coral/register", json={"agent_name": "agent_1"})
+    assert response.status_code == 500
+    assert response.get_json()["message"].startswith("Failed to register agent")
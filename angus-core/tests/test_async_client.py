@@ -0,0 +1,36 @@
+"""Tests for the asyncio Coral Protocol Client's fan-out helpers."""
+import asyncio
+
+from conftest import StubService
+from coral_client import AsyncCoralProtocolClient
+
+def test_health_checks_reach_each_instance(stub_service, tmp_path):
+    other = StubService()
+    other.reply(200, {"status": "success", "instance": "other"})
+    missing = f"unix://{tmp_path / 'missing.sock'}"
+
+    async def scenario():
+        # The client's own socket doesn't exist, so any check sent through it fails
+        async with AsyncCoralProtocolClient(missing, max_retries=0) as client:
+            return await client.health_check_many([stub_service.url, other.url, missing])
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        other.close()
+    assert results[stub_service.url] == {"status": "success", "result": {"status": "success"}}
+    assert results[other.url] == {"status": "success", "result": {"status": "success", "instance": "other"}}
+    assert results[missing]["status"] == "error"
+    assert [request["path"] for request in stub_service.requests + other.requests] == ["/", "/"]
+
+def test_send_many_reports_each_recipient(stub_service):
+    stub_service.reply(200, {"status": "success", "message_id": "m1"})
+    stub_service.reply(404, {"status": "error", "message": "unknown agent"})
+
+    async def scenario():
+        async with AsyncCoralProtocolClient(stub_service.url, backoff_factor=0) as client:
+            return await client.send_many(["agent_1", "agent_2"], "hello", concurrency=1)
+
+    results = asyncio.run(scenario())
+    assert results["agent_1"] == {"status": "success", "result": {"status": "success", "message_id": "m1"}}
+    assert results["agent_2"]["status"] == "error"
@@ -0,0 +1,147 @@
+"""Tests for the pooled Coral Protocol Client."""
+import gzip
+import json
+
+import msgpack
+import pytest
+import requests
+import urllib3.util.connection
+
+from coral_client import MSGPACK_ACCEPT, MSGPACK_MEDIA_TYPE, CoralProtocolClient, CoralServiceUnavailable
+
+def new_client(url: str, **kwargs) -> CoralProtocolClient:
+    kwargs.setdefault("max_retries", 2)
+    kwargs.setdefault("backoff_factor", 0)
+    kwargs.setdefault("read_timeout", 5)
+    return CoralProtocolClient(url, **kwargs)
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_gateway_errors_are_retried_for_reads(stub_service, status):
+    stub_service.reply(status)
+    stub_service.reply(status)
+    with new_client(stub_service.url) as client:
+        assert client.health_check() == {"status": "success"}
+    assert len(stub_service.requests) == 3
+
+def test_gateway_errors_are_not_retried_for_unkeyed_writes(stub_service):
+    stub_service.reply(502)
+    with new_client(stub_service.url) as client:
+        with pytest.raises(requests.HTTPError):
+            client.register_agent("agent_1")
+    assert len(stub_service.requests) == 1
+
+def test_keyed_writes_are_retried_with_the_same_key(stub_service):
+    stub_service.reply(502)
+    stub_service.drop()
+    with new_client(stub_service.url) as client:
+        assert client.send_message("agent_1", "hello") == {"status": "success"}
+    keys = {request["headers"]["Idempotency-Key"] for request in stub_service.requests}
+    assert len(stub_service.requests) == 3 and len(keys) == 1
+
+def test_dropped_connection_is_retried_for_reads_only(stub_service):
+    stub_service.drop()
+    with new_client(stub_service.url) as client:
+        assert client.health_check() == {"status": "success"}
+        stub_service.drop()
+        with pytest.raises(requests.ConnectionError):
+            client.register_agent("agent_1")
+    assert [request["method"] for request in stub_service.requests] == ["GET", "GET", "POST"]
+
+def test_refused_connections_are_retried_once_per_attempt(monkeypatch, stub_service):
+    attempts = []
+    create_connection = urllib3.util.connection.create_connection
+
+    def counting_create_connection(*args, **kwargs):
+        attempts.append(1)
+        return create_connection(*args, **kwargs)
+
+    monkeypatch.setattr(urllib3.util.connection, "create_connection", counting_create_connection)
+    url = stub_service.url
+    stub_service.close()
+    with new_client(url) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.send_message("agent_1", "hello")
+    # The session's Retry handles refused connections; the keyed-request loop doesn't retry them again
+    assert len(attempts) == 3
+
+@pytest.mark.parametrize("status", [400, 404, 409, 422])
+def test_client_errors_are_not_retried(stub_service, status):
+    stub_service.reply(status, {"status": "error", "message": "rejected"})
+    with new_client(stub_service.url) as client:
+        with pytest.raises(requests.HTTPError) as e:
+            client.send_message("agent_1", "hello")
+    assert e.value.response.status_code == status
+    assert len(stub_service.requests) == 1
+
+def test_shed_load_is_raised_with_retry_after(stub_service):
+    stub_service.reply(503, {"status": "error", "message": "overloaded"}, {"Retry-After": "7"})
+    with new_client(stub_service.url) as client:
+        with pytest.raises(CoralServiceUnavailable) as e:
+            client.health_check()
+    assert e.value.retry_after == 7
+    assert len(stub_service.requests) == 1
+
+def test_requests_reuse_one_pooled_connection(stub_service):
+    with new_client(stub_service.url) as client:
+        for _ in range(5):
+            client.health_check()
+        client.register_agent("agent_1")
+        stats = client.pool_stats()
+    assert len({request["port"] for request in stub_service.requests}) == 1
+    assert [host["connections_opened"] for host in stats["hosts"].values()] == [1]
+
+def test_agent_list_is_revalidated_with_its_etag(stub_service):
+    agents = {"status": "success", "agents": [{"name": "agent_1", "capabilities": []}]}
+    stub_service.reply(200, agents, {"ETag": '"v1-d-json"'})
+    stub_service.reply(304, b"", {"ETag": '"v1-d-json"'})
+    stub_service.reply(200, {"status": "success", "agents": []}, {"ETag": '"v2-d-json"'})
+    with new_client(stub_service.url) as client:
+        first = client.list_agents()
+        second = client.list_agents()
+        third = client.list_agents()
+    assert first == second == agents
+    assert third["agents"] == []
+    assert [request["headers"].get("If-None-Match") for request in stub_service.requests] == [None, '"v1-d-json"', '"v1-d-json"']
+
+def test_agent_list_etags_are_kept_per_level_of_detail(stub_service):
+    stub_service.reply(200, {"status": "success", "agents": ["agent_1"]}, {"ETag": '"v1-n-json"'})
+    with new_client(stub_service.url) as client:
+        client.list_agents(include_details=False)
+        client.list_agents(include_details=True)
+    assert "If-None-Match" not in stub_service.requests[1]["headers"]
+
+def test_default_accept_encoding_is_the_http_librarys(stub_service):
+    body = json.dumps({"status": "success", "padding": "x" * 4096}).encode("utf-8")
+    stub_service.reply(200, gzip.compress(body), {"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    with new_client(stub_service.url) as client:
+        assert client.health_check()["padding"] == "x" * 4096
+    with new_client(stub_service.url, compression="none") as client:
+        client.health_check()
+    assert "gzip" in stub_service.requests[0]["headers"]["Accept-Encoding"]
+    assert stub_service.requests[1]["headers"]["Accept-Encoding"] == "identity"
+
+def test_msgpack_bodies_are_sent_once_the_service_answers_in_msgpack(stub_service):
+    stub_service.reply(200, {"status": "success"})
+    stub_service.reply(200, msgpack.packb({"status": "success", "agents": ["agent_1"]}), {"Content-Type": MSGPACK_MEDIA_TYPE})
+    with new_client(stub_service.url, wire_format="msgpack") as client:
+        client.send_message("agent_1", "before")
+        assert client.list_agents(include_details=False)["agents"] == ["agent_1"]
+        client.send_message("agent_1", "after")
+    before, listed, after = stub_service.requests
+    assert all(request["headers"]["Accept"] == MSGPACK_ACCEPT for request in stub_service.requests)
+    # A service that has only answered in JSON might not read MessagePack
+    assert before["headers"]["Content-Type"] == "application/json"
+    assert json.loads(before["body"])["content"] == "before"
+    assert after["headers"]["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(after["body"], raw=False)["content"] == "after"
+
+def test_json_wire_format_never_asks_for_msgpack(stub_service):
+    with new_client(stub_service.url) as client:
+        client.send_message("agent_1", "hello")
+    sent, = stub_service.requests
+    assert "msgpack" not in sent["headers"].get("Accept", "")
+    assert sent["headers"]["Content-Type"] == "application/json"
+
+def test_unknown_wire_format_is_rejected():
+    with pytest.raises(ValueError):
+        CoralProtocolClient("http://coral-service:8001", wire_format="xml")
@@ -0,0 +1,76 @@
+"""Tests for the cached readiness checks and the /live and /ready probes."""
+import socket
+import time
+
+import pytest
+
+from health import HealthChecker, tcp_check
+
+def up():
+    return {"pool": "ok"}
+
+def down():
+    raise ConnectionError("connection refused")
+
+def test_critical_failures_make_the_service_not_ready():
+    checker = HealthChecker()
+    checker.add("coral_service", down)
+    checker.add("postgres", up, critical=False)
+    assert checker.report()["status"] == "starting"
+    checker.check_now()
+    report = checker.report()
+    assert not checker.ready and report["status"] == "not_ready"
+    assert (report["dependencies"]["coral_service"]["status"], report["dependencies"]["coral_service"]["error"]) == ("down", "connection refused")
+    assert report["dependencies"]["postgres"]["details"] == {"pool": "ok"}
+
+def test_non_critical_failures_do_not_affect_readiness():
+    checker = HealthChecker()
+    checker.add("coral_service", up)
+    checker.add("postgres", down, critical=False)
+    checker.check_now()
+    assert checker.ready and checker.report()["status"] == "ready"
+
+def test_old_results_are_reported_stale():
+    checker = HealthChecker(interval=1, timeout=1)
+    checker.add("coral_service", up)
+    checker.check_now()
+    checker._checked_at = time.time() - 5
+    assert not checker.ready and checker.report()["status"] == "stale"
+
+def test_checker_thread_runs_the_checks():
+    checker = HealthChecker(interval=0.01)
+    checker.add("coral_service", up)
+    checker.ensure_started()
+    thread = checker._thread
+    checker.ensure_started()
+    deadline = time.time() + 2
+    while not checker.ready and time.time() < deadline:
+        time.sleep(0.01)
+    assert checker.ready
+    # Started once per process
+    assert checker._thread is thread
+
+def test_tcp_check_connects_to_a_listening_port():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    tcp_check("127.0.0.1", port, timeout=1)()
+    listener.close()
+    with pytest.raises(OSError):
+        tcp_check("127.0.0.1", port, timeout=1)()
+
+def test_probes(angus_app, stub_service):
+    client = angus_app.app.test_client()
+    angus_app.health.check_now()
+    ready = client.get("/ready")
+    stub_service.default = (500, {}, {"status": "error", "message": "unavailable"})
+    angus_app.health.check_now()
+    not_ready = client.get("/ready")
+    live = client.get("/live")
+    assert (ready.status_code, ready.get_json()["status"]) == (200, "ready")
+    assert "pool" in ready.get_json()["dependencies"]["coral_service"]["details"]
+    assert (not_ready.status_code, not_ready.get_json()["status"]) == (503, "not_ready")
+    assert not_ready.get_json()["dependencies"]["coral_service"]["status"] == "down"
+    # Liveness doesn't depend on the checks
+    assert (live.status_code, live.get_json()) == (200, {"status": "ok"})
@@ -0,0 +1,38 @@
+"""Tests for trace propagation from Agent Angus Core to the Coral Protocol Service."""
+import pytest
+
+import tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Record this process's spans in memory for one test."""
+    exporter = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing.tracer, "exporter", exporter)
+    return exporter
+
+def upstream_traceparents(stub_service):
+    return [request["headers"].get("traceparent") for request in stub_service.requests if request["path"] != "/live"]
+
+def test_incoming_trace_is_continued_upstream(angus_app, stub_service, exporter):
+    response = angus_app.app.test_client().get("/coral/health", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert response.status_code == 200
+    client, server = exporter.spans(TRACE_ID)
+    assert (server["name"], server["kind"], server["parent_span_id"]) == ("GET /coral/health", "server", PARENT_ID)
+    assert (client["kind"], client["parent_span_id"]) == ("client", server["span_id"])
+    assert server["attributes"]["http.status_code"] == 200
+    # The service sees the client span as its caller
+    assert upstream_traceparents(stub_service) == [f"00-{TRACE_ID}-{client['span_id']}-01"]
+
+def test_unsampled_trace_is_propagated_but_not_recorded(angus_app, stub_service, exporter):
+    angus_app.app.test_client().get("/coral/health", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    traceparent, = upstream_traceparents(stub_service)
+    assert traceparent.startswith(f"00-{TRACE_ID}-") and traceparent.endswith("-00")
+    assert exporter.spans() == []
+
+def test_no_header_is_sent_with_tracing_off(angus_app, stub_service, monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "exporter", None)
+    angus_app.app.test_client().get("/coral/health", headers={"traceparent": "invalid"})
+    assert upstream_traceparents(stub_service) == [None]
@@ -0,0 +1,56 @@
+"""Tests for reaching the Coral Protocol Service over a Unix domain socket."""
+import asyncio
+import os
+import shutil
+import tempfile
+
+import pytest
+import requests
+
+from conftest import StubService
+from coral_client import UNIX_SOCKET_BASE_URL, AsyncCoralProtocolClient, CoralProtocolClient, split_base_url
+
+@pytest.fixture
+def unix_stub():
+    """A StubService on a Unix domain socket, in a short temporary path so it fits the socket path limit."""
+    directory = tempfile.mkdtemp(prefix="angus-")
+    stub = StubService(os.path.join(directory, "coral.sock"))
+    yield stub
+    stub.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+def test_split_base_url():
+    assert split_base_url("unix:///run/coral/coral.sock") == (UNIX_SOCKET_BASE_URL, "/run/coral/coral.sock")
+    assert split_base_url("http://coral-service:8001/") == ("http://coral-service:8001", None)
+
+def test_requests_share_one_socket_connection(unix_stub):
+    unix_stub.reply(200, {"status": "success", "agents": []})
+    with CoralProtocolClient(unix_stub.url, max_retries=0) as client:
+        assert client.list_agents(include_details=False) == {"status": "success", "agents": []}
+        for _ in range(3):
+            client.health_check()
+        client.send_message("agent_1", "hello")
+        stats = client.pool_stats()
+    socket_path = split_base_url(unix_stub.url)[1]
+    assert stats["hosts"] == {socket_path: {"connections_opened": 1, "idle": 1}}
+    assert [request["method"] for request in unix_stub.requests] == ["GET", "GET", "GET", "GET", "POST"]
+    assert unix_stub.requests[-1]["path"] == "/messages/send"
+    assert all(request["port"] is None for request in unix_stub.requests)
+
+def test_missing_socket_is_a_connection_error(tmp_path):
+    with CoralProtocolClient(f"unix://{tmp_path / 'missing.sock'}", max_retries=0) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.health_check()
+
+def test_async_client_uses_the_socket(unix_stub):
+    unix_stub.reply(200, {"status": "success", "message_id": "m1"})
+
+    async def scenario():
+        async with AsyncCoralProtocolClient(unix_stub.url, max_retries=0) as client:
+            return await client.send_message("agent_1", "hello"), await client.health_check()
+
+    sent, health = asyncio.run(scenario())
+    assert sent == {"status": "success", "message_id": "m1"}
+    assert health == {"status": "success"}
+    assert [request["path"] for request in unix_stub.requests] == ["/messages/send", "/"]
+    assert unix_stub.requests[0]["headers"]["Host"] == "coral-service"
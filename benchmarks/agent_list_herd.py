@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Thundering-herd benchmark for agent list coalescing
+
+This script empties the agent list cache (as a deploy or a registration
+does), then sends a burst of concurrent /agents/list requests, and counts the
+upstream list_agents calls they cause. Each burst is run with the cache's
+single-flight loads and with them replaced by a pass-through, so the report
+shows the upstream calls saved and the effect on request latency. The service
+runs in-process against the fake Coral Protocol Client.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+import httpx
+
+# Make the coral-service modules importable, keeping the service's queue database out of the tree
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+os.environ.setdefault("CORAL_QUEUE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="coral-herd-"), "coral_queue.db"))
+
+import app as service
+import fake_coral
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+class PassThrough:
+    """Stand-in for SingleFlight that issues every call."""
+
+    async def do(self, key, func, *args, **kwargs):
+        return await func(*args, **kwargs)
+
+    def forget(self, key):
+        pass
+
+async def burst(client: httpx.AsyncClient, fake: fake_coral.FakeCoralProtocolClient, concurrency: int) -> Dict[str, Any]:
+    """Empty the cache and send `concurrency` simultaneous agent list requests."""
+    service.agent_cache.invalidate()
+    calls_before = fake.calls.get("list_agents", 0)
+    latencies: List[float] = []
+
+    async def list_agents():
+        started = time.perf_counter()
+        response = await client.get("/agents/list")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(list_agents() for _ in range(concurrency)))
+    return {
+        "wall_clock_s": time.perf_counter() - started,
+        "upstream_calls": fake.calls.get("list_agents", 0) - calls_before,
+        "latencies": latencies
+    }
+
+async def run(args) -> Dict[str, Any]:
+    """Run the bursts with and without coalescing."""
+    fake = fake_coral.install(
+        service,
+        latency=args.latency,
+        agents=[fake_coral.Agent(f"agent_{i}", ["benchmark"]) for i in range(args.agents)]
+    )
+    coalescing = service.agent_cache.loads
+    modes = {"coalesced": coalescing, "uncoalesced": PassThrough()}
+    results: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in modes}
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coral-service", timeout=None) as client:
+        # Alternate the modes so both see the same conditions
+        for _ in range(args.bursts):
+            for mode, reads in modes.items():
+                service.agent_cache.loads = reads
+                results[mode].append(await burst(client, fake, args.concurrency))
+    service.agent_cache.loads = coalescing
+
+    report = {}
+    for mode, bursts in results.items():
+        latencies = sorted(latency for result in bursts for latency in result["latencies"])
+        report[mode] = {
+            "upstream_calls_per_burst": statistics.mean(result["upstream_calls"] for result in bursts),
+            "wall_clock_ms": round(statistics.median(result["wall_clock_s"] for result in bursts) * 1000, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1)
+        }
+    issued = report["coalesced"]["upstream_calls_per_burst"]
+    uncoalesced = report["uncoalesced"]["upstream_calls_per_burst"]
+    return {
+        "concurrent_requests": args.concurrency,
+        "bursts": args.bursts,
+        "upstream_latency_s": args.latency,
+        "agents": args.agents,
+        "results": report,
+        "upstream_calls_saved_per_burst": uncoalesced - issued,
+        "coalescing": coalescing.stats()
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure upstream calls saved by coalescing agent list reads")
+    parser.add_argument("--concurrency", type=int, default=200, help="Simultaneous requests per burst")
+    parser.add_argument("--bursts", type=int, default=5, help="Bursts per mode")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds each upstream call takes")
+    parser.add_argument("--agents", type=int, default=1000, help="Agents returned by the fake Coral server")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    # Fail if a burst still cost more than one upstream call
+    sys.exit(0 if report["results"]["coalesced"]["upstream_calls_per_burst"] <= 1 else 1)
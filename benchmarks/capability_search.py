@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the capability index behind /agents/search
+
+For each agent count this script builds a synthetic agent list (capabilities
+drawn from a skewed vocabulary, so a few are very common and most are rare)
+and measures:
+
+    build    time to rebuild the index from the full list
+    upsert   time to register one agent into the built index
+    search   latency of one page of results for single-capability, match=all
+             and match=any queries, against a linear scan of the agent list
+             (what a caller filtering the /agents/list response does)
+
+Use --output to keep the JSON report for comparison across commits.
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List
+
+# Make the coral-service modules importable
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+
+from capability_index import MATCH_ALL, MATCH_ANY, CapabilityIndex
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+def make_agents(count: int, vocabulary: int, per_agent: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Synthetic agents whose capabilities follow a Zipf-like distribution."""
+    rng = random.Random(seed)
+    capabilities = [f"capability_{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    agents = []
+    for i in range(count):
+        chosen = set(rng.choices(capabilities, weights=weights, k=per_agent))
+        agents.append({"name": f"agent_{i:07d}", "capabilities": sorted(chosen)})
+    rng.shuffle(agents)
+    return agents
+
+def linear_search(agents: List[Dict[str, Any]], capabilities: List[str], match: str, limit: int) -> List[str]:
+    """Filter the full agent list, as a client of /agents/list would."""
+    wanted = set(capabilities)
+    if match == MATCH_ALL:
+        names = [agent["name"] for agent in agents if wanted.issubset(agent["capabilities"])]
+    else:
+        names = [agent["name"] for agent in agents if not wanted.isdisjoint(agent["capabilities"])]
+    return sorted(names)[:limit]
+
+def time_calls(call: Callable[[], Any], runs: int) -> Dict[str, float]:
+    """Median and p99 latency of repeated calls, in microseconds."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6, 1)
+    }
+
+def run(count: int, args) -> Dict[str, Any]:
+    """Benchmark the index at one agent count."""
+    agents = make_agents(count, args.vocabulary, args.per_agent)
+    index = CapabilityIndex()
+
+    started = time.perf_counter()
+    index.replace(agents)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    upserts = iter(range(args.runs))
+    upsert = time_calls(lambda: index.upsert(f"agent_new_{next(upserts)}", ["capability_0", "capability_7"]), args.runs)
+    index.replace(agents)
+
+    queries = {
+        "common": (["capability_0"], MATCH_ALL),
+        "rare": ([f"capability_{args.vocabulary - 1}"], MATCH_ALL),
+        "all": (["capability_0", "capability_1", "capability_2"], MATCH_ALL),
+        "any": (["capability_3", "capability_4", "capability_5"], MATCH_ANY)
+    }
+    search = {}
+    for label, (capabilities, match) in queries.items():
+        names, _ = index.search(capabilities, match=match, limit=args.limit)
+        if names != linear_search(agents, capabilities, match, args.limit):
+            raise AssertionError(f"Index and linear scan disagree for the '{label}' query")
+        search[label] = {
+            "matches_on_page": len(names),
+            "index": time_calls(lambda: index.search(capabilities, match=match, limit=args.limit), args.runs),
+            "linear_scan": time_calls(lambda: linear_search(agents, capabilities, match, args.limit), max(5, args.runs // 50))
+        }
+        search[label]["speedup"] = round(search[label]["linear_scan"]["median_us"] / max(search[label]["index"]["median_us"], 0.1), 1)
+
+    return {"agents": count, "build_ms": round(build_ms, 1), "upsert": upsert, "search": search}
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the agent capability index")
+    parser.add_argument("--agents", type=int, nargs="+", default=[10000, 100000], help="Agent counts to test")
+    parser.add_argument("--vocabulary", type=int, default=500, help="Number of distinct capabilities")
+    parser.add_argument("--per-agent", type=int, default=4, help="Capabilities drawn per agent")
+    parser.add_argument("--limit", type=int, default=100, help="Page size of each search")
+    parser.add_argument("--runs", type=int, default=1000, help="Timed calls per measurement")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = {"python": sys.version.split()[0], "results": [run(count, args) for count in args.agents]}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Coral Protocol Service
+
+This script measures, in fresh interpreter processes:
+
+    import   time to import the app module, with a `-X importtime` profile of
+             the slowest top-level imports
+    ready    time from launching uvicorn until /live answers
+
+Use --max-import-ms / --max-ready-ms to fail when cold start regresses, and
+--output to keep the JSON report for comparison across commits.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+import httpx
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# The coral-service app is imported and started from its own directory
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+
+def free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def parse_importtime(stderr: str, depth: int = 1) -> List[Dict[str, Any]]:
+    """
+    Imports at one nesting depth of `-X importtime` output, slowest first.
+
+    Depth 1 is the modules imported directly by app.py (and by the
+    interpreter's own top-level imports, which are cheap).
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Each nesting level is indented by two more spaces
+        if (len(name) - len(name.lstrip()) - 1) // 2 == depth:
+            imports.append({"module": name.strip(), "cumulative_ms": round(int(cumulative_us) / 1000, 3)})
+    return sorted(imports, key=lambda item: item["cumulative_ms"], reverse=True)
+
+def measure_import(env: Dict[str, str]) -> Dict[str, Any]:
+    """Import the app module in a fresh interpreter and profile its imports."""
+    code = "import time; started = time.perf_counter(); import app; print(time.perf_counter() - started)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return {
+        "seconds": float(result.stdout.strip().splitlines()[-1]),
+        "slowest_imports": parse_importtime(result.stderr)[:15]
+    }
+
+def measure_ready(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """Launch the service under uvicorn and time until /live answers."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/live", timeout=1.0).raise_for_status()
+                return time.perf_counter() - started
+            except Exception:
+                if process.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError("Service did not become live")
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Median, minimum and maximum of samples in seconds, reported in milliseconds."""
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1)
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the Coral Protocol Service")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--max-ready-ms", type=float, help="Fail if the median time to /live exceeds this")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    env = dict(os.environ, CORAL_QUEUE_DB_PATH=os.path.join(tempfile.mkdtemp(prefix="coral-startup-"), "coral_queue.db"))
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    ready = [measure_ready(env) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import": {
+            **summarize([run["seconds"] for run in imports]),
+            "slowest_imports": imports[-1]["slowest_imports"]
+        },
+        "ready": summarize(ready)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    failed = (
+        (args.max_import_ms is not None and report["import"]["median_ms"] > args.max_import_ms)
+        or (args.max_ready_ms is not None and report["ready"]["median_ms"] > args.max_ready_ms)
+    )
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Coral Protocol Client connection pool
+
+This script starts a local stub of the Coral Protocol Service and measures
+requests/sec for the old per-call `requests.get` behaviour against the pooled
+CoralProtocolClient, using the same number of worker threads for both.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Make the angus-core modules importable
+ANGUS_CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "angus-core")
+sys.path.insert(0, ANGUS_CORE_DIR)
+
+from coral_client import CoralProtocolClient
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+class StubCoralServiceHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive stand-in for the Coral Protocol Service."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._reply({"status": "ok", "message": "Coral Protocol Service is running"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._reply({"status": "success", "message": "ok"})
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_service():
+    """Start the stub service on a free local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCoralServiceHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def run_unpooled(base_url, total_requests, concurrency):
+    """Issue requests the way the client did before pooling."""
+    def call(_):
+        response = requests.get(f"{base_url}/")
+        response.raise_for_status()
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(total_requests)))
+
+def run_pooled(base_url, total_requests, concurrency):
+    """Issue requests through a single shared pooled client."""
+    with CoralProtocolClient(base_url, pool_size=concurrency) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: client.health_check(), range(total_requests)))
+
+def measure(name, runner, base_url, total_requests, concurrency):
+    """Time a runner and return its throughput."""
+    started = time.perf_counter()
+    runner(base_url, total_requests, concurrency)
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": name,
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total_requests / elapsed, 1)
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the Coral Protocol Client connection pool")
+    parser.add_argument("--requests", type=int, default=2000, help="Number of requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of worker threads")
+    parser.add_argument("--url", default=None, help="Benchmark a running service instead of the local stub")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = start_stub_service()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = [
+        measure("unpooled", run_unpooled, base_url, args.requests, args.concurrency),
+        measure("pooled", run_pooled, base_url, args.requests, args.concurrency),
+    ]
+    results.append({
+        "speedup": round(results[1]["requests_per_second"] / results[0]["requests_per_second"], 2)
+    })
+    print(json.dumps(results, indent=2))
+
+    if server:
+        server.shutdown()
+    sys.exit(0)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Fake Coral Protocol Client
+
+This module provides an in-process stand-in for the upstream Coral Protocol
+client and its models, with configurable latency and error injection. It is
+used by the benchmark scripts and coral-service's tests so the service can be
+exercised without a Coral server or the LangChain dependencies.
+"""
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Agent:
+    """Stand-in for langchain_mcp_adapters.coral_protocol.models.Agent."""
+
+    def __init__(self, name: str, capabilities: Optional[List[str]] = None):
+        self.name = name
+        self.capabilities = capabilities or []
+
+class Thread:
+    """Stand-in for langchain_mcp_adapters.coral_protocol.models.Thread."""
+
+    def __init__(self, id: str, participants: List[str]):
+        self.id = id
+        self.participants = participants
+
+class HumanMessage:
+    """Stand-in for langchain_core.messages.HumanMessage."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+class UpstreamError(Exception):
+    """Injected upstream failure."""
+
+class FakeCoralProtocolClient:
+    """
+    Synchronous fake of the upstream Coral Protocol client.
+
+    Every call sleeps for `latency` seconds (blocking, like the real client)
+    and fails with probability `error_rate`.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, agents: Optional[List[Agent]] = None):
+        """
+        Initialize the fake client.
+
+        Args:
+            latency: Seconds each upstream call takes
+            error_rate: Probability (0-1) that a call raises UpstreamError
+            agents: Agents registered up front
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls: Dict[str, int] = {}
+        self._agents = {agent.name: agent for agent in (agents or [])}
+        self._threads: Dict[str, Thread] = {}
+        self._inbound: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _simulate(self, operation: str):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise UpstreamError(f"Injected failure in {operation}")
+
+    def register_agent(self, agent: Agent):
+        self._simulate("register_agent")
+        with self._lock:
+            self._agents[agent.name] = agent
+
+    def send_message(self, recipient: str, message: Any, thread_id: Optional[str] = None):
+        self._simulate("send_message")
+        self._inbound.put({
+            "recipient": recipient,
+            "content": getattr(message, "content", message),
+            "thread_id": thread_id
+        })
+
+    def list_agents(self) -> List[Agent]:
+        self._simulate("list_agents")
+        with self._lock:
+            return list(self._agents.values())
+
+    def create_thread(self, thread: Thread):
+        self._simulate("create_thread")
+        with self._lock:
+            self._threads[thread.id] = thread
+
+    def stream_messages(self) -> Iterator[Dict[str, Any]]:
+        """Yield every sent message, as the upstream SSE stream would deliver it."""
+        while True:
+            yield self._inbound.get()
+
+def install(app_module, latency: float = 0.0, error_rate: float = 0.0, agents: Optional[List[Agent]] = None) -> FakeCoralProtocolClient:
+    """
+    Replace the upstream client and models of the coral-service app module.
+
+    Args:
+        app_module: The imported coral-service `app` module
+        latency: Seconds each upstream call takes
+        error_rate: Probability (0-1) that a call fails
+        agents: Agents registered up front
+
+    Returns:
+        FakeCoralProtocolClient: The installed fake client
+    """
+    client = FakeCoralProtocolClient(latency=latency, error_rate=error_rate, agents=agents)
+    app_module.coral_client = client
+    app_module.Agent = Agent
+    app_module.Thread = Thread
+    app_module.HumanMessage = HumanMessage
+    app_module.message_hub.source = client.stream_messages
+    logger.info(f"Installed fake Coral Protocol Client (latency={latency}s, error_rate={error_rate})")
+    return client
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Coral Protocol Service app module for benchmarks under gunicorn
+
+Importing this module loads the Coral Protocol Service with the fake
+in-process Coral Protocol Client installed, so it can be served by gunicorn
+without a Coral server or the LangChain dependencies:
+
+    gunicorn -c coral-service/gunicorn.conf.py --pythonpath benchmarks fake_coral_app:app
+
+The fake upstream is configured from the environment:
+
+    BENCH_UPSTREAM_LATENCY     seconds each upstream call takes (default 0)
+    BENCH_UPSTREAM_ERROR_RATE  probability (0-1) that an upstream call fails (default 0)
+    BENCH_AGENTS               number of agents registered up front (default 100)
+"""
+import os
+import sys
+
+# Make the coral-service modules importable
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+
+import app as service
+import fake_coral
+
+agents = [
+    fake_coral.Agent(f"agent_{i}", [f"capability_{i % 10}", f"capability_{i % 7}"])
+    for i in range(int(os.getenv("BENCH_AGENTS", "100")))
+]
+fake_coral.install(
+    service,
+    latency=float(os.getenv("BENCH_UPSTREAM_LATENCY", "0")),
+    error_rate=float(os.getenv("BENCH_UPSTREAM_ERROR_RATE", "0")),
+    agents=agents
+)
+
+app = service.app
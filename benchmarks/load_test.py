@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for Agent Angus Core and the Coral Protocol Service
+
+This script starts both services locally, with coral-service running against
+the fake in-process Coral Protocol Client (configurable latency and error
+injection), then drives every route at a configurable concurrency. For each
+route it reports throughput and p50/p95/p99 latency as seen by the client and
+per hop, using the latency histograms both services expose on /metrics:
+
+    angus_core         request handling in angus-core
+    angus_to_coral     angus-core -> coral-service calls (CoralProtocolClient)
+    coral_service      request handling in coral-service
+    coral_to_upstream  coral-service -> Coral server calls
+
+The report is JSON so runs can be compared across commits with --baseline.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 20 --requests 500 --output run.json
+    python benchmarks/load_test.py --baseline run.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Hop name -> (service, histogram name)
+HOP_METRICS = {
+    "angus_core": ("angus-core", "angus_http_request_duration_seconds"),
+    "angus_to_coral": ("angus-core", "coral_client_request_duration_seconds"),
+    "coral_service": ("coral-service", "coral_http_request_duration_seconds"),
+    "coral_to_upstream": ("coral-service", "coral_upstream_call_duration_seconds"),
+}
+
+def _agent(i: int) -> str:
+    return f"agent_{i % 100}"
+
+# (service, method, path, request builder taking the request number)
+ROUTES: List[tuple] = [
+    ("angus-core", "GET", "/coral/health", lambda i: {}),
+    ("angus-core", "POST", "/coral/register", lambda i: {"json": {"agent_name": f"bench_{i}", "capabilities": ["benchmark"]}}),
+    ("angus-core", "POST", "/coral/send_message", lambda i: {"json": {"recipient": _agent(i), "content": "benchmark"}}),
+    ("angus-core", "GET", "/coral/list_agents", lambda i: {}),
+    ("angus-core", "POST", "/coral/create_thread", lambda i: {"json": {"participants": [_agent(i), _agent(i + 1), _agent(i + 2)], "initial_message": "benchmark"}}),
+    ("angus-core", "POST", "/coral/register_batch", lambda i: {"json": {"agents": [{"agent_name": f"bench_{i}_{j}"} for j in range(10)]}}),
+    ("angus-core", "POST", "/coral/send_batch", lambda i: {"json": {"messages": [{"recipient": _agent(i + j), "content": "benchmark"} for j in range(10)]}}),
+    ("coral-service", "GET", "/", lambda i: {}),
+    ("coral-service", "POST", "/agents/register", lambda i: {"json": {"agent_name": f"bench_{i}", "capabilities": ["benchmark"]}}),
+    ("coral-service", "POST", "/messages/send", lambda i: {"json": {"recipient": _agent(i), "content": "benchmark"}}),
+    ("coral-service", "POST", "/messages/send", lambda i: {"json": {"recipient": _agent(i), "content": "benchmark", "delivery": "queued"}}),
+    ("coral-service", "GET", "/agents/list", lambda i: {}),
+    ("coral-service", "POST", "/threads/create", lambda i: {"json": {"participants": [_agent(i), _agent(i + 1), _agent(i + 2)], "initial_message": "benchmark"}}),
+    ("coral-service", "POST", "/agents/register_batch", lambda i: {"json": {"agents": [{"agent_name": f"bench_{i}_{j}"} for j in range(10)]}}),
+    ("coral-service", "POST", "/messages/send_batch", lambda i: {"json": {"messages": [{"recipient": _agent(i + j), "content": "benchmark"} for j in range(10)]}}),
+]
+
+def free_port() -> int:
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 of latencies in seconds, reported in milliseconds."""
+    values = sorted(values)
+
+    def pick(fraction):
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+        return round(values[index] * 1000, 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+def parse_histograms(text: str) -> Dict[str, Dict[float, float]]:
+    """Sum cumulative histogram buckets per metric across labels, ignoring /metrics scrapes."""
+    histograms: Dict[str, Dict[float, float]] = {}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if not sample.name.endswith("_bucket") or sample.labels.get("route") == "/metrics":
+                continue
+            buckets = histograms.setdefault(sample.name[:-len("_bucket")], {})
+            bound = float(sample.labels["le"])
+            buckets[bound] = buckets.get(bound, 0.0) + sample.value
+    return histograms
+
+def histogram_percentiles(before: Dict[float, float], after: Dict[float, float]) -> Dict[str, Any]:
+    """Estimate p50/p95/p99 in milliseconds from the bucket counts added between two scrapes."""
+    bounds = sorted(after)
+    counts = [after[bound] - before.get(bound, 0.0) for bound in bounds]
+    total = counts[-1] if counts else 0.0
+    result: Dict[str, Any] = {"count": int(total)}
+    for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        if not total:
+            result[name] = None
+            continue
+        target = fraction * total
+        lower_bound, lower_count = 0.0, 0.0
+        for bound, count in zip(bounds, counts):
+            if count >= target:
+                if bound == float("inf"):
+                    estimate = lower_bound
+                else:
+                    span = count - lower_count
+                    estimate = lower_bound + (bound - lower_bound) * ((target - lower_count) / span if span else 1.0)
+                result[name] = round(estimate * 1000, 3)
+                break
+            lower_bound, lower_count = bound, count
+    return result
+
+class Services:
+    """Starts and stops both services as subprocesses."""
+
+    def __init__(self, latency: float, error_rate: float, agents: int):
+        self.coral_port = free_port()
+        self.angus_port = free_port()
+        self.urls = {
+            "coral-service": f"http://127.0.0.1:{self.coral_port}",
+            "angus-core": f"http://127.0.0.1:{self.angus_port}",
+        }
+        self.data_dir = tempfile.mkdtemp(prefix="angus-bench-")
+        env = dict(os.environ, CORAL_QUEUE_DB_PATH=os.path.join(self.data_dir, "coral_queue.db"))
+        self.processes = [
+            subprocess.Popen(
+                [sys.executable, os.path.join(ROOT_DIR, "benchmarks", "run_coral_service.py"),
+                 "--port", str(self.coral_port), "--latency", str(latency),
+                 "--error-rate", str(error_rate), "--agents", str(agents)],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ),
+            subprocess.Popen(
+                [sys.executable, "app.py"],
+                cwd=os.path.join(ROOT_DIR, "angus-core"),
+                env=dict(env, PORT=str(self.angus_port), CORAL_SERVICE_URL=self.urls["coral-service"]),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ),
+        ]
+
+    def wait_until_ready(self, timeout: float = 30.0):
+        """Wait for both services to answer their health checks."""
+        deadline = time.time() + timeout
+        for url in self.urls.values():
+            while True:
+                try:
+                    httpx.get(f"{url}/", timeout=1.0).raise_for_status()
+                    break
+                except Exception:
+                    if time.time() > deadline:
+                        raise RuntimeError(f"Service at {url} did not start")
+                    time.sleep(0.2)
+
+    def stop(self):
+        """Terminate both services."""
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+async def scrape(client: httpx.AsyncClient, urls: Dict[str, str]) -> Dict[str, Dict[str, Dict[float, float]]]:
+    """Fetch the histograms of both services."""
+    result = {}
+    for service, url in urls.items():
+        response = await client.get(f"{url}/metrics")
+        result[service] = parse_histograms(response.text)
+    return result
+
+async def drive_route(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str,
+    path: str,
+    build: Callable[[int], Dict[str, Any]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Send `requests` requests to one route with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, f"{url}{path}", **build(i))
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": percentiles(latencies),
+    }
+
+async def run_benchmark(urls: Dict[str, str], requests: int, concurrency: int, routes: List[tuple]) -> Dict[str, Any]:
+    """Drive every route in turn and attribute hop latencies to it."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        for service, method, path, build in routes:
+            name = f"{service} {method} {path}"
+            if name in results:
+                name = f"{name} #{sum(1 for key in results if key.startswith(name)) + 1}"
+            logger.info(f"Driving {name}")
+            before = await scrape(client, urls)
+            result = await drive_route(client, urls[service], method, path, build, requests, concurrency)
+            after = await scrape(client, urls)
+            result["hops"] = {
+                hop: histogram_percentiles(before[hop_service].get(metric, {}), after[hop_service].get(metric, {}))
+                for hop, (hop_service, metric) in HOP_METRICS.items()
+            }
+            results[name] = result
+    return results
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of throughput and client latency percentiles against a baseline run."""
+    comparison = {}
+    for name, result in current["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+
+        def change(new, old):
+            return round((new - old) / old * 100, 1) if new is not None and old else None
+
+        comparison[name] = {
+            "throughput_change_pct": change(result["throughput_rps"], previous["throughput_rps"]),
+            **{
+                f"{key}_change_pct": change(result["latency_ms"][key], previous["latency_ms"][key])
+                for key in ("p50", "p95", "p99")
+            }
+        }
+    return comparison
+
+def git_commit() -> Optional[str]:
+    """Current commit of the repository, if available."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark for both services")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight per route")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds each fake upstream call takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability (0-1) that a fake upstream call fails")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents in the fake upstream")
+    parser.add_argument("--route", action="append", help="Only drive routes whose path contains this string")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    routes = [route for route in ROUTES if not args.route or any(part in route[2] for part in args.route)]
+    services = Services(args.latency, args.error_rate, args.agents)
+    try:
+        services.wait_until_ready()
+        route_results = asyncio.run(run_benchmark(services.urls, args.requests, args.concurrency, routes))
+    finally:
+        services.stop()
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "upstream_latency_s": args.latency,
+            "upstream_error_rate": args.error_rate,
+            "agents": args.agents
+        },
+        "routes": route_results
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark for the angus-core -> coral-service hop
+
+This script starts coral-service under gunicorn with its gunicorn.conf.py
+against the fake in-process Coral Protocol Client, then sends messages of
+several content sizes through CoralProtocolClient (worker threads sharing one
+pooled client, as angus-core's gthread workers do) with compression off, with
+gzip and with zstd, and fetches the agent list the same way. For each size and
+setting it reports throughput, latency percentiles and the request and
+response bytes on the wire, plus the time those bytes would take on a link of
+--link-mbps, since loopback hides what compression saves on a real network.
+
+Message content is drawn from a fixed vocabulary in random order, so it
+compresses roughly like agent prose rather than like a repeated string. Rounds
+alternate the settings and the median round is reported, to damp noise on a
+shared machine.
+
+Usage:
+    python benchmarks/payload_compression.py --sizes 512,4096,65536,524288 --requests 300 --output compression.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from load_test import ROOT_DIR, free_port, git_commit, percentiles
+from worker_scaling import stop, wait_until_ready
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "angus-core"))
+import coral_client
+from coral_client import CoralProtocolClient
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("coral_client").setLevel(logging.WARNING)
+
+SETTINGS = ("none", "gzip", "zstd")
+
+VOCABULARY = (
+    "agent analysis track tempo genre playlist mood listener upload channel report summary "
+    "request response confidence score recommend release artist album metadata tag review "
+    "the a of to and in for with on by from is are was be this that it as at"
+).split()
+
+def content(size: int, seed: int = 0) -> str:
+    """Message content of `size` characters drawn from the vocabulary."""
+    rng = random.Random(seed)
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(VOCABULARY)
+        if rng.random() < 0.05:
+            word = f"{word}_{rng.randrange(10000)}"
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+def start_coral_service(port: int, directory: str, agents: int) -> subprocess.Popen:
+    """Start coral-service under gunicorn."""
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        GUNICORN_WORKERS="1",
+        BENCH_AGENTS=str(agents),
+        CORAL_QUEUE_DB_PATH=os.path.join(directory, "coral_queue.db")
+    )
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.pop("CORAL_SERVICE_SOCKET", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--pythonpath", os.path.join(ROOT_DIR, "benchmarks"), "fake_coral_app:app"],
+        cwd=os.path.join(ROOT_DIR, "coral-service"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wire_bytes(client: CoralProtocolClient, method: str, path: str, kwargs: Dict[str, Any]) -> Dict[str, int]:
+    """Request and response body bytes of one request as they cross the wire."""
+    request = dict(kwargs)
+    if client._request_encoding:
+        coral_client._compress_body(request, "data", client._request_encoding, client.compression_min_size)
+    elif "json" in request:
+        request["data"] = json.dumps(request.pop("json")).encode("utf-8")
+        request["headers"] = {"Content-Type": "application/json"}
+    response = client.session.request(
+        method, f"{client.base_url}{path}", data=request.get("data"), headers=request.get("headers"), stream=True
+    )
+    with response:
+        body = response.raw.read(decode_content=False)
+    return {"request_bytes": len(request.get("data") or b""), "response_bytes": len(body)}
+
+def run_setting(base_url: str, setting: str, method: str, path: str, kwargs: Dict[str, Any], args) -> Dict[str, Any]:
+    """Send requests from worker threads sharing one pooled CoralProtocolClient."""
+    with CoralProtocolClient(base_url, pool_size=args.concurrency, compression=setting) as client:
+        for _ in range(args.concurrency):
+            client._request(method, path, **kwargs).content
+        if setting != "none" and client._request_encoding != setting:
+            raise RuntimeError(f"coral-service did not accept {setting} request bodies")
+
+        def call(_):
+            started = time.perf_counter()
+            client._request(method, path, **kwargs).content
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            latencies = list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        sizes = wire_bytes(client, method, path, kwargs)
+    return dict(sizes, elapsed=elapsed, latencies=latencies)
+
+def run(args) -> Dict[str, Any]:
+    """Measure every payload with every compression setting."""
+    directory = tempfile.mkdtemp(prefix="angus-compression-")
+    port = free_port()
+    process = start_coral_service(port, directory, args.agents)
+    base_url = f"http://127.0.0.1:{port}"
+    payloads = {
+        f"send_message_{size}": ("POST", "/messages/send", {"json": {"recipient": "agent_1", "content": content(size), "sender": "bench"}})
+        for size in args.sizes
+    }
+    payloads[f"list_agents_{args.agents}"] = ("GET", "/agents/list?include_details=true", {})
+    samples: Dict[str, Dict[str, List[Dict[str, Any]]]] = {name: {setting: [] for setting in SETTINGS} for name in payloads}
+    try:
+        wait_until_ready(base_url)
+        for _ in range(args.rounds):
+            for name, (method, path, kwargs) in payloads.items():
+                for setting in SETTINGS:
+                    samples[name][setting].append(run_setting(base_url, setting, method, path, kwargs, args))
+    finally:
+        stop([process])
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, settings in samples.items():
+        results[name] = {}
+        for setting, rounds in settings.items():
+            median = sorted(rounds, key=lambda result: result["elapsed"])[len(rounds) // 2]
+            wire = median["request_bytes"] + median["response_bytes"]
+            results[name][setting] = {
+                "throughput_rps": round(args.requests / median["elapsed"], 1),
+                "latency_ms": percentiles(median["latencies"]),
+                "request_bytes": median["request_bytes"],
+                "response_bytes": median["response_bytes"],
+                "link_ms_per_request": round(wire * 8 / (args.link_mbps * 1e6) * 1000, 3)
+            }
+        baseline = results[name]["none"]
+        for setting in ("gzip", "zstd"):
+            result = results[name][setting]
+            result["bytes_ratio"] = round(
+                (result["request_bytes"] + result["response_bytes"]) / (baseline["request_bytes"] + baseline["response_bytes"]), 3
+            )
+            result["throughput_vs_none"] = round(result["throughput_rps"] / baseline["throughput_rps"], 3)
+    return results
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare throughput and bytes on the wire with and without compression")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[512, 4096, 65536, 524288],
+                        help="Comma-separated message content sizes, in characters")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per payload, setting and round")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads sending requests")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds over all settings; the median is reported")
+    parser.add_argument("--agents", type=int, default=2000, help="Number of agents in the fake upstream")
+    parser.add_argument("--link-mbps", type=float, default=100.0, help="Link speed used to estimate transfer time")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "sizes": args.sizes,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "agents": args.agents,
+            "link_mbps": args.link_mbps,
+            "compression_min_size": coral_client.DEFAULT_COMPRESSION_MIN_SIZE,
+            "zstandard": coral_client.zstandard is not None
+        },
+        "results": run(args)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+CPU cost per request of angus-core's /coral/* routes
+
+This script starts coral-service against the fake in-process Coral Protocol
+Client and drives angus-core's Flask app in this process, measuring the CPU
+time this process spends per request (time.process_time, so coral-service's
+work is excluded) in three configurations:
+
+    parse_stdlib   decode, re-encode, decode and re-wrap with the json module
+    parse_orjson   the same passes with orjson
+    proxy_orjson   ANGUS_CORAL_PROXY_MODE: forward the raw body without
+                   decoding it and relay coral-service's response bytes
+
+The /live route is measured too, as the fixed cost of the Flask test client
+and request handling, so it can be subtracted from each route. It also times
+coral-service's response rendering with Starlette's JSONResponse and the
+orjson-backed FastJSONResponse.
+
+Usage:
+    python benchmarks/proxy_cpu.py --agents 2000 --requests 200 --rounds 5 --output cpu.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from load_test import ROOT_DIR, free_port, git_commit
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+CONFIGURATIONS = {
+    "parse_stdlib": {"proxy": False, "orjson": False},
+    "parse_orjson": {"proxy": False, "orjson": True},
+    "proxy_orjson": {"proxy": True, "orjson": True},
+}
+
+# (name, method, path, request builder taking the request number)
+ROUTES: List[tuple] = [
+    ("live", "GET", "/live", lambda i: {}),
+    ("register", "POST", "/coral/register", lambda i: {"json": {"agent_name": f"bench_{i % 50}", "capabilities": ["benchmark"]}}),
+    ("send_batch", "POST", "/coral/send_batch", lambda i: {"json": {"messages": [{"recipient": f"agent_{j}", "content": "benchmark " * 20} for j in range(100)]}}),
+    ("list_agents", "GET", "/coral/list_agents", lambda i: {}),
+]
+
+RENDER_CODE = """
+import json, sys, time
+from fastapi.responses import JSONResponse
+from fast_json import FastJSONResponse
+agents, runs = int(sys.argv[1]), int(sys.argv[2])
+content = {"status": "success", "agents": [{"name": f"agent_{i}", "capabilities": ["capability_1", "capability_2"]} for i in range(agents)]}
+result = {}
+for name, cls in (("json", JSONResponse), ("orjson", FastJSONResponse)):
+    started = time.process_time()
+    for _ in range(runs):
+        cls(content)
+    result[name] = round((time.process_time() - started) / runs * 1e6, 1)
+print(json.dumps(result))
+"""
+
+def start_coral_service(agents: int) -> tuple:
+    """Start coral-service with the fake Coral Protocol Client and wait for it."""
+    port = free_port()
+    env = dict(os.environ, CORAL_QUEUE_DB_PATH=os.path.join(tempfile.mkdtemp(prefix="angus-cpu-"), "coral_queue.db"))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, "benchmarks", "run_coral_service.py"),
+         "--port", str(port), "--latency", "0", "--agents", str(agents)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while True:
+        try:
+            httpx.get(f"{url}/", timeout=1.0).raise_for_status()
+            return process, url
+        except Exception:
+            if time.time() > deadline or process.poll() is not None:
+                process.terminate()
+                raise RuntimeError("coral-service did not start")
+            time.sleep(0.2)
+
+def cpu_per_request(client, method: str, path: str, build: Callable[[int], Dict[str, Any]], requests: int) -> float:
+    """Process CPU time per request, in microseconds."""
+    for i in range(min(20, requests)):
+        client.open(path, method=method, **build(i)).close()
+    started = time.process_time()
+    for i in range(requests):
+        response = client.open(path, method=method, **build(i))
+        response.get_data()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} answered {response.status_code}")
+        response.close()
+    return (time.process_time() - started) / requests * 1e6
+
+def measure_render(agents: int, runs: int) -> Dict[str, float]:
+    """Time coral-service's JSON response rendering in a separate interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", RENDER_CODE, str(agents), str(runs)],
+        cwd=os.path.join(ROOT_DIR, "coral-service"), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(args) -> Dict[str, Any]:
+    """Measure every route in every configuration."""
+    process, url = start_coral_service(args.agents)
+    try:
+        os.environ["CORAL_SERVICE_URL"] = url
+        sys.path.insert(0, os.path.join(ROOT_DIR, "angus-core"))
+        import app as angus
+        import fast_json
+        orjson = fast_json.orjson
+        client = angus.app.test_client()
+
+        # Alternate the configurations over several rounds and keep the median, to damp noise
+        samples: Dict[str, Dict[str, List[float]]] = {configuration: {} for configuration in CONFIGURATIONS}
+        for _ in range(args.rounds):
+            for configuration, settings in CONFIGURATIONS.items():
+                angus.PROXY_MODE = settings["proxy"]
+                fast_json.orjson = orjson if settings["orjson"] else None
+                for name, method, path, build in ROUTES:
+                    samples[configuration].setdefault(name, []).append(cpu_per_request(client, method, path, build, args.requests))
+        fast_json.orjson = orjson
+        results = {
+            configuration: {name: round(statistics.median(values), 1) for name, values in routes.items()}
+            for configuration, routes in samples.items()
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    baseline = results["parse_stdlib"]
+    saved = {
+        configuration: {
+            name: round(baseline[name] - value, 1)
+            for name, value in routes.items() if name != "live"
+        }
+        for configuration, routes in results.items() if configuration != "parse_stdlib"
+    }
+    return {
+        "commit": git_commit(),
+        "agents": args.agents,
+        "requests": args.requests,
+        "rounds": args.rounds,
+        "cpu_us_per_request": results,
+        "cpu_us_saved_vs_parse_stdlib": saved,
+        "coral_service_render_us": measure_render(args.agents, args.render_runs)
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure angus-core CPU per request with and without proxy mode")
+    parser.add_argument("--agents", type=int, default=2000, help="Agents returned by the fake Coral server")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route, configuration and round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds over all configurations; the median is reported")
+    parser.add_argument("--render-runs", type=int, default=200, help="Responses rendered per JSON backend")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Coral Protocol Service launcher for benchmarks
+
+This script starts the Coral Protocol Service with the fake in-process Coral
+Protocol Client installed, so it can be load tested without a Coral server or
+the LangChain dependencies.
+"""
+import os
+import sys
+import logging
+import argparse
+
+# Make the coral-service modules importable
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+
+import uvicorn
+
+import app as service
+import fake_coral
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the Coral Protocol Service against a fake upstream")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each upstream call takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability (0-1) that an upstream call fails")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents registered up front")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    agents = [
+        fake_coral.Agent(f"agent_{i}", [f"capability_{i % 10}", f"capability_{i % 7}"])
+        for i in range(args.agents)
+    ]
+    fake_coral.install(service, latency=args.latency, error_rate=args.error_rate, agents=agents)
+
+    uvicorn.run(service.app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Noisy-neighbour benchmark for fair send scheduling
+
+This script has one chatty agent send a burst of messages through
+/messages/send while several quiet agents keep sending at a steady pace, and
+reports each group's latency percentiles and failed sends. It runs once with
+the service's fair scheduler and once with it replaced by a pass-through, so
+sends reach the upstream execution layer in arrival order as they did before.
+The service runs in-process against the fake Coral Protocol Client.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+import httpx
+
+# Make the coral-service modules importable, keeping the service's queue database out of the tree
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+os.environ.setdefault("CORAL_QUEUE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="coral-fairness-"), "coral_queue.db"))
+
+import app as service
+import fake_coral
+from fair_scheduler import FairScheduler
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+class PassThrough:
+    """Stand-in for FairScheduler that starts every send immediately."""
+
+    async def run(self, sender, recipient, func, *args, **kwargs):
+        return await func(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+def summarize(samples: List[tuple]) -> Dict[str, Any]:
+    """Latency percentiles of successful sends and the number that failed."""
+    latencies = sorted(latency for latency, ok in samples if ok)
+    return {
+        "sent": len(latencies),
+        "failed": sum(1 for _, ok in samples if not ok),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1) if latencies else None
+    }
+
+async def round_trip(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    """Run the chatty burst alongside the quiet senders."""
+    samples: Dict[str, List[tuple]] = {"chatty": [], "quiet": []}
+
+    async def send(sender: str, group: str):
+        started = time.perf_counter()
+        response = await client.post("/messages/send", json={"recipient": "agent_0", "content": "benchmark", "sender": sender})
+        samples[group].append((time.perf_counter() - started, response.status_code == 200))
+
+    async def quiet(sender: str):
+        for _ in range(args.quiet_messages):
+            await send(sender, "quiet")
+            await asyncio.sleep(args.quiet_interval)
+
+    await asyncio.gather(
+        *(send("chatty", "chatty") for _ in range(args.burst)),
+        *(quiet(f"quiet_{i}") for i in range(args.quiet_senders))
+    )
+    return {group: summarize(group_samples) for group, group_samples in samples.items()}
+
+async def run(args) -> Dict[str, Any]:
+    """Run the burst with fair scheduling and in arrival order."""
+    fake_coral.install(service, latency=args.latency, agents=[fake_coral.Agent("agent_0", ["benchmark"])])
+    fair = FairScheduler(concurrency=args.concurrency)
+    modes = {"fair": fair, "arrival_order": PassThrough()}
+    report = {}
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coral-service", timeout=None) as client:
+        for mode, scheduler in modes.items():
+            service.send_scheduler = scheduler
+            report[mode] = await round_trip(client, args)
+    service.send_scheduler = fair
+
+    return {
+        "burst": args.burst,
+        "quiet_senders": args.quiet_senders,
+        "quiet_messages": args.quiet_messages,
+        "upstream_latency_s": args.latency,
+        "send_concurrency": args.concurrency,
+        "upstream_max_pending": service.upstream.max_pending,
+        "results": report,
+        "scheduler": {key: value for key, value in fair.stats().items() if key != "recipients"}
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure quiet senders' latency during another sender's burst")
+    parser.add_argument("--burst", type=int, default=400, help="Messages the chatty sender sends at once")
+    parser.add_argument("--quiet-senders", type=int, default=5, help="Senders sending at a steady pace")
+    parser.add_argument("--quiet-messages", type=int, default=20, help="Messages per quiet sender")
+    parser.add_argument("--quiet-interval", type=float, default=0.02, help="Seconds between a quiet sender's messages")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds each upstream send takes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Sends the fair scheduler runs at once")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    # Fail if quiet senders lost messages with fair scheduling
+    sys.exit(0 if report["results"]["fair"]["quiet"]["failed"] == 0 else 1)
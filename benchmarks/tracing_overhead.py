@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tracing overhead benchmark
+
+This script sends /messages/send requests to the service in-process, against
+the fake Coral Protocol Client, with tracing off, with a fraction of traces
+sampled into the in-memory exporter, and with every trace sampled, and
+reports throughput and latency per setting. Rounds alternate the settings
+and the median round is reported, to damp noise on a shared machine.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+import httpx
+
+# Make the coral-service modules, and the tracing module it shares with angus-core, importable,
+# keeping the service's queue database out of the tree
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "coral-service"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "shared"))
+os.environ.setdefault("CORAL_QUEUE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="coral-tracing-"), "coral_queue.db"))
+
+import app as service
+import fake_coral
+import tracing
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+async def send_all(client: httpx.AsyncClient, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send `requests` messages from `concurrency` concurrent tasks."""
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post("/messages/send", json={"recipient": "agent_0", "content": "benchmark", "sender": "bench"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"elapsed": time.perf_counter() - started, "latencies": sorted(latencies)}
+
+async def run(args) -> Dict[str, Any]:
+    """Measure each tracing setting."""
+    fake_coral.install(service, agents=[fake_coral.Agent("agent_0", ["benchmark"])])
+    exporter = tracing.InMemoryExporter(max_spans=1000)
+    settings = {
+        "off": (None, 0.0),
+        f"sampled_{args.sample_rate:g}": (exporter, args.sample_rate),
+        "sampled_all": (exporter, 1.0)
+    }
+    samples: Dict[str, List[Dict[str, Any]]] = {name: [] for name in settings}
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coral-service", timeout=None) as client:
+        await send_all(client, args.concurrency * 10, args.concurrency)
+        for _ in range(args.rounds):
+            for name, (setting_exporter, sample_rate) in settings.items():
+                tracing.tracer.exporter, tracing.tracer.sample_rate = setting_exporter, sample_rate
+                samples[name].append(await send_all(client, args.requests, args.concurrency))
+
+    results = {}
+    for name, rounds in samples.items():
+        median = sorted(rounds, key=lambda result: result["elapsed"])[len(rounds) // 2]
+        latencies = median["latencies"]
+        results[name] = {
+            "throughput_rps": round(args.requests / median["elapsed"], 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3)
+        }
+    baseline = results["off"]["throughput_rps"]
+    for result in results.values():
+        result["throughput_vs_off"] = round(result["throughput_rps"] / baseline, 3)
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "rounds": args.rounds,
+        "results": results
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure the request overhead of tracing at different sample rates")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per setting and round")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds over all settings; the median is reported")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="Sample rate of the partially sampled setting")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
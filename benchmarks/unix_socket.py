@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Unix domain socket vs TCP benchmark for the angus-core -> coral-service hop
+
+This script starts coral-service under gunicorn with its gunicorn.conf.py,
+listening both on a TCP port and on a Unix domain socket (PORT and
+CORAL_SERVICE_SOCKET), against the fake in-process Coral Protocol Client. It
+then drives each route through CoralProtocolClient (worker threads sharing one
+pooled client, as angus-core's gthread workers do) and through
+AsyncCoralProtocolClient, once over TCP and once over the socket, and reports
+throughput and latency percentiles per transport.
+
+Rounds alternate the transports and the median round is reported, to damp
+noise on a shared machine.
+
+Usage:
+    python benchmarks/unix_socket.py --requests 2000 --concurrency 8 --rounds 3 --output uds.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from load_test import ROOT_DIR, free_port, git_commit, percentiles
+from worker_scaling import stop, wait_until_ready
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "angus-core"))
+from coral_client import AsyncCoralProtocolClient, CoralProtocolClient
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("coral_client").setLevel(logging.WARNING)
+
+# (name, method, path, keyword arguments of the request)
+ROUTES: List[tuple] = [
+    ("live", "GET", "/live", {}),
+    ("list_agents", "GET", "/agents/list", {}),
+    ("send_message", "POST", "/messages/send", {"json": {"recipient": "agent_1", "content": "benchmark " * 20}}),
+]
+
+def start_coral_service(port: int, socket_path: str, agents: int) -> subprocess.Popen:
+    """Start coral-service under gunicorn listening on both transports."""
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        CORAL_SERVICE_SOCKET=socket_path,
+        GUNICORN_WORKERS="1",
+        BENCH_AGENTS=str(agents),
+        CORAL_QUEUE_DB_PATH=os.path.join(os.path.dirname(socket_path), "coral_queue.db")
+    )
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--pythonpath", os.path.join(ROOT_DIR, "benchmarks"), "fake_coral_app:app"],
+        cwd=os.path.join(ROOT_DIR, "coral-service"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def run_sync(base_url: str, method: str, path: str, kwargs: Dict[str, Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send requests from worker threads sharing one pooled CoralProtocolClient."""
+    with CoralProtocolClient(base_url, pool_size=concurrency) as client:
+        for _ in range(concurrency):
+            client._request(method, path, **kwargs).content
+
+        def call(_):
+            started = time.perf_counter()
+            client._request(method, path, **kwargs).content
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(call, range(requests)))
+        elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "latencies": latencies}
+
+async def _run_async(base_url: str, method: str, path: str, kwargs: Dict[str, Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    async with AsyncCoralProtocolClient(base_url, pool_size=concurrency) as client:
+        await asyncio.gather(*(client._request(method, path, **kwargs) for _ in range(concurrency)))
+        latencies: List[float] = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                await client._request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "latencies": latencies}
+
+def run_async(*args) -> Dict[str, Any]:
+    """Send requests from concurrent tasks sharing one AsyncCoralProtocolClient."""
+    return asyncio.run(_run_async(*args))
+
+def run(args) -> Dict[str, Any]:
+    """Measure every route with both clients over both transports."""
+    directory = tempfile.mkdtemp(prefix="angus-uds-")
+    socket_path = os.path.join(directory, "coral-service.sock")
+    port = free_port()
+    process = start_coral_service(port, socket_path, args.agents)
+    transports = {"tcp": f"http://127.0.0.1:{port}", "unix": f"unix://{socket_path}"}
+    clients = {"sync": run_sync, "async": run_async}
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    try:
+        wait_until_ready(transports["tcp"])
+        deadline = time.time() + 30
+        while not os.path.exists(socket_path):
+            if time.time() > deadline:
+                raise RuntimeError("coral-service did not create its Unix domain socket")
+            time.sleep(0.1)
+
+        for _ in range(args.rounds):
+            for client, runner in clients.items():
+                for name, method, path, kwargs in ROUTES:
+                    for transport, base_url in transports.items():
+                        key = f"{client}/{name}/{transport}"
+                        samples.setdefault(key, []).append(runner(base_url, method, path, kwargs, args.requests, args.concurrency))
+    finally:
+        stop([process])
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for key, rounds in samples.items():
+        client, name, transport = key.split("/")
+        median = sorted(rounds, key=lambda result: result["elapsed"])[len(rounds) // 2]
+        results.setdefault(client, {}).setdefault(name, {})[transport] = {
+            "throughput_rps": round(args.requests / median["elapsed"], 1),
+            "latency_ms": percentiles(median["latencies"])
+        }
+    for routes in results.values():
+        for result in routes.values():
+            result["unix_speedup"] = round(result["unix"]["throughput_rps"] / result["tcp"]["throughput_rps"], 2)
+            result["unix_p50_saved_ms"] = round(result["tcp"]["latency_ms"]["p50"] - result["unix"]["latency_ms"]["p50"], 3)
+    return results
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare Unix domain socket and TCP transports to coral-service")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route, client, transport and round")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads or tasks sending requests")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds over all transports; the median is reported")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents in the fake upstream")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "agents": args.agents
+        },
+        "results": run(args)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Load test for the upstream execution layer
+
+This script sends many concurrent requests to the Coral Protocol Service while
+every upstream call is slow, and checks that they overlap instead of being
+serialized on the event loop. The service runs in-process against the fake
+Coral Protocol Client.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+import httpx
+
+# Make the coral-service modules importable, keeping the service's queue database out of the tree
+CORAL_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "coral-service")
+sys.path.insert(0, CORAL_SERVICE_DIR)
+os.environ.setdefault("CORAL_QUEUE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="coral-upstream-"), "coral_queue.db"))
+
+import app as service
+import fake_coral
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+async def run_load_test(concurrency, latency):
+    """Send `concurrency` simultaneous messages and time them."""
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coral-service", timeout=None) as client:
+        async def send(i):
+            response = await client.post(
+                "/messages/send",
+                json={"recipient": f"agent_{i}", "content": "Hello!"}
+            )
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        # The health check must stay responsive while upstream calls are slow
+        health_started = time.perf_counter()
+        pending = [asyncio.ensure_future(send(i)) for i in range(concurrency)]
+        await asyncio.sleep(0)
+        (await client.get("/")).raise_for_status()
+        health_latency = time.perf_counter() - health_started
+        await asyncio.gather(*pending)
+
+        stats = (await client.get("/status/executor")).json()["executor"]
+
+    return {
+        "concurrent_requests": concurrency,
+        "upstream_latency_s": latency,
+        "serialized_estimate_s": round(concurrency * latency, 3),
+        "wall_clock_s": round(elapsed, 3),
+        "health_check_latency_ms": round(health_latency * 1000, 2),
+        "executor": stats
+    }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test the upstream execution layer")
+    parser.add_argument("--concurrency", type=int, default=100, help="Number of concurrent requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each upstream call takes")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    fake_coral.install(service, latency=args.latency)
+
+    result = asyncio.run(run_load_test(args.concurrency, args.latency))
+    print(json.dumps(result, indent=2))
+
+    # Fail if the calls were effectively serialized
+    sys.exit(0 if result["wall_clock_s"] < result["serialized_estimate_s"] / 2 else 1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+JSON vs MessagePack on the angus-core -> coral-service hop
+
+This script sends each endpoint's request to coral-service in-process (with
+the fake Coral Protocol Client) once as JSON and once as MessagePack, and
+records the request and response bodies actually exchanged. For every body it
+then times the codecs used on each side of the hop:
+
+    json     CoralProtocolClient encodes requests and decodes responses with
+             the json module (requests' json= and .json()); coral-service
+             decodes requests with the json module and encodes responses
+             with orjson (FastJSONResponse)
+    msgpack  msgpack.packb / msgpack.unpackb on both sides
+
+and reports bytes on the wire and CPU per request for each format. The
+service-side figure for list_agents is per encode; coral-service encodes the
+full list once per agent snapshot and format, then reuses the bytes.
+
+Usage:
+    python benchmarks/wire_format.py --agents 2000 --content-size 65536 --output wire.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List
+
+import httpx
+import msgpack
+
+from load_test import ROOT_DIR, git_commit
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "coral-service"))
+import app as service
+import fake_coral
+from fast_json import MSGPACK_MEDIA_TYPE, orjson
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def endpoints(args) -> List[tuple]:
+    """(name, method, path, request body or None) of every endpoint measured."""
+    content = ("analysis " * (args.content_size // 9 + 1))[:args.content_size]
+    return [
+        ("list_agents", "GET", "/agents/list", None),
+        ("search_agents", "GET", "/agents/search?capability=capability_1&include_details=true&limit=500", None),
+        ("send_message", "POST", "/messages/send", {"recipient": "agent_1", "content": content}),
+        ("send_batch", "POST", "/messages/send_batch", {"messages": [{"recipient": f"agent_{i}", "content": content[:1024]} for i in range(100)]}),
+        ("create_thread", "POST", "/threads/create", {"participants": [f"agent_{i}" for i in range(10)], "initial_message": content}),
+    ]
+
+def time_us(call: Callable[[], Any], runs: int) -> float:
+    """Median time of a call, in microseconds."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+async def exchange(client: httpx.AsyncClient, method: str, path: str, body: Any, wire_format: str) -> Dict[str, bytes]:
+    """Send one request in the given format and return the bodies exchanged."""
+    if wire_format == "msgpack":
+        headers = {"Accept": MSGPACK_MEDIA_TYPE}
+        content = msgpack.packb(body, use_bin_type=True) if body is not None else None
+        if content is not None:
+            headers["Content-Type"] = MSGPACK_MEDIA_TYPE
+    else:
+        headers = {"Accept": "application/json"}
+        content = json.dumps(body).encode("utf-8") if body is not None else None
+        if content is not None:
+            headers["Content-Type"] = "application/json"
+    response = await client.request(method, path, content=content, headers=headers)
+    response.raise_for_status()
+    if not response.headers["content-type"].startswith(MSGPACK_MEDIA_TYPE if wire_format == "msgpack" else "application/json"):
+        raise RuntimeError(f"{path} answered {response.headers['content-type']} to a {wire_format} request")
+    return {"request": content or b"", "response": response.content}
+
+def measure(body: Any, bodies: Dict[str, bytes], wire_format: str, runs: int) -> Dict[str, Any]:
+    """CPU spent on each side of the hop encoding and decoding the exchanged bodies."""
+    response = msgpack.unpackb(bodies["response"], raw=False) if wire_format == "msgpack" else json.loads(bodies["response"])
+    if wire_format == "msgpack":
+        encode_request = lambda: msgpack.packb(body, use_bin_type=True)
+        decode_request = lambda: msgpack.unpackb(bodies["request"], raw=False)
+        encode_response = lambda: msgpack.packb(response, use_bin_type=True)
+        decode_response = lambda: msgpack.unpackb(bodies["response"], raw=False)
+    else:
+        encode_request = lambda: json.dumps(body).encode("utf-8")
+        decode_request = lambda: json.loads(bodies["request"])
+        encode_response = (lambda: orjson.dumps(response)) if orjson is not None else (lambda: json.dumps(response).encode("utf-8"))
+        decode_response = lambda: json.loads(bodies["response"])
+
+    result = {
+        "request_bytes": len(bodies["request"]),
+        "response_bytes": len(bodies["response"]),
+        "client_us": time_us(decode_response, runs),
+        "service_us": time_us(encode_response, runs)
+    }
+    if body is not None:
+        result["client_us"] += time_us(encode_request, runs)
+        result["service_us"] += time_us(decode_request, runs)
+    result["client_us"] = round(result["client_us"], 1)
+    result["service_us"] = round(result["service_us"], 1)
+    return result
+
+async def run(args) -> Dict[str, Any]:
+    """Exchange and measure every endpoint in both formats."""
+    fake_coral.install(service, agents=[
+        fake_coral.Agent(f"agent_{i}", [f"capability_{i % 10}", f"capability_{i % 7}"]) for i in range(args.agents)
+    ])
+    results: Dict[str, Dict[str, Any]] = {}
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coral-service", timeout=None) as client:
+        for name, method, path, body in endpoints(args):
+            results[name] = {}
+            for wire_format in ("json", "msgpack"):
+                bodies = await exchange(client, method, path, body, wire_format)
+                results[name][wire_format] = measure(body, bodies, wire_format, args.runs)
+
+    for result in results.values():
+        json_result, msgpack_result = result["json"], result["msgpack"]
+        json_bytes = json_result["request_bytes"] + json_result["response_bytes"]
+        msgpack_bytes = msgpack_result["request_bytes"] + msgpack_result["response_bytes"]
+        result["msgpack_bytes_ratio"] = round(msgpack_bytes / json_bytes, 3)
+        result["msgpack_client_cpu_ratio"] = round(msgpack_result["client_us"] / max(json_result["client_us"], 0.1), 3)
+        result["msgpack_service_cpu_ratio"] = round(msgpack_result["service_us"] / max(json_result["service_us"], 0.1), 3)
+    return results
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare JSON and MessagePack bytes and codec CPU per endpoint")
+    parser.add_argument("--agents", type=int, default=2000, help="Agents returned by the fake Coral server")
+    parser.add_argument("--content-size", type=int, default=65536, help="Characters of message content")
+    parser.add_argument("--runs", type=int, default=200, help="Timed encodes and decodes per body")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "config": {"agents": args.agents, "content_size": args.content_size, "runs": args.runs},
+        "endpoints": asyncio.run(run(args))
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
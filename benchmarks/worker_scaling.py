@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Worker scaling benchmark for the production gunicorn entry points
+
+This script starts a service under gunicorn with its gunicorn.conf.py for each
+requested worker count and drives one route from several load generator
+processes for a fixed duration, reporting throughput and latency per worker
+count. Throughput should grow with the number of workers up to the number of
+cores available.
+
+coral-service runs against the fake in-process Coral Protocol Client
+(benchmarks/fake_coral_app.py). When benchmarking angus-core, a coral-service
+with the largest worker count is started behind it.
+
+Usage:
+    python benchmarks/worker_scaling.py --service coral-service --workers 1 2 4
+    python benchmarks/worker_scaling.py --service angus-core --workers 1 2 4 --output scaling.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+import tempfile
+import multiprocessing
+from typing import Any, Dict, List
+
+import httpx
+
+from load_test import ROOT_DIR, free_port, git_commit, percentiles
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+DEFAULT_PATHS = {
+    "coral-service": "/agents/list",
+    "angus-core": "/coral/list_agents",
+}
+
+def start_gunicorn(service: str, workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start one service under gunicorn with its production configuration."""
+    service_dir = os.path.join(ROOT_DIR, service)
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+    if service == "coral-service":
+        command += ["--pythonpath", os.path.join(ROOT_DIR, "benchmarks"), "fake_coral_app:app"]
+    else:
+        command += ["app:app"]
+    return subprocess.Popen(
+        command,
+        cwd=service_dir,
+        env=dict(env, GUNICORN_WORKERS=str(workers)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_until_ready(url: str, timeout: float = 60.0):
+    """Wait for a service to answer its health check."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            httpx.get(f"{url}/", timeout=1.0).raise_for_status()
+            return
+        except Exception:
+            if time.time() > deadline:
+                raise RuntimeError(f"Service at {url} did not start")
+            time.sleep(0.2)
+
+def stop(processes: List[subprocess.Popen]):
+    """Terminate service processes, giving gunicorn time to shut down its workers."""
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def _generate_load(url: str, method: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+def generate_load(args: tuple) -> Dict[str, Any]:
+    """Load generator process entry point."""
+    return asyncio.run(_generate_load(*args))
+
+def measure(url: str, method: str, clients: int, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Drive one URL from several load generator processes and combine their results."""
+    # Warm up connections and caches before measuring
+    asyncio.run(_generate_load(url, method, concurrency, min(duration, 1.0)))
+    with multiprocessing.Pool(clients) as pool:
+        started = time.perf_counter()
+        results = pool.map(generate_load, [(url, method, concurrency, duration)] * clients)
+        elapsed = time.perf_counter() - started
+    latencies = [latency for result in results for latency in result["latencies"]]
+    return {
+        "requests": len(latencies),
+        "errors": sum(result["errors"] for result in results),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": percentiles(latencies)
+    }
+
+def run(args) -> Dict[str, Any]:
+    """Benchmark the service at every requested worker count."""
+    data_dir = tempfile.mkdtemp(prefix="angus-scaling-")
+    env = dict(
+        os.environ,
+        CORAL_QUEUE_DB_PATH=os.path.join(data_dir, "coral_queue.db"),
+        BENCH_UPSTREAM_LATENCY=str(args.latency),
+        BENCH_AGENTS=str(args.agents)
+    )
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    backend = []
+    if args.service == "angus-core":
+        coral_port = free_port()
+        backend.append(start_gunicorn("coral-service", max(args.workers), coral_port, env))
+        env["CORAL_SERVICE_URL"] = f"http://127.0.0.1:{coral_port}"
+        wait_until_ready(env["CORAL_SERVICE_URL"])
+
+    path = args.path or DEFAULT_PATHS[args.service]
+    results = {}
+    try:
+        for workers in args.workers:
+            port = free_port()
+            process = start_gunicorn(args.service, workers, port, env)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                wait_until_ready(url)
+                logger.info(f"Driving {args.service} {args.method} {path} with {workers} workers")
+                results[str(workers)] = measure(f"{url}{path}", args.method, args.clients, args.concurrency, args.duration)
+            finally:
+                stop([process])
+    finally:
+        stop(backend)
+
+    baseline = results.get(str(args.workers[0]), {}).get("throughput_rps")
+    for result in results.values():
+        result["speedup"] = round(result["throughput_rps"] / baseline, 2) if baseline else None
+    return results
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Throughput of a service under gunicorn by worker count")
+    parser.add_argument("--service", choices=sorted(DEFAULT_PATHS), default="coral-service", help="Service to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to benchmark")
+    parser.add_argument("--method", default="GET", help="HTTP method to send")
+    parser.add_argument("--path", help="Route to drive (defaults to listing agents)")
+    parser.add_argument("--clients", type=int, default=max(2, multiprocessing.cpu_count() // 2), help="Load generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight per load generator")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to drive each worker count")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each fake upstream call takes")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents in the fake upstream")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "config": {
+            "service": args.service,
+            "route": f"{args.method} {args.path or DEFAULT_PATHS[args.service]}",
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "upstream_latency_s": args.latency,
+            "agents": args.agents
+        },
+        "workers": run(args)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
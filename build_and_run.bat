@@ -14,16 +14,11 @@ docker rm angus-core coral-service angus-db 2>nul || echo No containers to remov
 
 REM Build the Coral Protocol Service with the fixed Dockerfile
 echo Building Coral Protocol Service...
-cd coral-service
-copy Dockerfile.fixed Dockerfile /Y
-docker build -t coral-service .
-cd ..
+docker build -f coral-service/Dockerfile.fixed -t coral-service .
 
 REM Build the Agent Angus Core Service
 echo Building Agent Angus Core Service...
-cd angus-core
-docker build -t angus-core .
-cd ..
+docker build -f angus-core/Dockerfile -t angus-core .
 
 REM Start the PostgreSQL database
 echo Starting PostgreSQL database...
@@ -16,16 +16,11 @@ docker rm angus-core coral-service angus-db 2>/dev/null || true
 
 # Build the Coral Protocol Service with the fixed Dockerfile
 echo "Building Coral Protocol Service..."
-cd coral-service
-cp Dockerfile.fixed Dockerfile
-docker build -t coral-service .
-cd ..
+docker build -f coral-service/Dockerfile.fixed -t coral-service .
 
 # Build the Agent Angus Core Service
 echo "Building Agent Angus Core Service..."
-cd angus-core
-docker build -t angus-core .
-cd ..
+docker build -f angus-core/Dockerfile -t angus-core .
 
 # Start the PostgreSQL database
 echo "Starting PostgreSQL database..."
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Agent List Cache
+
+This module caches the upstream agent list for the /agents/list endpoint. A
+cached list is served as-is until its TTL expires, then served stale while a
+single background refresh fetches a new one. Concurrent requests that find
+the cache empty share one load. Registering an agent invalidates the cache
+immediately. Each snapshot carries an ETag so clients can revalidate
+with If-None-Match, and can be read in name-ordered pages, or as a full body
+or NDJSON lines that are encoded once per snapshot.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from bisect import bisect_right
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fast_json import render
+from content_encoding import compress
+from singleflight import SingleFlight
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default cache settings
+DEFAULT_AGENT_CACHE_TTL = float(os.getenv("CORAL_AGENT_CACHE_TTL", "30"))
+DEFAULT_AGENT_CACHE_STALE_TTL = float(os.getenv("CORAL_AGENT_CACHE_STALE_TTL", "300"))
+
+# Lines per chunk of a streamed NDJSON agent list
+NDJSON_CHUNK_LINES = 256
+
+class AgentSnapshot:
+    """An immutable copy of the agent list and its ETags."""
+
+    def __init__(self, agents: List[Dict[str, Any]], sequence: int = 0):
+        """
+        Build a snapshot.
+
+        Args:
+            agents: Agents as {"name": ..., "capabilities": [...]} dicts
+            sequence: Number of the load that read the list; later loads have higher numbers
+        """
+        self.agents = agents
+        self.sequence = sequence
+        self.names = [agent["name"] for agent in agents]
+        self.fetched_at = time.monotonic()
+        self._digest = hashlib.sha1(json.dumps(agents, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+        # Built on first use: agent indexes in name order and encoded NDJSON lines
+        self._order: Optional[List[int]] = None
+        self._sorted_names: List[str] = []
+        self._lines: Dict[bool, List[bytes]] = {}
+        self._bodies: Dict[Tuple[bool, str, Optional[str]], bytes] = {}
+
+    def etag(self, include_details: bool, media_type: str = "application/json", encoding: Optional[str] = None) -> str:
+        """
+        Strong ETag of one representation of the list.
+
+        Args:
+            include_details: Whether the list holds agent dicts instead of names
+            media_type: application/json, application/msgpack or application/x-ndjson
+            encoding: Content coding of the body, or None
+
+        Returns:
+            str: The ETag, e.g. "<digest>-d-msgpack-gzip", different for every
+                level of detail, media type and content coding since each is
+                encoded to different bytes
+        """
+        representation = media_type.rsplit("/", 1)[-1].replace("x-", "")
+        tag = f"{self._digest}-{'d' if include_details else 'n'}-{representation}"
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    def result(self, include_details: bool) -> List[Any]:
+        """Agent list for the given level of detail."""
+        return self.agents if include_details else self.names
+
+    def body(self, include_details: bool, media_type: str, encoding: Optional[str] = None) -> bytes:
+        """
+        The full /agents/list response body, encoded once per snapshot, media type and content coding.
+
+        Args:
+            include_details: Whether the list holds agent dicts instead of names
+            media_type: application/json or application/msgpack
+            encoding: "gzip" or "zstd" to compress the body, or None
+
+        Returns:
+            bytes: The encoded body
+        """
+        key = (include_details, media_type, encoding)
+        body = self._bodies.get(key)
+        if body is None:
+            if encoding is None:
+                body = render({"status": "success", "agents": self.result(include_details)}, media_type)
+            else:
+                body = compress(self.body(include_details, media_type), encoding)
+            self._bodies[key] = body
+        return body
+
+    def _sorted(self) -> List[int]:
+        if self._order is None:
+            order = sorted(range(len(self.names)), key=self.names.__getitem__)
+            self._sorted_names = [self.names[i] for i in order]
+            self._order = order
+        return self._order
+
+    def _span(self, limit: Optional[int], after: Optional[str]) -> Tuple[int, int, Optional[str]]:
+        order = self._sorted()
+        start = bisect_right(self._sorted_names, after) if after is not None else 0
+        end = len(order) if limit is None else min(start + max(1, limit), len(order))
+        return start, end, self._sorted_names[end - 1] if end < len(order) else None
+
+    def page(self, include_details: bool, limit: int, after: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+        """
+        One page of the agent list in name order.
+
+        Args:
+            include_details: Whether to return agent dicts instead of names
+            limit: Maximum number of agents to return
+            after: Return agents whose name sorts after this cursor
+
+        Returns:
+            Tuple[List[Any], Optional[str]]: The agents and the cursor of the next page, or None on the last page
+        """
+        start, end, next_cursor = self._span(limit, after)
+        order = self._order
+        if include_details:
+            return [self.agents[order[i]] for i in range(start, end)], next_cursor
+        return self._sorted_names[start:end], next_cursor
+
+    def ndjson(self, include_details: bool, limit: Optional[int] = None, after: Optional[str] = None) -> Tuple[Iterator[bytes], Optional[str]]:
+        """
+        The agent list in name order as newline-delimited JSON, one agent per line.
+
+        Args:
+            include_details: Whether each line is an agent dict instead of a name
+            limit: Maximum number of agents, or None for all after the cursor
+            after: Start after this agent name
+
+        Returns:
+            Tuple[Iterator[bytes], Optional[str]]: Chunks of lines and the cursor of the next page
+        """
+        start, end, next_cursor = self._span(limit, after)
+        lines = self._lines.get(include_details)
+        if lines is None:
+            items = (self.agents[i] for i in self._order) if include_details else self._sorted_names
+            lines = self._lines[include_details] = [json.dumps(item).encode("utf-8") + b"\n" for item in items]
+
+        def chunks():
+            for offset in range(start, end, NDJSON_CHUNK_LINES):
+                yield b"".join(lines[offset:min(offset + NDJSON_CHUNK_LINES, end)])
+
+        return chunks(), next_cursor
+
+class AgentListCache:
+    """
+    TTL cache with stale-while-revalidate for the upstream agent list.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_AGENT_CACHE_TTL, stale_ttl: float = DEFAULT_AGENT_CACHE_STALE_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds a snapshot is served without refreshing
+            stale_ttl: Further seconds a snapshot is served while refreshing in the background
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._snapshot: Optional[AgentSnapshot] = None
+        self._generation = 0
+        # Number of the most recently started load
+        self.sequence = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Misses and refreshes arriving while a load runs wait for it instead of loading again
+        self.loads = SingleFlight()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    async def get(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> AgentSnapshot:
+        """
+        Get the current agent snapshot, loading it if necessary.
+
+        Args:
+            loader: Coroutine function returning the upstream agent list
+
+        Returns:
+            AgentSnapshot: Fresh or stale-but-revalidating snapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = time.monotonic() - snapshot.fetched_at
+            if age < self.ttl:
+                self._hits += 1
+                return snapshot
+            if age < self.ttl + self.stale_ttl:
+                self._stale_hits += 1
+                self._start_refresh(loader)
+                return snapshot
+
+        self._misses += 1
+        return await self._load(loader)
+
+    async def _load(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> AgentSnapshot:
+        return await self.loads.do("agents", self._fetch, loader)
+
+    async def _fetch(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> AgentSnapshot:
+        generation = self._generation
+        self.sequence += 1
+        snapshot = AgentSnapshot(await loader(), self.sequence)
+        # Don't overwrite a newer invalidation with data fetched before it
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _start_refresh(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._refresh(loader))
+
+    async def _refresh(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        try:
+            await self._load(loader)
+            self._refreshes += 1
+        except Exception as e:
+            self._refresh_failures += 1
+            logger.error(f"Failed to refresh agent list cache: {str(e)}")
+
+    @property
+    def snapshot(self) -> Optional[AgentSnapshot]:
+        """The cached snapshot, fresh or stale, or None if there is none."""
+        return self._snapshot
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next request loads a fresh one."""
+        self._generation += 1
+        self._snapshot = None
+        # Loads already running may have read the list before the change
+        self.loads.forget("agents")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+
+        Returns:
+            Dict: Settings, snapshot age and hit/miss counters
+        """
+        snapshot = self._snapshot
+        return {
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "cached_agents": len(snapshot.agents) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - snapshot.fetched_at, 3) if snapshot else None,
+            "hits": self._hits,
+            "stale_hits": self._stale_hits,
+            "misses": self._misses,
+            "refreshes": self._refreshes,
+            "refresh_failures": self._refresh_failures,
+            "loads": self.loads.stats()
+        }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Args:
+        if_none_match: Value of the If-None-Match header
+        etag: Current strong ETag of the representation being sent
+
+    Returns:
+        bool: Whether the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
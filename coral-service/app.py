@@ -6,25 +6,44 @@ This is the main application file for the Coral Protocol Service.
 It provides a REST API for interacting with the Coral Protocol.
 """
 import os
-import json
+import sys
+import base64
+import math
+import random
 import logging
 import uuid
-from typing import Dict, List, Any, Optional
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Import LangChain and Coral Protocol libraries
-try:
-    from langchain.agents import AgentExecutor
-    from langchain_openai import ChatOpenAI
-    from langchain_core.messages import HumanMessage, AIMessage
-    from langchain_mcp_adapters.coral_protocol import CoralProtocolClient
-    from langchain_mcp_adapters.coral_protocol.models import Agent, Thread
-except ImportError:
-    logging.warning("LangChain and/or Coral Protocol libraries not installed. Some functionality may be limited.")
+# Modules shared by both services, such as tracing, are in the repository's
+# shared/ directory; the Docker images copy them next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+
+import metrics
+import tracing
+from fast_json import FastJSONResponse, NegotiatedRoute, render, response_media_type
+from content_encoding import (
+    DEFAULT_COMPRESSION_ENCODINGS, DEFAULT_COMPRESSION_MIN_SIZE, CompressionMiddleware, choose_encoding, compress, parse_encodings
+)
+from upstream import UpstreamExecutor
+from fanout import gather_bounded
+from fair_scheduler import FairScheduler
+from resilience import UpstreamUnavailable
+from delivery import DeliveryTracker
+from agent_cache import AgentListCache, etag_matches
+from capability_index import MATCH_ALL, CapabilityIndex
+from message_queue import MessageQueue
+from message_stream import MessageHub, sse_source
+from health import HealthChecker, tcp_check, url_address
+from registry import MAX_THREAD_PAGE_SIZE, Registry, RegistryUnavailable
+from idempotency import REJECTION_REASON, IdempotencyError, IdempotencyStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,7 +53,9 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Create FastAPI app
-app = FastAPI(title="Coral Protocol Service")
+app = FastAPI(title="Coral Protocol Service", default_response_class=FastJSONResponse)
+# Speak MessagePack with clients that ask for it
+app.router.route_class = NegotiatedRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -45,28 +66,268 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Coral Protocol Client
+# Decompress request bodies and compress large responses
+compression_encodings = parse_encodings(DEFAULT_COMPRESSION_ENCODINGS)
+app.add_middleware(CompressionMiddleware, encodings=compression_encodings)
+
+# Record per-route request metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Run each request in a span, continuing the caller's trace
+tracing.tracer.set_default_service("coral-service")
+app.add_middleware(tracing.TracingMiddleware)
+
+# Coral Protocol client class and models, imported on first use by load_coral_protocol()
+CoralProtocolClient = None
+Agent = None
+Thread = None
+HumanMessage = None
+
+# Coral Protocol Client, created per worker process on startup
 coral_client = None
-try:
-    coral_server_url = os.getenv("CORAL_SERVER_URL", "http://coral.pushcollective.club/sse")
-    coral_client = CoralProtocolClient(coral_server_url)
-    logger.info(f"Initialized Coral Protocol Client with URL: {coral_server_url}")
-except Exception as e:
-    logger.error(f"Failed to initialize Coral Protocol Client: {str(e)}")
-
-# Pydantic models for request validation
+
+# Backoff between attempts to create the client
+CLIENT_INIT_RETRY_DELAY = float(os.getenv("CORAL_CLIENT_INIT_RETRY_DELAY", "1"))
+CLIENT_INIT_MAX_RETRY_DELAY = float(os.getenv("CORAL_CLIENT_INIT_MAX_RETRY_DELAY", "60"))
+
+def load_coral_protocol():
+    """
+    Import the Coral Protocol client and models.
+
+    The LangChain and MCP adapter packages take seconds to import, so they are
+    imported when the client is created rather than when this module is.
+    """
+    global CoralProtocolClient, Agent, Thread, HumanMessage
+    if CoralProtocolClient is None:
+        from langchain_mcp_adapters.coral_protocol import CoralProtocolClient
+    if Agent is None or Thread is None:
+        from langchain_mcp_adapters.coral_protocol.models import Agent, Thread
+    if HumanMessage is None:
+        from langchain_core.messages import HumanMessage
+
+def init_coral_client() -> bool:
+    """
+    Create this process's Coral Protocol Client.
+
+    Returns:
+        bool: Whether the client was created
+    """
+    global coral_client
+    try:
+        load_coral_protocol()
+        coral_server_url = os.getenv("CORAL_SERVER_URL", "http://coral.pushcollective.club/sse")
+        coral_client = CoralProtocolClient(coral_server_url)
+        logger.info(f"Initialized Coral Protocol Client with URL: {coral_server_url}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to initialize Coral Protocol Client: {str(e)}")
+        return False
+
+async def connect_coral_client():
+    """Create the client off the event loop, retrying with exponential backoff until it succeeds."""
+    delay = CLIENT_INIT_RETRY_DELAY
+    while coral_client is None:
+        if await asyncio.to_thread(init_coral_client):
+            # Don't wait for the next scheduled round to report ready
+            await health.check_now()
+            return
+        wait = delay * random.uniform(0.5, 1.0)
+        logger.warning(f"Retrying Coral Protocol Client initialization in {wait:.1f}s")
+        await asyncio.sleep(wait)
+        delay = min(delay * 2, CLIENT_INIT_MAX_RETRY_DELAY)
+
+# Run upstream calls off the event loop
+upstream = UpstreamExecutor()
+metrics.register_gauges("coral_upstream", upstream.stats, {
+    "in_flight": "Upstream calls currently running",
+    "queue_depth": "Upstream calls waiting for an execution slot"
+})
+
+# Circuit breakers for the upstream operations
+for operation in ("register_agent", "send_message", "list_agents", "create_thread"):
+    upstream.breaker(operation)
+
+# Per-sender and per-recipient rate limits and fair ordering of message sends
+send_scheduler = FairScheduler()
+metrics.register_gauges("coral_send_scheduler", send_scheduler.stats, {
+    "in_flight": "Message sends currently running",
+    "queued": "Message sends waiting for their sender's turn or rate limit",
+    "throttled": "Message sends delayed by a sender or recipient rate limit",
+    "rejected": "Message sends rejected after waiting too long or with too many waiting",
+    "evicted": "Idle senders and recipients forgotten by the send scheduler"
+})
+
+# Maximum number of concurrent initial-message sends per thread
+THREAD_FANOUT_CONCURRENCY = int(os.getenv("CORAL_THREAD_FANOUT_CONCURRENCY", "10"))
+
+# Batch endpoint limits
+MAX_BATCH_SIZE = int(os.getenv("CORAL_MAX_BATCH_SIZE", "500"))
+BATCH_CONCURRENCY = int(os.getenv("CORAL_BATCH_CONCURRENCY", "10"))
+
+# Per-participant delivery status of initial messages
+delivery_tracker = DeliveryTracker()
+background_tasks = set()
+
+# Cached upstream agent list
+agent_cache = AgentListCache()
+metrics.register_gauges("coral_agent_cache_loads", agent_cache.loads.stats, {
+    "issued": "Agent list loads issued",
+    "coalesced": "Agent list requests that waited for a load already in flight"
+})
+
+# Largest page of /agents/list, and the media type of its streamed form
+MAX_AGENT_PAGE_SIZE = int(os.getenv("CORAL_MAX_AGENT_PAGE_SIZE", "1000"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Capability to agent name index behind /agents/search
+capability_index = CapabilityIndex()
+
+# Durable queue for messages sent with delivery="queued"
+message_queue = MessageQueue()
+
+# One upstream message subscription shared by all /messages/stream clients
+message_hub = MessageHub(sse_source(os.getenv("CORAL_STREAM_URL", os.getenv("CORAL_SERVER_URL", "http://coral.pushcollective.club/sse"))))
+metrics.register_gauges("coral_stream", message_hub.stats, {
+    "subscribers": "Clients connected to /messages/stream",
+    "events_received": "Messages received from the upstream stream"
+})
+
+# Local Postgres copy of the agents and threads, used when DB_HOST is set
+registry = Registry()
+REGISTRY_SYNC_INTERVAL = float(os.getenv("CORAL_REGISTRY_SYNC_INTERVAL", "300"))
+
+# Responses of send and create requests by Idempotency-Key, shared through the registry when it is configured
+idempotency = IdempotencyStore(backend=registry if Registry.configured() else None)
+
+# Cached readiness of the upstream client, Coral server, message queue and database
+health = HealthChecker()
+
+async def check_coral_client():
+    """Fail if this process has no Coral Protocol Client."""
+    if coral_client is None:
+        raise RuntimeError("Coral Protocol Client not initialized")
+
+health.add("coral_client", check_coral_client)
+health.add("coral_server", tcp_check(*url_address(os.getenv("CORAL_SERVER_URL", "http://coral.pushcollective.club/sse"))))
+health.add("message_queue", message_queue.ping)
+if Registry.configured():
+    health.add("postgres", registry.ping, critical=False)
+elif os.getenv("DB_HOST"):
+    health.add("postgres", tcp_check(os.getenv("DB_HOST"), int(os.getenv("DB_PORT", "5432"))), critical=False)
+
+# Pydantic models for request validation. Required fields must be non-empty, as
+# angus-core checks, since its proxy mode leaves the check to these models; an
+# empty batch gets check_batch_size()'s 400 like angus-core's
 class RegisterAgentRequest(BaseModel):
-    agent_name: str
+    agent_name: str = Field(min_length=1)
     capabilities: List[str] = []
 
 class SendMessageRequest(BaseModel):
-    recipient: str
-    content: str
+    recipient: str = Field(min_length=1)
+    content: str = Field(min_length=1)
     thread_id: Optional[str] = None
+    sender: Optional[str] = None
+    delivery: Literal["sync", "queued"] = "sync"
 
 class CreateThreadRequest(BaseModel):
-    participants: List[str]
+    participants: List[str] = Field(min_length=1)
     initial_message: Optional[str] = None
+    delivery: Literal["sync", "background"] = "sync"
+
+class RegisterAgentsBatchRequest(BaseModel):
+    agents: List[RegisterAgentRequest]
+
+class SendMessagesBatchRequest(BaseModel):
+    messages: List[SendMessageRequest]
+
+@app.on_event("startup")
+async def start_coral_client():
+    """
+    Create the upstream client in the worker process that serves requests.
+
+    The client is created in the background, retrying until it succeeds, so
+    the worker starts serving /live immediately; /ready reports the client as
+    down until it exists.
+    """
+    if coral_client is None:
+        task = asyncio.create_task(connect_coral_client())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@app.on_event("startup")
+async def start_message_queue():
+    """Start delivering queued messages, including those left from a previous run."""
+    try:
+        await message_queue.start(deliver_message)
+    except Exception as e:
+        logger.error(f"Failed to start outbound message queue: {str(e)}")
+
+async def sync_registry():
+    """
+    Keep the registry connected and in step with the upstream agent list.
+
+    Reconnects to Postgres after a failure, purges expired idempotency keys
+    and periodically mirrors the upstream agent list, so agents registered
+    elsewhere appear locally. Until the first sync succeeds it retries every
+    few seconds.
+    """
+    while True:
+        try:
+            if not registry.available:
+                await registry.start()
+                registry.seeded = await registry.count_agents() > 0
+            await registry.purge_requests()
+            if coral_client is not None:
+                started_at = await registry.now()
+                agents = await upstream.call(coral_client.list_agents)
+                await registry.sync_agents([(agent.name, agent.capabilities) for agent in agents], started_at)
+                registry.seeded = True
+                agent_cache.invalidate()
+        except Exception as e:
+            logger.error(f"Failed to sync agent registry: {str(e)}")
+        await asyncio.sleep(REGISTRY_SYNC_INTERVAL if registry.seeded else min(REGISTRY_SYNC_INTERVAL, 5.0))
+
+@app.on_event("startup")
+async def start_registry():
+    """Open the agent registry and start mirroring the upstream agent list."""
+    if Registry.configured():
+        task = asyncio.create_task(sync_registry())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@app.on_event("startup")
+async def start_health_checks():
+    """Start the background readiness checks."""
+    health.start()
+
+@app.on_event("shutdown")
+async def shutdown_upstream():
+    """Stop the message queue workers and release the upstream thread pool."""
+    await health.stop()
+    message_hub.stop()
+    await message_queue.stop()
+    await registry.stop()
+    upstream.shutdown()
+    tracing.tracer.shutdown()
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """Answer calls rejected by a circuit breaker or the admission limit with a fast 503."""
+    return FastJSONResponse(
+        status_code=503,
+        content={"status": "error", "reason": exc.reason, "message": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(IdempotencyError)
+async def idempotency_error_handler(request: Request, exc: IdempotencyError):
+    """Reject an Idempotency-Key that is invalid, reused for another request or still in progress."""
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))} if exc.retry_after else None
+    return FastJSONResponse(
+        status_code=exc.status_code,
+        content={"status": "error", "reason": REJECTION_REASON, "message": str(exc)},
+        headers=headers
+    )
 
 # Health check endpoint
 @app.get("/")
@@ -74,6 +335,116 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "message": "Coral Protocol Service is running"}
 
+# Liveness probe endpoint
+@app.get("/live")
+async def live():
+    """Liveness probe: the process is up and its event loop is responsive."""
+    return {"status": "ok"}
+
+# Readiness probe endpoint
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe answered from the cached background dependency checks."""
+    if not health.ready:
+        response.status_code = 503
+    return health.report()
+
+# Metrics endpoint
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Expose Prometheus metrics."""
+    return metrics.metrics_response()
+
+# Execution layer status endpoint
+@app.get("/status/executor")
+async def executor_status():
+    """Report upstream execution layer concurrency and queue depth."""
+    return {
+        "status": "success",
+        "executor": upstream.stats()
+    }
+
+def batch_results(results: List[Any], key: str, values: List[str]) -> Dict[str, Any]:
+    """Build the per-item response of a batch endpoint from gather_bounded() results."""
+    items_out = []
+    for value, result in zip(values, results):
+        if isinstance(result, Exception):
+            items_out.append({key: value, "status": "error", "message": str(result)})
+        else:
+            items_out.append({key: value, "status": "success", **result})
+    failed = sum(1 for item in items_out if item["status"] == "error")
+    return {
+        "status": "success",
+        "succeeded": len(items_out) - failed,
+        "failed": failed,
+        "results": items_out
+    }
+
+def check_batch_size(size: int):
+    """Reject empty or oversized batches."""
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if size > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch size {size} exceeds the maximum of {MAX_BATCH_SIZE}")
+
+async def record_in_registry(description: str, write: Callable[[], Awaitable[Any]]):
+    """Write to the registry if it is available; the upstream call already succeeded, so only log failures."""
+    if not registry.available:
+        return
+    try:
+        await write()
+    except Exception as e:
+        logger.error(f"Failed to record {description} in registry: {str(e)}")
+
+def agents_registered():
+    """
+    Drop the cached agent list after registrations.
+
+    If the capability index was built from the cached list, it already holds
+    the new agents through upsert(), so it counts as built from the list the
+    next load returns and isn't rebuilt for it; a later refresh brings in
+    changes made elsewhere.
+    """
+    cached = agent_cache.snapshot
+    agent_cache.invalidate()
+    if cached is not None and cached.sequence == capability_index.version:
+        capability_index.version = agent_cache.sequence + 1
+
+async def register_one(request: RegisterAgentRequest) -> Dict[str, Any]:
+    """Register a single agent upstream and in the local registry."""
+    agent = Agent(name=request.agent_name, capabilities=request.capabilities)
+    await upstream.call(coral_client.register_agent, agent)
+    await record_in_registry(
+        f"agent '{request.agent_name}'",
+        lambda: registry.upsert_agents([(request.agent_name, request.capabilities)])
+    )
+    capability_index.upsert(request.agent_name, request.capabilities)
+    return {"message": f"Successfully registered agent '{request.agent_name}' with capabilities: {request.capabilities}"}
+
+async def deliver_message(recipient: str, content: str, thread_id: Optional[str] = None, sender: Optional[str] = None):
+    """
+    Send a message to the upstream Coral server once the sender's and recipient's rate limits allow.
+
+    Raises:
+        UpstreamUnavailable: While the client is still being created; the
+            outbound queue retries such a delivery without counting an attempt
+    """
+    if coral_client is None:
+        raise UpstreamUnavailable("Coral Protocol Client not initialized", "not_ready", CLIENT_INIT_RETRY_DELAY)
+    message = HumanMessage(content=content)
+    if thread_id:
+        await send_scheduler.run(sender, recipient, upstream.call, coral_client.send_message, recipient, message, thread_id=thread_id)
+    else:
+        await send_scheduler.run(sender, recipient, upstream.call, coral_client.send_message, recipient, message)
+
+async def send_one(request: SendMessageRequest) -> Dict[str, Any]:
+    """Send a single message upstream, or queue it for background delivery."""
+    if request.delivery == "queued":
+        message_id = await message_queue.enqueue(request.recipient, request.content, request.thread_id, request.sender)
+        return {"message": f"Queued message for '{request.recipient}'", "message_id": message_id}
+    await deliver_message(request.recipient, request.content, request.thread_id, request.sender)
+    return {"message": f"Successfully sent message to '{request.recipient}'"}
+
 # Register agent endpoint
 @app.post("/agents/register")
 async def register_agent(request: RegisterAgentRequest):
@@ -82,90 +453,447 @@ async def register_agent(request: RegisterAgentRequest):
         raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
     
     try:
-        agent = Agent(name=request.agent_name, capabilities=request.capabilities)
-        coral_client.register_agent(agent)
+        result = await register_one(request)
+        agents_registered()
         return {
             "status": "success",
-            "message": f"Successfully registered agent '{request.agent_name}' with capabilities: {request.capabilities}"
+            **result
         }
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Failed to register agent: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to register agent: {str(e)}")
 
+# Batch register agents endpoint
+@app.post("/agents/register_batch")
+async def register_agents_batch(request: RegisterAgentsBatchRequest):
+    """Register several agents with the Coral Protocol, reporting the result per agent."""
+    if not coral_client:
+        raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
+    check_batch_size(len(request.agents))
+    
+    results = await gather_bounded([register_one(agent) for agent in request.agents], BATCH_CONCURRENCY)
+    response = batch_results(results, "agent_name", [agent.agent_name for agent in request.agents])
+    if response["succeeded"]:
+        agents_registered()
+    if response["failed"]:
+        logger.error(f"Failed to register {response['failed']} of {len(request.agents)} agents in batch")
+    return response
+
 # Send message endpoint
 @app.post("/messages/send")
-async def send_message(request: SendMessageRequest):
-    """Send a message to another agent."""
+async def send_message(
+    request: SendMessageRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Send a message to another agent.
+
+    A repeated Idempotency-Key returns the first response without sending
+    the message again.
+    """
     if not coral_client:
         raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
     
-    try:
-        message = HumanMessage(content=request.content)
-        if request.thread_id:
-            coral_client.send_message(request.recipient, message, thread_id=request.thread_id)
-        else:
-            coral_client.send_message(request.recipient, message)
-        return {
+    async def send():
+        result = await send_one(request)
+        return 202 if request.delivery == "queued" else 200, {
             "status": "success",
-            "message": f"Successfully sent message to '{request.recipient}'"
+            **result
         }
+    
+    try:
+        response.status_code, body, replayed = await idempotency.run(idempotency_key, "messages.send", request.model_dump(), send)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except (UpstreamUnavailable, IdempotencyError):
+        raise
     except Exception as e:
         logger.error(f"Failed to send message: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
+# Queued message status endpoint
+@app.get("/messages/status/{message_id}")
+async def message_status(message_id: str):
+    """Get the delivery status of a queued message."""
+    message = await message_queue.get(message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail=f"Unknown message '{message_id}'")
+    
+    return {
+        "status": "success",
+        "queued_message": message
+    }
+
+# Message queue status endpoint
+@app.get("/status/queue")
+async def queue_status():
+    """Report outbound message queue depth and delivery latency percentiles."""
+    return {
+        "status": "success",
+        "queue": await message_queue.stats()
+    }
+
+# Send rate limit status endpoint
+@app.get("/status/rate_limits")
+async def rate_limit_status():
+    """Report per-sender and per-recipient throttling and send queue wait."""
+    return {
+        "status": "success",
+        "rate_limits": send_scheduler.stats()
+    }
+
+# Tracing status endpoint
+@app.get("/status/tracing")
+async def tracing_status():
+    """Report the trace exporter, sample rate and exported spans."""
+    return {
+        "status": "success",
+        "tracing": tracing.tracer.stats()
+    }
+
+# Idempotency key status endpoint
+@app.get("/status/idempotency")
+async def idempotency_status():
+    """Report stored idempotency keys and replayed requests."""
+    return {
+        "status": "success",
+        "idempotency": idempotency.stats()
+    }
+
+# Inbound message stream endpoint
+@app.get("/messages/stream")
+async def stream_messages(
+    request: Request,
+    agent: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Stream inbound messages as server-sent events.
+
+    Messages can be filtered by recipient agent and thread. A reconnecting
+    client sends Last-Event-ID to receive the events it missed, as far as they
+    are still buffered.
+    """
+    subscription = message_hub.subscribe(agent=agent, thread_id=thread_id, last_event_id=last_event_id)
+    return StreamingResponse(
+        message_hub.sse(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Message stream status endpoint
+@app.get("/status/stream")
+async def stream_status():
+    """Report stream subscribers and the upstream subscription state."""
+    return {
+        "status": "success",
+        "stream": message_hub.stats()
+    }
+
+# Batch send messages endpoint
+@app.post("/messages/send_batch")
+async def send_messages_batch(request: SendMessagesBatchRequest):
+    """Send several messages, reporting the result per message."""
+    if not coral_client:
+        raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
+    check_batch_size(len(request.messages))
+    
+    results = await gather_bounded([send_one(message) for message in request.messages], BATCH_CONCURRENCY)
+    response = batch_results(results, "recipient", [message.recipient for message in request.messages])
+    if response["failed"]:
+        logger.error(f"Failed to send {response['failed']} of {len(request.messages)} messages in batch")
+    return response
+
+async def load_agents() -> List[Dict[str, Any]]:
+    """
+    Load the agent list from the local registry, or from the upstream Coral server if it isn't usable.
+
+    Raises:
+        UpstreamUnavailable: The registry read failed while the client is still being created
+    """
+    if registry.available and registry.seeded:
+        try:
+            return await registry.list_agents()
+        except Exception as e:
+            if coral_client is None:
+                logger.error(f"Failed to load agents from registry, and the Coral Protocol Client is not initialized: {str(e)}")
+                raise UpstreamUnavailable("Coral Protocol Client not initialized", "not_ready", CLIENT_INIT_RETRY_DELAY) from e
+            logger.error(f"Failed to load agents from registry, asking upstream: {str(e)}")
+    agents = await upstream.call(coral_client.list_agents)
+    return [{"name": agent.name, "capabilities": list(agent.capabilities)} for agent in agents]
+
 # List agents endpoint
 @app.get("/agents/list")
-async def list_agents(include_details: bool = True):
-    """List available agents registered with the Coral Protocol."""
-    if not coral_client:
+async def list_agents(
+    include_details: bool = True,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    List available agents registered with the Coral Protocol.
+
+    With `limit` (or `cursor`) the agents are returned one page at a time in
+    name order, with the cursor of the next page. A client that accepts
+    application/x-ndjson receives the list streamed one agent per line, with
+    the next cursor in the X-Next-Cursor header.
+    """
+    if not coral_client and not (registry.available and registry.seeded):
         raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
     
     try:
-        agents = coral_client.list_agents()
-        result = []
-        for agent in agents:
-            if include_details:
-                result.append({
-                    "name": agent.name,
-                    "capabilities": agent.capabilities
-                })
-            else:
-                result.append(agent.name)
+        snapshot = await agent_cache.get(load_agents)
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+        if limit is not None:
+            limit = max(1, min(limit, MAX_AGENT_PAGE_SIZE))
+        if accept and NDJSON_MEDIA_TYPE in accept:
+            # Streamed, so the compression middleware compresses it whenever the client accepts an encoding
+            headers["ETag"] = snapshot.etag(include_details, NDJSON_MEDIA_TYPE, choose_encoding(accept_encoding, compression_encodings))
+            if etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+            chunks, next_cursor = snapshot.ndjson(include_details, limit=limit, after=cursor)
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = next_cursor
+            return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        
+        media_type = response_media_type()
+        full = limit is None and cursor is None
+        if full:
+            body = snapshot.body(include_details, media_type)
+        else:
+            agents, next_cursor = snapshot.page(include_details, limit or MAX_AGENT_PAGE_SIZE, after=cursor)
+            body = render({"status": "success", "agents": agents, "next_cursor": next_cursor}, media_type)
+        encoding = choose_encoding(accept_encoding, compression_encodings) if len(body) >= DEFAULT_COMPRESSION_MIN_SIZE else None
+        headers["ETag"] = snapshot.etag(include_details, media_type, encoding)
+        if etag_matches(if_none_match, headers["ETag"]):
+            # Same Vary as the 200, so caches keep one entry per Accept and Accept-Encoding
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            # The full list is compressed once per snapshot rather than by the middleware on every request
+            body = snapshot.body(include_details, media_type, encoding) if full else compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=media_type, headers=headers)
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to list agents: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list agents: {str(e)}")
+
+# Search agents by capability endpoint
+@app.get("/agents/search")
+async def search_agents(
+    capability: List[str] = Query(...),
+    match: Literal["all", "any"] = MATCH_ALL,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_details: bool = False
+):
+    """
+    Find agents by capability.
+
+    With match=all an agent must have every requested capability, with
+    match=any at least one. Agents are returned in name order; pass the
+    returned next_cursor to get the following page.
+    """
+    if not coral_client and not (registry.available and registry.seeded):
+        raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
+    
+    try:
+        # Rebuild the index only from a list loaded after the one it holds; registrations patch it in place
+        snapshot = await agent_cache.get(load_agents)
+        if capability_index.version is None or snapshot.sequence > capability_index.version:
+            capability_index.replace(snapshot.agents, version=snapshot.sequence)
+        names, next_cursor = capability_index.search(capability, match=match, limit=limit, after=cursor)
+        agents = [{"name": name, "capabilities": capability_index.capabilities(name)} for name in names] if include_details else names
         return {
             "status": "success",
-            "agents": result
+            "agents": agents,
+            "next_cursor": next_cursor
         }
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
-        logger.error(f"Failed to list agents: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to list agents: {str(e)}")
+        logger.error(f"Failed to search agents: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to search agents: {str(e)}")
+
+# Upstream resilience status endpoint
+@app.get("/status/upstream")
+async def upstream_status():
+    """Report circuit breaker states and calls shed by the admission limit."""
+    return {
+        "status": "success",
+        "upstream": upstream.resilience_stats()
+    }
+
+# Agent cache status endpoint
+@app.get("/status/agent_cache")
+async def agent_cache_status():
+    """Report agent list cache freshness and hit rates."""
+    return {
+        "status": "success",
+        "agent_cache": agent_cache.stats(),
+        "capability_index": capability_index.stats()
+    }
+
+async def deliver_initial_message(thread_id: str, sender: str, recipients: List[str], content: str) -> Dict[str, Dict[str, Any]]:
+    """Send a thread's initial message to all recipients concurrently."""
+    message = HumanMessage(content=content)
+
+    async def deliver(recipient):
+        try:
+            await send_scheduler.run(sender, recipient, upstream.call, coral_client.send_message, recipient, message, thread_id=thread_id)
+            delivery_tracker.mark_delivered(thread_id, recipient)
+        except Exception as e:
+            logger.error(f"Failed to deliver initial message of thread {thread_id} to '{recipient}': {str(e)}")
+            delivery_tracker.mark_failed(thread_id, recipient, str(e))
+
+    await gather_bounded([deliver(recipient) for recipient in recipients], THREAD_FANOUT_CONCURRENCY)
+    return delivery_tracker.get(thread_id) or {}
+
+async def create_one_thread(request: CreateThreadRequest) -> Tuple[int, Dict[str, Any]]:
+    """
+    Create a thread upstream and deliver its initial message.
+
+    Once the thread exists the result is a response, not an error, so that it
+    is stored under the Idempotency-Key: a sync delivery that fails for some
+    participants answers 207 with the thread ID and each participant's status,
+    and a retry with the same key replays it instead of creating another thread.
+    """
+    thread_id = str(uuid.uuid4())
+    thread = Thread(id=thread_id, participants=request.participants)
+    await upstream.call(coral_client.create_thread, thread)
+    await record_in_registry(f"thread {thread_id}", lambda: registry.record_thread(thread_id, request.participants))
+    
+    response = {
+        "status": "success",
+        "thread_id": thread_id,
+        "message": f"Successfully created thread with participants: {request.participants}"
+    }
+    
+    if request.initial_message:
+        # Don't send to the first participant (assumed to be the sender)
+        recipients = [p for p in request.participants if p != request.participants[0]]
+        delivery_tracker.start(thread_id, recipients)
+        if request.delivery == "background":
+            task = asyncio.create_task(deliver_initial_message(thread_id, request.participants[0], recipients, request.initial_message))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+            response["delivery"] = "background"
+        else:
+            statuses = await deliver_initial_message(thread_id, request.participants[0], recipients, request.initial_message)
+            response["delivery"] = "sync"
+            failed = [recipient for recipient, status in statuses.items() if status["status"] == "failed"]
+            if failed:
+                logger.error(f"Created thread {thread_id} but failed to deliver its initial message to: {failed}")
+                response.update({
+                    "status": "partial",
+                    "message": f"Created thread but failed to deliver the initial message to: {failed}",
+                    "failed": failed,
+                    "participants": statuses
+                })
+                return 207, response
+    
+    return 200, response
 
 # Create thread endpoint
 @app.post("/threads/create")
-async def create_thread(request: CreateThreadRequest):
-    """Create a new thread with participants."""
+async def create_thread(
+    request: CreateThreadRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Create a new thread with participants.
+
+    A repeated Idempotency-Key returns the first response, with the same
+    thread ID, without creating another thread.
+    """
     if not coral_client:
         raise HTTPException(status_code=500, detail="Coral Protocol Client not initialized")
     
     try:
-        thread_id = str(uuid.uuid4())
-        thread = Thread(id=thread_id, participants=request.participants)
-        coral_client.create_thread(thread)
-        
-        if request.initial_message:
-            message = HumanMessage(content=request.initial_message)
-            for participant in request.participants:
-                if participant != request.participants[0]:  # Don't send to the first participant (assumed to be the sender)
-                    coral_client.send_message(participant, message, thread_id=thread_id)
-        
-        return {
-            "status": "success",
-            "thread_id": thread_id,
-            "message": f"Successfully created thread with participants: {request.participants}"
-        }
+        status_code, body, replayed = await idempotency.run(
+            idempotency_key, "threads.create", request.model_dump(), lambda: create_one_thread(request)
+        )
+        response.status_code = status_code
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except (UpstreamUnavailable, IdempotencyError):
+        raise
     except Exception as e:
         logger.error(f"Failed to create thread: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create thread: {str(e)}")
 
+# Thread delivery status endpoint
+@app.get("/threads/{thread_id}/delivery")
+async def thread_delivery(thread_id: str):
+    """Get the per-participant delivery status of a thread's initial message."""
+    participants = delivery_tracker.get(thread_id)
+    if participants is None:
+        raise HTTPException(status_code=404, detail=f"No delivery status for thread '{thread_id}'")
+    
+    return {
+        "status": "success",
+        "thread_id": thread_id,
+        "complete": DeliveryTracker.is_complete(participants),
+        "participants": participants
+    }
+
+# Thread lookup endpoint
+@app.get("/threads/{thread_id}")
+async def get_thread(thread_id: str):
+    """Look up a thread in the local registry."""
+    try:
+        thread = await registry.get_thread(thread_id)
+    except RegistryUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if thread is None:
+        raise HTTPException(status_code=404, detail=f"Unknown thread '{thread_id}'")
+    
+    return {
+        "status": "success",
+        **thread
+    }
+
+# Threads by participant endpoint
+@app.get("/threads")
+async def find_threads(participant: str, limit: int = 100, cursor: Optional[str] = None):
+    """
+    List the threads an agent participates in, newest first, from the local registry.
+    
+    Pass the returned next_cursor as `cursor` to get the next page.
+    """
+    limit = max(1, min(limit, MAX_THREAD_PAGE_SIZE))
+    before = None
+    if cursor:
+        try:
+            created_at, _, thread_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+            before = (datetime.fromisoformat(created_at), thread_id)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        threads = await registry.find_threads(participant, limit=limit, before=before)
+    except RegistryUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    next_cursor = None
+    if len(threads) == limit:
+        next_cursor = base64.urlsafe_b64encode(f"{threads[-1]['created_at']}|{threads[-1]['thread_id']}".encode()).decode()
+    return {
+        "status": "success",
+        "participant": participant,
+        "threads": threads,
+        "next_cursor": next_cursor
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8001))
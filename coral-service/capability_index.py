@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Capability Index
+
+This module keeps an in-memory inverted index from capability to agent names
+for the /agents/search endpoint. Each capability's posting list is kept
+sorted by agent name, so a page of results is found by walking the posting
+lists from the cursor instead of scanning every agent:
+
+    match="all"  walk the shortest posting list, keep names present in all
+    match="any"  merge the posting lists in name order, skipping duplicates
+
+The index is rebuilt from each agent list loaded after the one it was built
+from, and patched in place when an agent is registered.
+"""
+import heapq
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maximum number of agents returned by one search
+MAX_SEARCH_PAGE_SIZE = 1000
+
+# Match modes
+MATCH_ALL = "all"
+MATCH_ANY = "any"
+
+def _tail(postings: List[str], after: Optional[str]) -> Iterator[str]:
+    """Names of a posting list that sort after the cursor."""
+    for i in range(bisect_right(postings, after) if after is not None else 0, len(postings)):
+        yield postings[i]
+
+class CapabilityIndex:
+    """
+    Inverted index from capability to the sorted names of the agents that have it.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, List[str]] = {}
+        self._postings: Dict[str, List[str]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        # Identifies the agent list the index was last built from
+        self.version: Optional[str] = None
+
+    def replace(self, agents: Iterable[Dict[str, Any]], version: Optional[str] = None):
+        """
+        Rebuild the index from a complete agent list.
+
+        Args:
+            agents: Agents as {"name": ..., "capabilities": [...]} dicts
+            version: Identifier of the agent list, e.g. the sequence number of its load
+        """
+        capabilities_by_agent: Dict[str, List[str]] = {}
+        members: Dict[str, Set[str]] = {}
+        for agent in agents:
+            capabilities = list(dict.fromkeys(agent.get("capabilities") or []))
+            capabilities_by_agent[agent["name"]] = capabilities
+            for capability in capabilities:
+                members.setdefault(capability, set()).add(agent["name"])
+        self._agents = capabilities_by_agent
+        self._members = members
+        self._postings = {capability: sorted(names) for capability, names in members.items()}
+        self.version = version
+
+    def _remove_from(self, name: str, capability: str):
+        postings = self._postings[capability]
+        del postings[bisect_left(postings, name)]
+        self._members[capability].discard(name)
+        if not postings:
+            del self._postings[capability]
+            del self._members[capability]
+
+    def upsert(self, name: str, capabilities: List[str]):
+        """
+        Add an agent or replace its capabilities.
+
+        Args:
+            name: Agent name
+            capabilities: The agent's capabilities
+        """
+        capabilities = list(dict.fromkeys(capabilities or []))
+        previous = set(self._agents.get(name, []))
+        for capability in previous - set(capabilities):
+            self._remove_from(name, capability)
+        for capability in capabilities:
+            if capability in previous:
+                continue
+            insort(self._postings.setdefault(capability, []), name)
+            self._members.setdefault(capability, set()).add(name)
+        self._agents[name] = capabilities
+
+    def capabilities(self, name: str) -> List[str]:
+        """Capabilities of an indexed agent."""
+        return self._agents.get(name, [])
+
+    def _match_all(self, capabilities: List[str], after: Optional[str]) -> Iterator[str]:
+        if not capabilities or any(capability not in self._postings for capability in capabilities):
+            return
+        ordered = sorted(set(capabilities), key=lambda capability: len(self._postings[capability]))
+        others = [self._members[capability] for capability in ordered[1:]]
+        for name in _tail(self._postings[ordered[0]], after):
+            if all(name in members for members in others):
+                yield name
+
+    def _match_any(self, capabilities: List[str], after: Optional[str]) -> Iterator[str]:
+        lists = [_tail(self._postings[capability], after) for capability in set(capabilities) if capability in self._postings]
+        previous = None
+        for name in heapq.merge(*lists):
+            if name != previous:
+                previous = name
+                yield name
+
+    def search(
+        self,
+        capabilities: List[str],
+        match: str = MATCH_ALL,
+        limit: int = 100,
+        after: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Find agents by capability, in name order.
+
+        Args:
+            capabilities: Capabilities to look for
+            match: "all" for agents with every capability, "any" for at least one
+            limit: Maximum number of agents to return
+            after: Return agents whose name sorts after this cursor
+
+        Returns:
+            Tuple[List[str], Optional[str]]: Matching agent names and the cursor
+                of the next page, or None on the last page
+        """
+        limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+        matches = self._match_all(capabilities, after) if match == MATCH_ALL else self._match_any(capabilities, after)
+        names = []
+        for name in matches:
+            if len(names) == limit:
+                return names, names[-1]
+            names.append(name)
+        return names, None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index size.
+
+        Returns:
+            Dict: Number of agents and distinct capabilities, and the list version indexed
+        """
+        return {
+            "version": self.version,
+            "agents": len(self._agents),
+            "capabilities": len(self._postings)
+        }
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Transparent Compression
+
+This module provides the ASGI middleware that lets clients compress request
+bodies and receive compressed responses. A request body sent with
+Content-Encoding gzip (or zstd, when zstandard is installed) is decompressed
+before it reaches the endpoint, up to a maximum decompressed size beyond which
+the request is answered with 413. A response of at least the minimum size is
+compressed with the encoding the client's Accept-Encoding header prefers;
+smaller ones, already-encoded ones and event streams are sent as they are.
+
+Every response lists the request encodings the service accepts in its own
+Accept-Encoding header (RFC 7694), so clients know they may compress what
+they send.
+"""
+import os
+import gzip
+import zlib
+import logging
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from fast_json import FastJSONResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default compression settings
+DEFAULT_COMPRESSION_ENCODINGS = os.getenv("CORAL_COMPRESSION_ENCODINGS", "zstd,gzip")
+DEFAULT_COMPRESSION_MIN_SIZE = int(os.getenv("CORAL_COMPRESSION_MIN_SIZE", "1024"))
+DEFAULT_GZIP_LEVEL = int(os.getenv("CORAL_GZIP_LEVEL", "1"))
+DEFAULT_ZSTD_LEVEL = int(os.getenv("CORAL_ZSTD_LEVEL", "3"))
+DEFAULT_MAX_DECOMPRESSED_SIZE = int(os.getenv("CORAL_MAX_DECOMPRESSED_SIZE", str(16 * 1024 * 1024)))
+
+# Response media types that are never compressed, since each event must reach the client as it is sent
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream",)
+
+# Output produced per decompression step, bounding memory spent on a body over the limit
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+class DecompressedSizeExceeded(Exception):
+    """A compressed request body expands beyond the maximum decompressed size."""
+
+def available_encodings() -> List[str]:
+    """Content codings this process can compress and decompress."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+def parse_encodings(value: str) -> List[str]:
+    """
+    Parse a preference-ordered list of content codings.
+
+    Args:
+        value: Comma-separated codings, e.g. "zstd,gzip"
+
+    Returns:
+        List: The codings that are available, in the given order
+    """
+    available = available_encodings()
+    encodings = []
+    for item in value.split(","):
+        encoding = item.strip().lower()
+        if not encoding:
+            continue
+        if encoding not in available:
+            logger.warning(f"Compression encoding '{encoding}' is not available, skipping it")
+            continue
+        encodings.append(encoding)
+    return encodings
+
+def _qualities(header: Optional[str]) -> Dict[str, float]:
+    """Content codings of an Accept-Encoding header mapped to their quality values."""
+    qualities = {}
+    for part in (header or "").split(","):
+        encoding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if encoding:
+            qualities[encoding.strip().lower()] = quality
+    return qualities
+
+def choose_encoding(accept_encoding: Optional[str], encodings: List[str]) -> Optional[str]:
+    """
+    Pick the response content coding for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Value of the request's Accept-Encoding header
+        encodings: Codings the service offers, most preferred first
+
+    Returns:
+        Optional[str]: The coding with the highest quality, ties going to the
+            service's preference, or None to send the response uncompressed
+    """
+    if not accept_encoding:
+        return None
+    qualities = _qualities(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compress a body.
+
+    Args:
+        data: Body to compress
+        encoding: "gzip" or "zstd"
+
+    Returns:
+        bytes: The compressed body
+    """
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=DEFAULT_GZIP_LEVEL, mtime=0)
+
+def decompress(data: bytes, encoding: str, max_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE) -> bytes:
+    """
+    Decompress a request body without expanding it past a maximum size.
+
+    Args:
+        data: Compressed body
+        encoding: "gzip" or "zstd"
+        max_size: Largest decompressed size accepted, in bytes
+
+    Returns:
+        bytes: The decompressed body
+
+    Raises:
+        DecompressedSizeExceeded: If the body expands beyond max_size
+        ValueError: If the body isn't valid for the encoding
+    """
+    chunks = []
+    size = 0
+
+    def add(chunk: bytes):
+        nonlocal size
+        size += len(chunk)
+        if size > max_size:
+            raise DecompressedSizeExceeded(f"Request body exceeds the maximum decompressed size of {max_size} bytes")
+        chunks.append(chunk)
+
+    if encoding == "zstd":
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True) as reader:
+                while True:
+                    chunk = reader.read(DECOMPRESS_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    add(chunk)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd body: {str(e)}")
+    else:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            while data:
+                add(decompressor.decompress(data, DECOMPRESS_CHUNK_SIZE))
+                data = decompressor.unconsumed_tail
+            add(decompressor.flush())
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip body: {str(e)}")
+        if not decompressor.eof:
+            raise ValueError("Invalid gzip body: truncated")
+    return b"".join(chunks)
+
+class _StreamCompressor:
+    """Compresses a streamed response chunk by chunk, flushing each so the client can decode it right away."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._compressor = zlib.compressobj(DEFAULT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        compressed = self._compressor.compress(data)
+        return compressed + (self._compressor.flush() if final else self._compressor.flush(self._flush_mode))
+
+class CompressionMiddleware:
+    """
+    ASGI middleware decompressing request bodies and compressing responses
+    according to Content-Encoding and Accept-Encoding.
+    """
+
+    def __init__(
+        self,
+        app,
+        encodings: Optional[List[str]] = None,
+        minimum_size: int = DEFAULT_COMPRESSION_MIN_SIZE,
+        max_decompressed_size: int = DEFAULT_MAX_DECOMPRESSED_SIZE,
+    ):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap
+            encodings: Response codings offered, most preferred first; empty to never compress responses
+            minimum_size: Smallest response body compressed, in bytes
+            max_decompressed_size: Largest decompressed request body accepted, in bytes
+        """
+        self.app = app
+        self.encodings = encodings if encodings is not None else parse_encodings(DEFAULT_COMPRESSION_ENCODINGS)
+        self.minimum_size = minimum_size
+        self.max_decompressed_size = max_decompressed_size
+        self.accepted = ", ".join(available_encodings())
+
+    async def _reject(self, send, status_code: int, message: str):
+        response = FastJSONResponse(
+            status_code=status_code,
+            content={"status": "error", "message": message},
+            headers={"Accept-Encoding": self.accepted}
+        )
+        await response({"type": "http"}, None, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "identity").strip().lower()
+        if content_encoding != "identity":
+            if content_encoding not in available_encodings():
+                await self._reject(send, 415, f"Unsupported Content-Encoding '{content_encoding}'")
+                return
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            try:
+                body = decompress(b"".join(chunks), content_encoding, self.max_decompressed_size)
+            except DecompressedSizeExceeded as e:
+                await self._reject(send, 413, str(e))
+                return
+            except ValueError as e:
+                await self._reject(send, 400, str(e))
+                return
+
+            scope = dict(scope, headers=[
+                (name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")
+            ] + [(b"content-length", str(len(body)).encode("latin-1"))])
+            replayed = False
+
+            async def receive_body():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            await self._respond(scope, receive_body, send, headers.get("accept-encoding"))
+            return
+
+        await self._respond(scope, receive, send, headers.get("accept-encoding"))
+
+    async def _respond(self, scope, receive, send, accept_encoding: Optional[str]):
+        encoding = choose_encoding(accept_encoding, self.encodings)
+        start = None
+        stream: Optional[_StreamCompressor] = None
+
+        async def send_wrapper(message):
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start is None:
+                if stream is not None:
+                    message = dict(message, body=stream.compress(message.get("body", b""), not message.get("more_body", False)))
+                await send(message)
+                return
+
+            response_start, start = start, None
+            response_headers = MutableHeaders(scope=response_start)
+            response_headers["Accept-Encoding"] = self.accepted
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            compressible = (
+                "content-encoding" not in response_headers
+                and response_start["status"] not in (204, 304)
+                and not response_headers.get("content-type", "").startswith(UNCOMPRESSED_MEDIA_TYPES)
+            )
+            if compressible and "accept-encoding" not in response_headers.get("vary", "").lower():
+                response_headers.add_vary_header("Accept-Encoding")
+            if encoding is None or not compressible or (not more_body and len(body) < self.minimum_size):
+                await send(response_start)
+                await send(message)
+                return
+
+            response_headers["Content-Encoding"] = encoding
+            if more_body:
+                # Streamed response: compress as it goes
+                del response_headers["Content-Length"]
+                stream = _StreamCompressor(encoding)
+                body = stream.compress(body, False)
+            else:
+                body = compress(body, encoding)
+                response_headers["Content-Length"] = str(len(body))
+            await send(response_start)
+            await send(dict(message, body=body))
+
+        await self.app(scope, receive, send_wrapper)
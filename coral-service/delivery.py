@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Thread Delivery Tracking
+
+This module records the per-participant delivery status of a thread's initial
+message, so callers that create a thread with background delivery can poll
+for the outcome.
+"""
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maximum number of threads whose delivery status is kept
+DEFAULT_MAX_TRACKED_THREADS = int(os.getenv("CORAL_DELIVERY_TRACKING_MAX", "10000"))
+
+# Delivery states
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+class DeliveryTracker:
+    """
+    Bounded in-memory store of initial-message delivery status per thread.
+
+    The least recently created threads are evicted once `max_threads` is
+    exceeded.
+    """
+
+    def __init__(self, max_threads: int = DEFAULT_MAX_TRACKED_THREADS):
+        """
+        Initialize the tracker.
+
+        Args:
+            max_threads: Maximum number of threads to keep status for
+        """
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+
+    def start(self, thread_id: str, recipients: List[str]):
+        """
+        Start tracking delivery to the given recipients.
+
+        Args:
+            thread_id: ID of the thread
+            recipients: Participants the initial message is sent to
+        """
+        self._threads[thread_id] = {recipient: {"status": PENDING} for recipient in recipients}
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+    def mark_delivered(self, thread_id: str, recipient: str):
+        """Record a successful delivery."""
+        self._update(thread_id, recipient, {"status": DELIVERED, "delivered_at": time.time()})
+
+    def mark_failed(self, thread_id: str, recipient: str, error: str):
+        """Record a failed delivery."""
+        self._update(thread_id, recipient, {"status": FAILED, "error": error})
+
+    def _update(self, thread_id: str, recipient: str, status: Dict[str, Any]):
+        participants = self._threads.get(thread_id)
+        if participants is not None:
+            participants[recipient] = status
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Get the delivery status of a thread.
+
+        Args:
+            thread_id: ID of the thread
+
+        Returns:
+            Optional[Dict]: Status per recipient, or None if the thread is not tracked
+        """
+        participants = self._threads.get(thread_id)
+        if participants is None:
+            return None
+        return {recipient: dict(status) for recipient, status in participants.items()}
+
+    @staticmethod
+    def is_complete(participants: Dict[str, Dict[str, Any]]) -> bool:
+        """Whether no delivery in the status dict is still pending."""
+        return all(status["status"] != PENDING for status in participants.values())
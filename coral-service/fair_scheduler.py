@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Fair Send Scheduling
+
+This module rate-limits outbound messages per sender and per recipient with
+token buckets and shares the service's upstream send capacity fairly between
+senders. Sends that are over a limit, or that find every send slot busy, wait
+in a per-sender queue instead of being rejected; when a slot frees up, the
+waiting sender with the smallest weighted virtual finish time goes next
+(weighted fair queueing), so one agent's burst waits behind its own earlier
+messages rather than in front of everyone else's.
+
+Each sender's messages are started in the order they arrived. A send is only
+rejected, with UpstreamUnavailable, when its sender already has too many
+messages waiting or it has waited longer than the configured maximum.
+
+Sender and recipient names come from clients, so the state kept per name is
+bounded: entries idle for longer than the idle timeout are dropped (a token
+bucket only once it has refilled, so dropping it changes nothing), and beyond
+the tracked maximum the least recently used entries are dropped, except for
+senders that still have messages waiting.
+
+Senders with messages waiting are kept in a heap ordered by the virtual
+finish time of their oldest message, and those held back by an empty token
+bucket in a second heap ordered by when it refills, so starting the next
+send takes O(log senders) rather than a scan of every sender.
+"""
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import metrics
+from resilience import UpstreamUnavailable
+from tracing import tracer
+from upstream import DEFAULT_UPSTREAM_CONCURRENCY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default scheduler settings; a rate of 0 disables that token bucket
+DEFAULT_SENDER_RATE = float(os.getenv("CORAL_SENDER_RATE", "0"))
+DEFAULT_SENDER_BURST = float(os.getenv("CORAL_SENDER_BURST", "20"))
+DEFAULT_RECIPIENT_RATE = float(os.getenv("CORAL_RECIPIENT_RATE", "0"))
+DEFAULT_RECIPIENT_BURST = float(os.getenv("CORAL_RECIPIENT_BURST", "20"))
+DEFAULT_SENDER_WEIGHTS = os.getenv("CORAL_SENDER_WEIGHTS", "")
+# Sends share the upstream executor's slots by default; 0 means no cap of the scheduler's own
+DEFAULT_SEND_CONCURRENCY = int(os.getenv("CORAL_SEND_CONCURRENCY", str(DEFAULT_UPSTREAM_CONCURRENCY)))
+DEFAULT_MAX_QUEUED_PER_SENDER = int(os.getenv("CORAL_SEND_MAX_QUEUED_PER_SENDER", "200"))
+DEFAULT_MAX_QUEUE_WAIT = float(os.getenv("CORAL_SEND_MAX_QUEUE_WAIT", "30"))
+DEFAULT_SEND_IDLE_TIMEOUT = float(os.getenv("CORAL_SEND_IDLE_TIMEOUT", "300"))
+DEFAULT_SEND_MAX_TRACKED = int(os.getenv("CORAL_SEND_MAX_TRACKED", "10000"))
+
+# Sender of messages whose request doesn't name one
+ANONYMOUS_SENDER = "anonymous"
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """
+    Parse sender weights given as "agent_a=2,agent_b=0.5".
+
+    Args:
+        value: Comma-separated name=weight pairs
+
+    Returns:
+        Dict: Weight per sender; malformed or non-positive entries are skipped
+    """
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if not name or not weight:
+            continue
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = 0.0
+        if weight <= 0:
+            logger.warning(f"Ignoring invalid sender weight '{item.strip()}'")
+            continue
+        weights[name.strip()] = weight
+    return weights
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `burst` tokens."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.last_used = self.updated
+
+    def idle(self, now: float) -> bool:
+        """Whether the bucket has refilled, so it is no different from a new one."""
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consume a token; call only after delay() returned 0."""
+        self.tokens -= 1
+
+class _Waiter:
+    """A send waiting for its turn."""
+
+    __slots__ = ("sender", "recipient", "start", "finish", "future", "queued_at", "throttled_by")
+
+    def __init__(self, sender: str, recipient: str, start: float, finish: float, future: asyncio.Future):
+        self.sender = sender
+        self.recipient = recipient
+        self.start = start
+        self.finish = finish
+        self.future = future
+        self.queued_at = time.perf_counter()
+        self.throttled_by: Optional[str] = None
+
+class _SenderState:
+    """Queue, virtual finish time and counters of one sender."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiting: Deque[_Waiter] = deque()
+        self.last_used = time.monotonic()
+        self.last_finish = 0.0
+        self.sent = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def idle(self, now: float) -> bool:
+        return not self.waiting
+
+class _RecipientState:
+    """Counters of one recipient."""
+
+    __slots__ = ("sent", "throttled", "last_used")
+
+    def __init__(self):
+        self.sent = 0
+        self.throttled = 0
+        self.last_used = time.monotonic()
+
+    def idle(self, now: float) -> bool:
+        return True
+
+class FairScheduler:
+    """
+    Token-bucket rate limits and weighted fair queueing for outbound sends.
+
+    At most `concurrency` sends run at once, or any number if it is 0. Sends
+    beyond that, or beyond a sender's or recipient's token bucket, wait in
+    their sender's FIFO queue; the heads of the queues are started in order of weighted virtual finish
+    time, skipping heads whose buckets are still empty.
+
+    Each queue head is held in one of two heaps: `_ready` by virtual finish
+    time, or `_refilling` by the time its bucket has a token again. Entries
+    are checked when popped, so a head that was abandoned is just dropped.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_SEND_CONCURRENCY,
+        sender_rate: float = DEFAULT_SENDER_RATE,
+        sender_burst: float = DEFAULT_SENDER_BURST,
+        recipient_rate: float = DEFAULT_RECIPIENT_RATE,
+        recipient_burst: float = DEFAULT_RECIPIENT_BURST,
+        weights: Optional[Dict[str, float]] = None,
+        max_queued_per_sender: int = DEFAULT_MAX_QUEUED_PER_SENDER,
+        max_queue_wait: float = DEFAULT_MAX_QUEUE_WAIT,
+        idle_timeout: float = DEFAULT_SEND_IDLE_TIMEOUT,
+        max_tracked: int = DEFAULT_SEND_MAX_TRACKED,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            concurrency: Maximum number of sends running at once, 0 for no limit
+            sender_rate: Sends per second allowed per sender, 0 for no limit
+            sender_burst: Sends a sender may make at once after being idle
+            recipient_rate: Sends per second allowed per recipient, 0 for no limit
+            recipient_burst: Sends a recipient may receive at once after being idle
+            weights: Share of send capacity per sender relative to the default of 1
+            max_queued_per_sender: Waiting sends per sender before new ones are rejected
+            max_queue_wait: Seconds a send may wait before it is rejected
+            idle_timeout: Seconds after which an unused sender or recipient is forgotten
+            max_tracked: Senders and recipients each kept before the least recently used are forgotten
+        """
+        self.concurrency = max(0, concurrency)
+        self.sender_rate = sender_rate
+        self.sender_burst = sender_burst
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.weights = weights if weights is not None else parse_weights(DEFAULT_SENDER_WEIGHTS)
+        self.max_queued_per_sender = max_queued_per_sender
+        self.max_queue_wait = max_queue_wait
+        self.idle_timeout = idle_timeout
+        self.max_tracked = max(1, max_tracked)
+        # Least recently used first
+        self._senders: "OrderedDict[str, _SenderState]" = OrderedDict()
+        self._sender_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._recipient_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._recipients: "OrderedDict[str, _RecipientState]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._evicted = 0
+        # Totals including forgotten senders and recipients
+        self._sent = 0
+        self._throttled = 0
+        self._rejected = 0
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._queued = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+        # (finish or refill time, tie-breaker, sender state, head waiter)
+        self._ready: List[Tuple[float, int, _SenderState, _Waiter]] = []
+        self._refilling: List[Tuple[float, int, _SenderState, _Waiter]] = []
+        self._order = itertools.count()
+
+    def _touch(self, entries: "OrderedDict[str, Any]", key: str, factory: Callable[[], Any]) -> Any:
+        """Get an entry, creating it if needed, and mark it most recently used."""
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = factory()
+            self._trim(entries)
+        else:
+            entries.move_to_end(key)
+        entry.last_used = time.monotonic()
+        return entry
+
+    def _trim(self, entries: "OrderedDict[str, Any]"):
+        """Forget the least recently used idle entries beyond max_tracked."""
+        excess = len(entries) - self.max_tracked
+        if excess <= 0:
+            return
+        for key in list(itertools.islice(entries, excess)):
+            if getattr(entries[key], "waiting", None):
+                # Never forget a sender whose sends are still queued
+                continue
+            del entries[key]
+            self._evicted += 1
+
+    def _sweep(self, now: float):
+        """Forget senders and recipients unused for idle_timeout seconds."""
+        self._last_sweep = now
+        cutoff = now - self.idle_timeout
+        for entries in (self._senders, self._sender_buckets, self._recipient_buckets, self._recipients):
+            for key in list(entries):
+                entry = entries[key]
+                if entry.last_used > cutoff:
+                    break
+                if entry.idle(now):
+                    del entries[key]
+                    self._evicted += 1
+
+    def _sender(self, sender: str) -> _SenderState:
+        return self._touch(self._senders, sender, lambda: _SenderState(self.weights.get(sender, 1.0)))
+
+    def _bucket(self, buckets: "OrderedDict[str, TokenBucket]", key: str, rate: float, burst: float) -> Optional[TokenBucket]:
+        if rate <= 0:
+            return None
+        return self._touch(buckets, key, lambda: TokenBucket(rate, burst))
+
+    def _delay(self, waiter: _Waiter, now: float) -> float:
+        """Seconds until both of a waiter's buckets have a token, noting which one held it back."""
+        delay = 0.0
+        for limit, bucket in (
+            ("sender", self._bucket(self._sender_buckets, waiter.sender, self.sender_rate, self.sender_burst)),
+            ("recipient", self._bucket(self._recipient_buckets, waiter.recipient, self.recipient_rate, self.recipient_burst))
+        ):
+            wait = bucket.delay(now) if bucket is not None else 0.0
+            if wait > 0:
+                waiter.throttled_by = waiter.throttled_by or limit
+                delay = max(delay, wait)
+        return delay
+
+    def _schedule(self, state: _SenderState):
+        """Make the sender's new queue head compete for the next slot."""
+        head = state.waiting[0]
+        heapq.heappush(self._ready, (head.finish, next(self._order), state, head))
+
+    def _grant(self, state: _SenderState, waiter: _Waiter):
+        state.waiting.popleft()
+        if state.waiting:
+            self._schedule(state)
+        self._queued -= 1
+        self._in_flight += 1
+        self._virtual_time = max(self._virtual_time, waiter.start)
+        for buckets, key in ((self._sender_buckets, waiter.sender), (self._recipient_buckets, waiter.recipient)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.take()
+
+        waited = time.perf_counter() - waiter.queued_at
+        state.sent += 1
+        state.wait_seconds += waited
+        state.max_wait_seconds = max(state.max_wait_seconds, waited)
+        recipient = self._touch(self._recipients, waiter.recipient, _RecipientState)
+        recipient.sent += 1
+        self._sent += 1
+        if waiter.throttled_by == "sender":
+            state.throttled += 1
+        elif waiter.throttled_by == "recipient":
+            recipient.throttled += 1
+        if waiter.throttled_by is not None:
+            self._throttled += 1
+        metrics.observe_queue_wait("send_scheduler", waited)
+        waiter.future.set_result(None)
+
+    def _has_slot(self) -> bool:
+        return not self.concurrency or self._in_flight < self.concurrency
+
+    def _dispatch(self):
+        """Start waiting sends while there are free slots, in weighted fair order."""
+        now = time.monotonic()
+        # Heads whose buckets have refilled since they were set aside compete again
+        while self._refilling and self._refilling[0][0] <= now:
+            _, _, state, head = heapq.heappop(self._refilling)
+            heapq.heappush(self._ready, (head.finish, next(self._order), state, head))
+
+        while self._has_slot() and self._ready:
+            _, _, state, head = heapq.heappop(self._ready)
+            if not state.waiting or state.waiting[0] is not head:
+                # Abandoned after it was scheduled
+                continue
+            delay = self._delay(head, now)
+            if delay > 0:
+                heapq.heappush(self._refilling, (now + delay, next(self._order), state, head))
+                continue
+            self._grant(state, head)
+
+        if self._refilling and self._queued and self._has_slot():
+            next_delay = max(0.0, self._refilling[0][0] - now)
+            at = now + next_delay
+            if self._timer is not None and self._timer_at <= at:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = asyncio.get_running_loop().call_later(next_delay, self._on_timer)
+            self._timer_at = at
+
+    def _on_timer(self):
+        # A token has been refilled for a waiting send
+        self._timer = None
+        self._dispatch()
+
+    def _abandon(self, state: _SenderState, waiter: _Waiter):
+        """Drop a send that timed out or was cancelled, freeing its slot if it had just started."""
+        if waiter.future.done() and not waiter.future.cancelled():
+            self.release()
+        else:
+            was_head = state.waiting[0] is waiter
+            state.waiting.remove(waiter)
+            self._queued -= 1
+            if was_head and state.waiting:
+                self._schedule(state)
+
+    def _reject(self, state: _SenderState, message: str, retry_after: float):
+        state.rejected += 1
+        self._rejected += 1
+        metrics.observe_rejected("send_message", "rate_limited")
+        raise UpstreamUnavailable(message, "rate_limited", retry_after)
+
+    async def acquire(self, sender: Optional[str], recipient: str):
+        """
+        Wait until a send from `sender` to `recipient` may start.
+
+        Args:
+            sender: Name of the sending agent, or None for anonymous sends
+            recipient: Name of the recipient agent
+
+        Raises:
+            UpstreamUnavailable: If the sender has too many sends waiting or the wait timed out
+        """
+        sender = sender or ANONYMOUS_SENDER
+        now = time.monotonic()
+        if now - self._last_sweep >= min(self.idle_timeout, 60.0):
+            self._sweep(now)
+        state = self._sender(sender)
+        if len(state.waiting) >= self.max_queued_per_sender:
+            retry_after = len(state.waiting) / self.sender_rate if self.sender_rate > 0 else 1.0
+            self._reject(state, f"Too many messages from '{sender}' waiting to be sent ({len(state.waiting)})", retry_after)
+
+        start = max(self._virtual_time, state.last_finish)
+        state.last_finish = start + 1.0 / state.weight
+        waiter = _Waiter(sender, recipient, start, state.last_finish, asyncio.get_running_loop().create_future())
+        state.waiting.append(waiter)
+        self._queued += 1
+        if len(state.waiting) == 1:
+            self._schedule(state)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.max_queue_wait if self.max_queue_wait > 0 else None)
+        except asyncio.TimeoutError:
+            self._abandon(state, waiter)
+            self._reject(state, f"Message from '{sender}' waited over {self.max_queue_wait:g}s to be sent", 1.0)
+        except asyncio.CancelledError:
+            self._abandon(state, waiter)
+            raise
+
+    def release(self):
+        """Free the slot of a finished send and start the next waiting one."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    async def run(self, sender: Optional[str], recipient: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run a send once its sender and recipient limits and fair turn allow.
+
+        Args:
+            sender: Name of the sending agent, or None for anonymous sends
+            recipient: Name of the recipient agent
+            func: Coroutine function performing the send
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The result of func
+        """
+        with tracer.span("send_scheduler", attributes={"sender": sender or ANONYMOUS_SENDER, "recipient": recipient}) as span:
+            queued_at = time.perf_counter()
+            await self.acquire(sender, recipient)
+            span.set_attribute("queue_wait_ms", round((time.perf_counter() - queued_at) * 1000, 3))
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get rate limiting and queueing metrics.
+
+        Returns:
+            Dict: Limits, sends running and waiting, and per sender and recipient
+                counts of sends, throttled sends and queue wait
+        """
+        senders = {}
+        for name, state in self._senders.items():
+            senders[name] = {
+                "weight": state.weight,
+                "queued": len(state.waiting),
+                "sent": state.sent,
+                "throttled": state.throttled,
+                "rejected": state.rejected,
+                "avg_queue_wait_ms": round(state.wait_seconds / state.sent * 1000, 3) if state.sent else 0.0,
+                "max_queue_wait_ms": round(state.max_wait_seconds * 1000, 3)
+            }
+        return {
+            "concurrency": self.concurrency,
+            "sender_limit": {"rate": self.sender_rate, "burst": self.sender_burst} if self.sender_rate > 0 else None,
+            "recipient_limit": {"rate": self.recipient_rate, "burst": self.recipient_burst} if self.recipient_rate > 0 else None,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "sent": self._sent,
+            "throttled": self._throttled,
+            "rejected": self._rejected,
+            "tracked_senders": len(self._senders),
+            "tracked_recipients": len(self._recipients),
+            "evicted": self._evicted,
+            "senders": senders,
+            "recipients": {name: {"sent": state.sent, "throttled": state.throttled} for name, state in self._recipients.items()}
+        }
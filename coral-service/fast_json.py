@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Fast JSON
+
+This module provides the service's default response class, which encodes
+JSON bodies with orjson when it is installed and falls back to Starlette's
+standard-library encoder otherwise.
+
+When msgpack is installed, routes built with NegotiatedRoute also speak
+MessagePack: a request body sent as application/msgpack is decoded directly
+into the endpoint's model, and a client whose Accept header prefers
+application/msgpack gets its response encoded that way. Every other caller
+keeps getting JSON.
+"""
+import json
+import logging
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Whether the request being handled asked for a MessagePack response
+_respond_msgpack: ContextVar[bool] = ContextVar("respond_msgpack", default=False)
+
+def _media_types(header: Optional[str]) -> dict:
+    """Media types of an Accept header mapped to their quality values."""
+    types = {}
+    for part in (header or "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            types[media_type.strip().lower()] = quality
+    return types
+
+def prefers_msgpack(accept: Optional[str]) -> bool:
+    """
+    Check whether an Accept header prefers MessagePack to JSON.
+
+    Args:
+        accept: Value of the Accept header
+
+    Returns:
+        bool: True if msgpack is installed and application/msgpack is acceptable
+            with a quality at least that of application/json
+    """
+    if msgpack is None or not accept or "msgpack" not in accept:
+        return False
+    types = _media_types(accept)
+    quality = types.get(MSGPACK_MEDIA_TYPE, types.get("application/x-msgpack", 0.0))
+    return quality > 0 and quality >= types.get("application/json", 0.0)
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    """Check whether a Content-Type header names MessagePack."""
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type in (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+def render(content: Any, media_type: str = "application/json") -> bytes:
+    """
+    Encode a response body.
+
+    Args:
+        content: Value to encode
+        media_type: application/msgpack, or anything else for JSON
+
+    Returns:
+        bytes: The encoded body
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, use_bin_type=True, default=str)
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def response_media_type() -> str:
+    """Media type the request being handled should be answered in."""
+    return MSGPACK_MEDIA_TYPE if _respond_msgpack.get() else "application/json"
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when available, or MessagePack when the request prefers it."""
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers=None, media_type: Optional[str] = None, background=None):
+        if media_type is None and _respond_msgpack.get():
+            media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return render(content, self.media_type)
+
+class _MsgPackRequest(Request):
+    """Request whose MessagePack body is parsed where FastAPI parses JSON."""
+
+    def __init__(self, request: Request):
+        # FastAPI only hands a body to request.json() when the content type is JSON
+        headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+        headers.append((b"content-type", b"application/json"))
+        super().__init__(dict(request.scope, headers=headers), request.receive)
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+class NegotiatedRoute(APIRoute):
+    """Route that accepts MessagePack request bodies and renders MessagePack for clients that prefer it."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if msgpack is None:
+            return handler
+
+        async def route_handler(request: Request):
+            if is_msgpack(request.headers.get("content-type")):
+                request = _MsgPackRequest(request)
+            token = _respond_msgpack.set(prefers_msgpack(request.headers.get("accept")))
+            try:
+                return await handler(request)
+            finally:
+                _respond_msgpack.reset(token)
+
+        return route_handler
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the Coral Protocol Service
+
+Production entry point:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Runs uvicorn workers under gunicorn's process manager. Worker count,
+keep-alive and shutdown timeouts are read from the environment. Set
+CORAL_SERVICE_SOCKET to a path to listen on a Unix domain socket as well as
+on PORT. Each worker
+creates its own upstream Coral Protocol Client in the app's startup event.
+
+One worker is the default: delivery tracking, agent list cache invalidation,
+the capability index, the in-memory idempotency store (without DB_HOST) and
+the send rate limits are kept per process. With more workers a delivery
+status poll can miss, other workers serve the old agent list until its TTL,
+and the effective rate limit is the configured one times the worker count.
+"""
+import os
+import shutil
+import tempfile
+
+bind = [f"0.0.0.0:{os.getenv('PORT', '8001')}"]
+# Also listen on a Unix domain socket, for an angus-core sharing the host or a volume
+if os.getenv("CORAL_SERVICE_SOCKET"):
+    bind.append(f"unix:{os.environ['CORAL_SERVICE_SOCKET']}")
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+
+# Aggregate Prometheus metrics across workers
+_metrics_dir_created = False
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    _metrics_dir_created = True
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="coral-service-metrics-")
+
+def on_starting(server):
+    """Start every run with empty multiprocess metric files."""
+    if workers > 1:
+        server.log.warning(
+            f"Running {workers} workers: delivery tracking, agent list invalidation, "
+            "in-memory idempotency and send rate limits are per worker"
+        )
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    """Remove the multiprocess metrics directory created for this run."""
+    if _metrics_dir_created:
+        shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Readiness Checks
+
+This module runs the service's dependency checks in a background task and
+caches the outcome, so /ready answers from memory instead of contacting the
+upstream Coral server on every orchestrator probe. Each dependency is reported
+with its status, check latency and last error.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default readiness check settings
+DEFAULT_HEALTH_INTERVAL = float(os.getenv("CORAL_HEALTH_INTERVAL", "10"))
+DEFAULT_HEALTH_TIMEOUT = float(os.getenv("CORAL_HEALTH_TIMEOUT", "2"))
+
+def url_address(url: str) -> Tuple[str, int]:
+    """Host and port of a URL, defaulting the port from its scheme."""
+    parsed = urlparse(url)
+    return parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80)
+
+def tcp_check(host: str, port: int) -> Callable[[], Awaitable[None]]:
+    """
+    Build a check that opens (and closes) a TCP connection.
+
+    Args:
+        host: Host to connect to
+        port: Port to connect to
+
+    Returns:
+        Callable: Coroutine function raising if the connection fails
+    """
+    async def check():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        await writer.wait_closed()
+
+    return check
+
+class HealthChecker:
+    """
+    Periodically runs dependency checks and caches the readiness report.
+
+    The service is ready once every critical check has passed in the most
+    recent round. Non-critical checks are reported but don't affect readiness.
+    """
+
+    def __init__(self, interval: float = DEFAULT_HEALTH_INTERVAL, timeout: float = DEFAULT_HEALTH_TIMEOUT):
+        """
+        Initialize the checker.
+
+        Args:
+            interval: Seconds between check rounds
+            timeout: Seconds each check may take before it counts as failed
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self._checks: Dict[str, Tuple[Callable[[], Awaitable[Any]], bool]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._ready = False
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, check: Callable[[], Awaitable[Any]], critical: bool = True):
+        """
+        Register a dependency check.
+
+        Args:
+            name: Dependency name used in the report
+            check: Coroutine function that raises if the dependency is unhealthy
+                and may return a dict of details to report
+            critical: Whether a failure makes the service not ready
+        """
+        self._checks[name] = (check, critical)
+
+    async def _run_check(self, name: str, check: Callable[[], Awaitable[Any]], critical: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = {"status": "up", "critical": critical}
+        try:
+            details = await asyncio.wait_for(check(), timeout=self.timeout)
+            if details:
+                result["details"] = details
+        except asyncio.TimeoutError:
+            result.update(status="down", error=f"Timed out after {self.timeout}s")
+        except Exception as e:
+            result.update(status="down", error=str(e))
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        if result["status"] != self._results.get(name, {}).get("status", "up"):
+            logger.warning(f"Dependency '{name}' is now {result['status']}: {result.get('error', 'ok')}")
+        return result
+
+    async def check_now(self):
+        """Run every check once and update the cached report."""
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._run_check(name, *self._checks[name]) for name in names))
+        self._results = dict(zip(names, results))
+        self._ready = all(result["status"] == "up" for result in results if result["critical"])
+        self._checked_at = time.time()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.check_now()
+            except Exception as e:
+                logger.error(f"Readiness check round failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start checking in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop checking."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _fresh(self) -> bool:
+        # A stalled checker must not keep reporting an old result
+        return self._checked_at is not None and time.time() - self._checked_at < self.interval * 3 + self.timeout
+
+    @property
+    def ready(self) -> bool:
+        """Whether the last, recent check round found every critical dependency up."""
+        return self._ready and self._fresh()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the cached readiness report.
+
+        Returns:
+            Dict: Overall status, when the checks last ran and per-dependency results
+        """
+        if self._checked_at is None:
+            status = "starting"
+        elif not self._fresh():
+            status = "stale"
+        else:
+            status = "ready" if self._ready else "not_ready"
+        return {
+            "status": status,
+            "checked_at": self._checked_at,
+            "age_s": round(time.time() - self._checked_at, 3) if self._checked_at else None,
+            "dependencies": self._results
+        }
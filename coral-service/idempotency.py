@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Idempotency Keys
+
+This module lets clients retry non-idempotent requests (sending a message,
+creating a thread) safely. A request carrying an Idempotency-Key header runs
+once; repeating the key returns the stored response without calling the
+upstream Coral server again.
+
+Responses are kept in a bounded in-memory LRU with a TTL. When a backend is
+given (the Postgres registry), keys are also claimed and stored there, so a
+retry that lands on another worker process or replica is deduplicated too.
+Only successful responses are stored: a failed request releases its key so
+that it can be retried.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import itertools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default store settings
+DEFAULT_IDEMPOTENCY_TTL = float(os.getenv("CORAL_IDEMPOTENCY_TTL", "86400"))
+DEFAULT_IDEMPOTENCY_MAX_KEYS = int(os.getenv("CORAL_IDEMPOTENCY_MAX_KEYS", "10000"))
+# Seconds a backend claim holds a key while its request runs; a crashed worker's key is free again after this
+DEFAULT_IDEMPOTENCY_LEASE = float(os.getenv("CORAL_IDEMPOTENCY_LEASE", "120"))
+
+# Longest accepted Idempotency-Key header
+MAX_KEY_LENGTH = 255
+
+# "reason" of the error responses rejecting a key, so callers can tell them from other 400/409/422s
+REJECTION_REASON = "idempotency_key"
+
+class IdempotencyError(Exception):
+    """An Idempotency-Key is invalid, was used for a different request, or its first request is still running."""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        """
+        Initialize the error.
+
+        Args:
+            message: Error message
+            status_code: 400 for an invalid key, 422 for a different request, 409 for one still in progress
+            retry_after: Seconds the client should wait before retrying
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request payload, used to detect a key reused for another request."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class _Entry:
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class IdempotencyStore:
+    """
+    Runs each keyed request once and replays its stored response for repeats.
+
+    Concurrent repeats of a key in the same process wait for the first
+    request to finish, and run again if it fails. With a backend, a repeat of
+    a key whose request is still running in another process is rejected with
+    409.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_IDEMPOTENCY_TTL,
+        max_keys: int = DEFAULT_IDEMPOTENCY_MAX_KEYS,
+        backend: Any = None,
+        lease: float = DEFAULT_IDEMPOTENCY_LEASE,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            ttl: Seconds a response is kept for replay
+            max_keys: Keys kept in memory; the least recently used are evicted
+            backend: Optional shared store with claim_request, complete_request and
+                release_request coroutines and an `available` property
+            lease: Seconds a backend claim holds a key before its response is stored
+        """
+        self.ttl = ttl
+        self.lease = lease
+        self.max_keys = max_keys
+        self.backend = backend
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._executed = 0
+        self._replayed = 0
+        self._rejected = 0
+        self._backend_errors = 0
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.future.done() and entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry: _Entry):
+        # Make room before inserting; keys whose request is still running are skipped, not evicted
+        excess = len(self._entries) - self.max_keys + 1
+        if excess > 0:
+            for old_key in list(itertools.islice((k for k, e in self._entries.items() if e.future.done()), excess)):
+                del self._entries[old_key]
+        self._entries[key] = entry
+
+    def _error(self, message: str, status_code: int, retry_after: Optional[float] = None) -> IdempotencyError:
+        self._rejected += 1
+        return IdempotencyError(message, status_code, retry_after)
+
+    async def _claim(self, key: str, request_fingerprint: str) -> Tuple[bool, Optional[Tuple[int, Dict[str, Any]]]]:
+        """
+        Claim the key in the backend.
+
+        Returns:
+            Tuple: Whether this request holds the key in the backend, and the
+                stored response if an earlier request already completed
+        """
+        if self.backend is None or not self.backend.available:
+            return False, None
+        try:
+            claimed, row = await self.backend.claim_request(key, request_fingerprint, self.lease)
+        except Exception as e:
+            self._backend_errors += 1
+            logger.error(f"Failed to claim idempotency key in backend, using memory only: {str(e)}")
+            return False, None
+        if claimed:
+            return True, None
+        if row["fingerprint"] != request_fingerprint:
+            raise self._error("Idempotency-Key was already used for a different request", 422)
+        if row["status_code"] is None:
+            raise self._error("A request with this Idempotency-Key is still in progress", 409, retry_after=1)
+        return False, (row["status_code"], row["body"])
+
+    def _drop(self, key: str, entry: _Entry):
+        # Forget the key so the request can be retried, also by waiting repeats
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        if not entry.future.done():
+            entry.future.cancel()
+
+    async def run(
+        self,
+        key: Optional[str],
+        scope: str,
+        payload: Any,
+        call: Callable[[], Awaitable[Tuple[int, Dict[str, Any]]]],
+    ) -> Tuple[int, Dict[str, Any], bool]:
+        """
+        Run a request once per idempotency key.
+
+        Args:
+            key: Value of the Idempotency-Key header, or None to always run
+            scope: Name of the endpoint, so keys of different endpoints don't collide
+            payload: Request payload, compared between uses of the same key
+            call: Coroutine function performing the request, returning (status code, body)
+
+        Returns:
+            Tuple[int, Dict, bool]: Status code, response body and whether it was replayed
+
+        Raises:
+            IdempotencyError: The key is invalid, was used for another request or is still in progress
+        """
+        if key is None:
+            status_code, body = await call()
+            return status_code, body, False
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise self._error(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+        scoped_key = f"{scope}:{key}"
+        request_fingerprint = fingerprint(payload)
+        entry = self._lookup(scoped_key)
+        if entry is not None:
+            if entry.fingerprint != request_fingerprint:
+                raise self._error("Idempotency-Key was already used for a different request", 422)
+            try:
+                status_code, body = await asyncio.shield(entry.future)
+            except asyncio.CancelledError:
+                if not entry.future.cancelled():
+                    raise
+                # The first request failed and released the key: run it again
+                return await self.run(key, scope, payload, call)
+            self._replayed += 1
+            return status_code, body, True
+
+        entry = _Entry(request_fingerprint, time.monotonic() + self.ttl)
+        self._remember(scoped_key, entry)
+        try:
+            claimed, stored = await self._claim(scoped_key, request_fingerprint)
+        except BaseException:
+            self._drop(scoped_key, entry)
+            raise
+        if stored is not None:
+            self._replayed += 1
+            entry.future.set_result(stored)
+            return stored[0], stored[1], True
+
+        try:
+            status_code, body = await call()
+        except BaseException:
+            self._drop(scoped_key, entry)
+            if claimed:
+                await self._release(scoped_key)
+            raise
+
+        self._executed += 1
+        entry.future.set_result((status_code, body))
+        if claimed:
+            try:
+                await self.backend.complete_request(scoped_key, status_code, body, self.ttl)
+            except Exception as e:
+                self._backend_errors += 1
+                logger.error(f"Failed to store idempotent response in backend: {str(e)}")
+        return status_code, body, False
+
+    async def _release(self, key: str):
+        try:
+            await self.backend.release_request(key)
+        except Exception as e:
+            self._backend_errors += 1
+            logger.error(f"Failed to release idempotency key in backend: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store metrics.
+
+        Returns:
+            Dict: Keys held in memory, requests executed, replayed and rejected
+        """
+        return {
+            "ttl": self.ttl,
+            "lease": self.lease,
+            "keys": len(self._entries),
+            "max_keys": self.max_keys,
+            "executed": self._executed,
+            "replayed": self._replayed,
+            "rejected": self._rejected,
+            "backend": "postgres" if self.backend is not None and self.backend.available else "memory",
+            "backend_errors": self._backend_errors
+        }
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Durable Outbound Message Queue
+
+This module persists outbound messages to a local SQLite database so they can
+be acknowledged immediately and delivered upstream in the background. Delivery
+is retried with exponential backoff, messages that keep failing are moved to a
+dead-letter table, and messages to the same recipient are delivered strictly
+in the order they were queued. Pending messages survive a restart.
+
+Messages are claimed with a time-limited lease inside an IMMEDIATE
+transaction, so several worker processes can share one database file. The
+lease is renewed while a delivery is in flight, however long the upstream
+call takes; a lease left behind by a crashed process expires and the message
+is picked up again. A process that stops renewing without crashing, such as
+one whose event loop is blocked for longer than the lease, can still see its
+message delivered a second time by another process.
+"""
+import os
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default queue settings
+DEFAULT_QUEUE_DB_PATH = os.getenv("CORAL_QUEUE_DB_PATH", "data/coral_queue.db")
+DEFAULT_QUEUE_WORKERS = int(os.getenv("CORAL_QUEUE_WORKERS", "8"))
+DEFAULT_QUEUE_MAX_ATTEMPTS = int(os.getenv("CORAL_QUEUE_MAX_ATTEMPTS", "8"))
+DEFAULT_QUEUE_BASE_DELAY = float(os.getenv("CORAL_QUEUE_BASE_DELAY", "0.5"))
+DEFAULT_QUEUE_MAX_DELAY = float(os.getenv("CORAL_QUEUE_MAX_DELAY", "300"))
+DEFAULT_QUEUE_POLL_INTERVAL = float(os.getenv("CORAL_QUEUE_POLL_INTERVAL", "1.0"))
+DEFAULT_QUEUE_RETENTION = float(os.getenv("CORAL_QUEUE_RETENTION", "86400"))
+DEFAULT_QUEUE_LEASE = float(os.getenv("CORAL_QUEUE_LEASE", "120"))
+
+# Number of recent deliveries used for latency percentiles
+LATENCY_SAMPLE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    recipient TEXT NOT NULL,
+    content TEXT NOT NULL,
+    thread_id TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    delivered_at REAL,
+    last_error TEXT,
+    claimed_until REAL,
+    sender TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbound_pending ON outbound_messages (status, recipient, seq);
+CREATE INDEX IF NOT EXISTS idx_outbound_delivered ON outbound_messages (status, delivered_at);
+CREATE TABLE IF NOT EXISTS dead_letter_messages (
+    id TEXT PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    content TEXT NOT NULL,
+    thread_id TEXT,
+    attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    last_error TEXT,
+    sender TEXT
+);
+"""
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class MessageQueue:
+    """
+    SQLite-backed outbound message queue with a pool of delivery workers.
+
+    Only the oldest undelivered message of each recipient is eligible for
+    delivery, so a message being sent or retried holds back later messages to
+    the same recipient but not to anyone else.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUEUE_DB_PATH,
+        workers: int = DEFAULT_QUEUE_WORKERS,
+        max_attempts: int = DEFAULT_QUEUE_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_QUEUE_BASE_DELAY,
+        max_delay: float = DEFAULT_QUEUE_MAX_DELAY,
+        poll_interval: float = DEFAULT_QUEUE_POLL_INTERVAL,
+        retention: float = DEFAULT_QUEUE_RETENTION,
+        lease: float = DEFAULT_QUEUE_LEASE,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            path: Path of the SQLite database file
+            workers: Maximum number of concurrent deliveries
+            max_attempts: Attempts before a message is dead-lettered
+            base_delay: Delay in seconds before the first retry
+            max_delay: Upper bound of the retry delay in seconds
+            poll_interval: Seconds between scans for messages due for retry
+            retention: Seconds delivered messages are kept for status lookups
+            lease: Seconds a claimed message is reserved for; renewed every third of
+                it while the delivery is in flight
+        """
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._deliver: Optional[Callable[[str, str, Optional[str], Optional[str]], Awaitable[Any]]] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks = set()
+
+    @property
+    def started(self) -> bool:
+        """Whether the delivery workers are running."""
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(outbound_messages)")}
+        if "claimed_until" not in columns:
+            conn.execute("ALTER TABLE outbound_messages ADD COLUMN claimed_until REAL")
+        if "sender" not in columns:
+            conn.execute("ALTER TABLE outbound_messages ADD COLUMN sender TEXT")
+        if "sender" not in {row[1] for row in conn.execute("PRAGMA table_info(dead_letter_messages)")}:
+            conn.execute("ALTER TABLE dead_letter_messages ADD COLUMN sender TEXT")
+        self._conn = conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def _run(self, func: Callable, *args) -> Any:
+        return await asyncio.to_thread(func, *args)
+
+    async def start(self, deliver: Callable[[str, str, Optional[str], Optional[str]], Awaitable[Any]]):
+        """
+        Open the database and start delivering pending messages.
+
+        Args:
+            deliver: Coroutine function called as deliver(recipient, content, thread_id, sender)
+        """
+        await self._run(self._connect)
+        self._deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        pending = (await self._run(self._execute, "SELECT COUNT(*) FROM outbound_messages WHERE status = 'pending'"))[0][0]
+        logger.info(f"Started outbound message queue at {self.path} with {pending} pending messages")
+
+    async def stop(self):
+        """Stop the delivery workers; undelivered messages stay queued."""
+        if self._dispatcher is not None:
+            # asyncio.wait_for() drops a cancellation that arrives as the wakeup is set, so the flag ends the loop too
+            self._stopping = True
+            self._wakeup.set()
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+            self._dispatcher = None
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def enqueue(self, recipient: str, content: str, thread_id: Optional[str] = None, sender: Optional[str] = None) -> str:
+        """
+        Persist a message for delivery.
+
+        Args:
+            recipient: Name of the recipient agent
+            content: Message content
+            thread_id: Optional thread ID
+            sender: Optional name of the sending agent
+
+        Returns:
+            str: ID of the queued message
+        """
+        if not self.started:
+            raise RuntimeError("Outbound message queue is not running")
+        message_id = str(uuid.uuid4())
+        now = time.time()
+        await self._run(
+            self._execute,
+            "INSERT INTO outbound_messages (id, recipient, content, thread_id, sender, status, next_attempt_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
+            (message_id, recipient, content, thread_id, sender, now, now)
+        )
+        self._wakeup.set()
+        return message_id
+
+    def _claim_ready(self, limit: int) -> List[sqlite3.Row]:
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                rows = self._conn.execute(
+                    "SELECT m.* FROM outbound_messages m "
+                    "JOIN (SELECT recipient, MIN(seq) AS seq FROM outbound_messages "
+                    "      WHERE status IN ('pending', 'sending') GROUP BY recipient) head ON m.seq = head.seq "
+                    "WHERE (m.status = 'pending' AND m.next_attempt_at <= ?) "
+                    "   OR (m.status = 'sending' AND m.claimed_until <= ?) "
+                    "ORDER BY m.next_attempt_at, m.seq LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbound_messages SET status = 'sending', claimed_until = ? WHERE seq = ?",
+                    [(now + self.lease, row["seq"]) for row in rows]
+                )
+        return rows
+
+    async def _dispatch(self):
+        last_purge = 0.0
+        while not self._stopping:
+            try:
+                free = self.workers - len(self._tasks)
+                if free > 0:
+                    rows = await self._run(self._claim_ready, free)
+                    for row in rows:
+                        task = asyncio.create_task(self._deliver_one(row))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                if time.time() - last_purge > 60:
+                    last_purge = time.time()
+                    await self._run(
+                        self._execute,
+                        "DELETE FROM outbound_messages WHERE status = 'delivered' AND delivered_at < ?",
+                        (time.time() - self.retention,)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbound message queue dispatch failed: {str(e)}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _renew(self, row: sqlite3.Row):
+        self._execute(
+            "UPDATE outbound_messages SET claimed_until = ? WHERE id = ? AND status = 'sending'",
+            (time.time() + self.lease, row["id"])
+        )
+
+    async def _keep_claimed(self, row: sqlite3.Row):
+        """Renew the lease of a message until its delivery finishes."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self._run(self._renew, row)
+            except Exception as e:
+                logger.error(f"Failed to renew the lease of message {row['id']}: {str(e)}")
+
+    async def _deliver_one(self, row: sqlite3.Row):
+        attempts = row["attempts"] + 1
+        renewal = asyncio.create_task(self._keep_claimed(row))
+        try:
+            try:
+                await self._deliver(row["recipient"], row["content"], row["thread_id"], row["sender"])
+            finally:
+                renewal.cancel()
+            await self._run(
+                self._execute,
+                "UPDATE outbound_messages SET status = 'delivered', attempts = ?, delivered_at = ?, "
+                "last_error = NULL, claimed_until = NULL WHERE id = ?",
+                (attempts, time.time(), row["id"])
+            )
+        except Exception as e:
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None:
+                # Rejected before reaching the recipient, so it doesn't count as an attempt
+                await self._run(self._defer, row, retry_after, str(e))
+            else:
+                await self._run(self._record_failure, row, attempts, str(e))
+        finally:
+            self._wakeup.set()
+
+    def _defer(self, row: sqlite3.Row, delay: float, error: str):
+        self._execute(
+            "UPDATE outbound_messages SET status = 'pending', next_attempt_at = ?, last_error = ?, "
+            "claimed_until = NULL WHERE id = ?",
+            (time.time() + delay, error, row["id"])
+        )
+
+    def _record_failure(self, row: sqlite3.Row, attempts: int, error: str):
+        now = time.time()
+        if attempts >= self.max_attempts:
+            logger.error(f"Dead-lettering message {row['id']} to '{row['recipient']}' after {attempts} attempts: {error}")
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letter_messages "
+                        "(id, recipient, content, thread_id, sender, attempts, created_at, failed_at, last_error) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (row["id"], row["recipient"], row["content"], row["thread_id"], row["sender"],
+                         attempts, row["created_at"], now, error)
+                    )
+                    self._conn.execute("DELETE FROM outbound_messages WHERE id = ?", (row["id"],))
+            return
+
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1))) * random.uniform(0.5, 1.0)
+        logger.warning(f"Delivery of message {row['id']} to '{row['recipient']}' failed (attempt {attempts}), retrying in {delay:.1f}s: {error}")
+        self._execute(
+            "UPDATE outbound_messages SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?, "
+            "claimed_until = NULL WHERE id = ?",
+            (attempts, now + delay, error, row["id"])
+        )
+
+    async def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the delivery status of a queued message.
+
+        Args:
+            message_id: ID returned by enqueue()
+
+        Returns:
+            Optional[Dict]: Message status, or None if the message is unknown
+        """
+        if self._conn is None:
+            return None
+        rows = await self._run(
+            self._execute,
+            "SELECT id, recipient, thread_id, status, attempts, created_at, delivered_at, last_error "
+            "FROM outbound_messages WHERE id = ?",
+            (message_id,)
+        )
+        if rows:
+            return dict(rows[0])
+        rows = await self._run(
+            self._execute,
+            "SELECT id, recipient, thread_id, 'dead_letter' AS status, attempts, created_at, failed_at, last_error "
+            "FROM dead_letter_messages WHERE id = ?",
+            (message_id,)
+        )
+        return dict(rows[0]) if rows else None
+
+    def _stats(self) -> Dict[str, Any]:
+        if self._conn is None:
+            return {"running": False}
+        counts = {row[0]: row[1] for row in self._execute("SELECT status, COUNT(*) FROM outbound_messages GROUP BY status")}
+        dead = self._execute("SELECT COUNT(*) FROM dead_letter_messages")[0][0]
+        oldest = self._execute("SELECT MIN(created_at) FROM outbound_messages WHERE status IN ('pending', 'sending')")[0][0]
+        latencies = sorted(
+            row[0] for row in self._execute(
+                "SELECT delivered_at - created_at FROM outbound_messages WHERE status = 'delivered' "
+                "ORDER BY delivered_at DESC LIMIT ?",
+                (LATENCY_SAMPLE_SIZE,)
+            )
+        )
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "running": self.started,
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "delivered": counts.get("delivered", 0),
+            "dead_letter": dead,
+            "in_flight": len(self._tasks),
+            "workers": self.workers,
+            "oldest_pending_age_s": round(time.time() - oldest, 3) if oldest else None,
+            "delivery_latency_ms": {
+                "samples": len(latencies),
+                "p50": ms(percentile(latencies, 0.50)),
+                "p95": ms(percentile(latencies, 0.95)),
+                "p99": ms(percentile(latencies, 0.99))
+            }
+        }
+
+    async def ping(self):
+        """
+        Verify the queue is delivering and its database answers.
+
+        Raises:
+            RuntimeError: If the queue isn't running
+        """
+        if self._conn is None or self._dispatcher is None or self._dispatcher.done():
+            raise RuntimeError("Outbound message queue is not running")
+        await self._run(self._execute, "SELECT 1")
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and delivery latency percentiles.
+
+        Returns:
+            Dict: Message counts, in-flight deliveries and latency percentiles
+        """
+        return await self._run(self._stats)
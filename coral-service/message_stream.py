@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Inbound Message Stream
+
+This module multiplexes a single upstream subscription to the Coral server's
+SSE stream out to any number of local subscribers of /messages/stream. Each
+subscriber can filter by agent and thread, and receives events as server-sent
+events with ids so a reconnecting client can resume with Last-Event-ID from a
+bounded replay buffer.
+
+The upstream stream is read with sseclient-py in a background thread that is
+started with the first subscriber and reconnects with exponential backoff.
+Every worker process keeps its own upstream subscription.
+"""
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+import sseclient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default stream settings
+DEFAULT_STREAM_QUEUE_SIZE = int(os.getenv("CORAL_STREAM_QUEUE_SIZE", "1000"))
+DEFAULT_STREAM_BUFFER_SIZE = int(os.getenv("CORAL_STREAM_BUFFER_SIZE", "1000"))
+DEFAULT_STREAM_KEEPALIVE = float(os.getenv("CORAL_STREAM_KEEPALIVE", "15"))
+DEFAULT_STREAM_READ_TIMEOUT = float(os.getenv("CORAL_STREAM_READ_TIMEOUT", "90"))
+DEFAULT_STREAM_RECONNECT_DELAY = float(os.getenv("CORAL_STREAM_RECONNECT_DELAY", "1.0"))
+DEFAULT_STREAM_MAX_RECONNECT_DELAY = float(os.getenv("CORAL_STREAM_MAX_RECONNECT_DELAY", "60"))
+
+def sse_source(url: str, read_timeout: float = DEFAULT_STREAM_READ_TIMEOUT) -> Callable[[], Iterable[Dict[str, Any]]]:
+    """
+    Build an upstream source reading messages from an SSE endpoint.
+
+    Args:
+        url: URL of the upstream SSE stream
+        read_timeout: Seconds without any data before the connection is retried
+
+    Returns:
+        Callable: Function opening the stream and yielding message dicts
+    """
+    def messages() -> Iterable[Dict[str, Any]]:
+        timeout = httpx.Timeout(10.0, read=read_timeout)
+        with httpx.Client(timeout=timeout) as client:
+            with client.stream("GET", url, headers={"Accept": "text/event-stream"}) as response:
+                response.raise_for_status()
+                for event in sseclient.SSEClient(response.iter_bytes()).events():
+                    if event.event != "message" or not event.data:
+                        continue
+                    try:
+                        data = json.loads(event.data)
+                    except ValueError:
+                        data = event.data
+                    yield data if isinstance(data, dict) else {"content": data}
+
+    return messages
+
+def _recipients(message: Dict[str, Any]) -> List[str]:
+    for key in ("recipients", "participants"):
+        if isinstance(message.get(key), list):
+            return [str(value) for value in message[key]]
+    recipient = message.get("recipient") or message.get("to")
+    return [str(recipient)] if recipient else []
+
+def _thread_id(message: Dict[str, Any]) -> Optional[str]:
+    thread_id = message.get("thread_id") or message.get("threadId")
+    return str(thread_id) if thread_id else None
+
+class Subscription:
+    """
+    One local subscriber with its filters and a bounded event queue.
+
+    When the subscriber falls behind, the oldest queued events are dropped so
+    a slow consumer never holds up the others.
+    """
+
+    def __init__(self, agent: Optional[str], thread_id: Optional[str], queue_size: int):
+        self.agent = agent
+        self.thread_id = thread_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, message: Dict[str, Any]) -> bool:
+        """Whether a message passes this subscriber's agent and thread filters."""
+        if self.thread_id is not None and _thread_id(message) != self.thread_id:
+            return False
+        if self.agent is not None and self.agent not in _recipients(message):
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]):
+        """Queue an event, dropping the oldest one if the queue is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+class MessageHub:
+    """
+    Fan-out of one upstream message stream to filtered local subscribers.
+
+    Events get increasing ids; the last `buffer_size` events are kept so a
+    subscriber can resume after a disconnect.
+    """
+
+    def __init__(
+        self,
+        source: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None,
+        queue_size: int = DEFAULT_STREAM_QUEUE_SIZE,
+        buffer_size: int = DEFAULT_STREAM_BUFFER_SIZE,
+        keepalive: float = DEFAULT_STREAM_KEEPALIVE,
+        reconnect_delay: float = DEFAULT_STREAM_RECONNECT_DELAY,
+        max_reconnect_delay: float = DEFAULT_STREAM_MAX_RECONNECT_DELAY,
+    ):
+        """
+        Initialize the hub.
+
+        Args:
+            source: Function opening the upstream stream and yielding message dicts
+            queue_size: Maximum events queued per subscriber
+            buffer_size: Number of recent events kept for Last-Event-ID replay
+            keepalive: Seconds between keep-alive comments on idle streams
+            reconnect_delay: Initial delay before reconnecting to the upstream stream
+            max_reconnect_delay: Upper bound on the reconnect delay
+        """
+        self.source = source
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._history: deque = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._next_id = 1
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._connected = False
+        self._received = 0
+        self._reconnects = 0
+        self._dropped = 0
+
+    def _ensure_reader(self):
+        if self._reader is not None and self._reader.is_alive():
+            return
+        if self.source is None:
+            logger.warning("No upstream message source configured for /messages/stream")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._reader = threading.Thread(target=self._read_upstream, name="coral-message-stream", daemon=True)
+        self._reader.start()
+
+    def _read_upstream(self):
+        delay = self.reconnect_delay
+        while not self._stopping.is_set():
+            try:
+                for message in self.source():
+                    if not self._connected:
+                        self._connected = True
+                        delay = self.reconnect_delay
+                        logger.info("Connected to upstream message stream")
+                    if self._stopping.is_set():
+                        return
+                    self._loop.call_soon_threadsafe(self.publish, message)
+                logger.warning("Upstream message stream ended")
+            except Exception as e:
+                logger.error(f"Upstream message stream failed: {str(e)}")
+            self._connected = False
+            self._reconnects += 1
+            if self._stopping.wait(delay):
+                return
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def publish(self, message: Dict[str, Any]):
+        """
+        Deliver one message to every matching subscriber.
+
+        Must be called from the event loop thread.
+
+        Args:
+            message: Message dict from the upstream stream
+        """
+        event = {"id": self._next_id, "message": message}
+        self._next_id += 1
+        self._received += 1
+        self._history.append(event)
+        for subscription in list(self._subscribers):
+            if subscription.matches(message):
+                subscription.offer(event)
+
+    def subscribe(self, agent: Optional[str] = None, thread_id: Optional[str] = None, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Add a subscriber, starting the upstream reader if needed.
+
+        Args:
+            agent: Only deliver messages addressed to this agent
+            thread_id: Only deliver messages in this thread
+            last_event_id: Replay buffered events after this id
+
+        Returns:
+            Subscription: The new subscription
+        """
+        subscription = Subscription(agent, thread_id, self.queue_size)
+        if last_event_id is not None:
+            for event in self._history:
+                if event["id"] > last_event_id and subscription.matches(event["message"]):
+                    subscription.offer(event)
+        self._subscribers.add(subscription)
+        self._ensure_reader()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber."""
+        self._subscribers.discard(subscription)
+        self._dropped += subscription.dropped
+
+    async def sse(self, subscription: Subscription, is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+        """
+        Render a subscription as a server-sent event stream.
+
+        Args:
+            subscription: Subscription to stream
+            is_disconnected: Coroutine function reporting whether the client went away
+
+        Yields:
+            str: SSE-formatted events and keep-alive comments
+        """
+        try:
+            yield f"retry: {int(self.reconnect_delay * 1000)}\n\n"
+            while not await is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: message\ndata: {json.dumps(event['message'])}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stop(self):
+        """Stop reading the upstream stream."""
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get stream statistics.
+
+        Returns:
+            Dict[str, Any]: Subscriber count, upstream state and event counters
+        """
+        return {
+            "subscribers": len(self._subscribers),
+            "upstream_connected": self._connected,
+            "upstream_reconnects": self._reconnects,
+            "events_received": self._received,
+            "events_dropped": self._dropped + sum(subscription.dropped for subscription in self._subscribers),
+            "last_event_id": self._next_id - 1
+        }
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics
+
+This module instruments the Coral Protocol Service with per-route request
+counts, in-flight gauges and latency histograms, plus a histogram around every
+call to the upstream Coral server, and renders them for the /metrics endpoint.
+"""
+import os
+import time
+import logging
+from typing import Any, Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.responses import Response
+
+from tracing import RouteTemplates
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond to slow upstream calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "coral_http_requests_total",
+    "HTTP requests handled by coral-service",
+    ["method", "route", "status"]
+)
+IN_FLIGHT = Gauge(
+    "coral_http_requests_in_flight",
+    "HTTP requests currently being handled by coral-service",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+LATENCY = Histogram(
+    "coral_http_request_duration_seconds",
+    "Time spent handling HTTP requests in coral-service",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_LATENCY = Histogram(
+    "coral_upstream_call_duration_seconds",
+    "Time spent in calls from coral-service to the Coral server, excluding queueing",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    "coral_upstream_queue_wait_seconds",
+    "Time upstream calls waited for a free execution slot",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+BREAKER_STATE = Gauge(
+    "coral_upstream_circuit_state",
+    "Circuit breaker state per upstream operation (0 closed, 1 half-open, 2 open)",
+    ["operation"],
+    multiprocess_mode="max"
+)
+UPSTREAM_REJECTED = Counter(
+    "coral_upstream_rejected_total",
+    "Upstream calls rejected without being attempted",
+    ["operation", "reason"]
+)
+
+# Breaker state -> BREAKER_STATE value
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+def observe_upstream(operation: str, outcome: str, seconds: float):
+    """Record the duration of one upstream Coral server call."""
+    UPSTREAM_LATENCY.labels(operation, outcome).observe(seconds)
+
+def observe_queue_wait(operation: str, seconds: float):
+    """Record how long an upstream call waited for an execution slot."""
+    UPSTREAM_QUEUE_WAIT.labels(operation).observe(seconds)
+
+def set_breaker_state(operation: str, state: str):
+    """Record the circuit breaker state of an upstream operation."""
+    BREAKER_STATE.labels(operation).set(BREAKER_STATE_VALUES[state])
+
+def observe_rejected(operation: str, reason: str):
+    """Count an upstream call rejected by a circuit breaker or the admission limit."""
+    UPSTREAM_REJECTED.labels(operation, reason).inc()
+
+def register_gauges(prefix: str, stats: Callable[[], Dict[str, Any]], keys: Dict[str, str]):
+    """
+    Export numeric values of a stats() dict as gauges read at scrape time.
+
+    Args:
+        prefix: Metric name prefix
+        stats: Function returning the current stats dict
+        keys: Stats keys to export, mapped to their gauge descriptions
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Callback gauges can't be aggregated across worker processes
+        return
+    for key, description in keys.items():
+        gauge = Gauge(f"{prefix}_{key}", description)
+        gauge.set_function(lambda key=key: float(stats().get(key) or 0))
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, in-flight requests and latency
+    per route template, so path parameters don't create new label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], self._route(scope))
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.labels(*labels).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            LATENCY.labels(*labels).observe(time.perf_counter() - started)
+            IN_FLIGHT.labels(*labels).dec()
+            REQUESTS.labels(*labels, str(status["code"])).inc()
+
+def metrics_response() -> Response:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Under a multi-worker server PROMETHEUS_MULTIPROC_DIR is set and the
+    metrics of all worker processes are aggregated.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
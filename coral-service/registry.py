@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Agent and Thread Registry
+
+This module keeps a local, indexed copy of the agents (name, capabilities)
+and threads (id, participants, created_at) known to the Coral Protocol
+Service in Postgres, through a pooled asyncpg connection. It lets the agent
+list and thread lookups be served without a call to the upstream Coral
+server. It also stores idempotency keys, so that repeated requests are
+deduplicated across worker processes.
+
+The registry is enabled when DB_HOST is set and asyncpg is installed;
+otherwise every method reports it as unavailable and callers fall back to the
+upstream server.
+"""
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default connection pool settings
+DEFAULT_REGISTRY_POOL_MIN = int(os.getenv("CORAL_REGISTRY_POOL_MIN", "1"))
+DEFAULT_REGISTRY_POOL_MAX = int(os.getenv("CORAL_REGISTRY_POOL_MAX", "10"))
+DEFAULT_REGISTRY_COMMAND_TIMEOUT = float(os.getenv("CORAL_REGISTRY_COMMAND_TIMEOUT", "5"))
+
+# Maximum number of threads returned by one participant lookup
+MAX_THREAD_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coral_agents (
+    name TEXT PRIMARY KEY,
+    capabilities TEXT[] NOT NULL DEFAULT '{}',
+    registered_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS coral_agents_capabilities_idx ON coral_agents USING GIN (capabilities);
+CREATE TABLE IF NOT EXISTS coral_threads (
+    id TEXT PRIMARY KEY,
+    participants TEXT[] NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS coral_threads_participants_idx ON coral_threads USING GIN (participants);
+CREATE INDEX IF NOT EXISTS coral_threads_created_at_idx ON coral_threads (created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS coral_idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER,
+    body JSONB,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coral_idempotency_keys_expires_at_idx ON coral_idempotency_keys (expires_at);
+"""
+
+# Takes over the key if it is new or expired; returns nothing while another request holds it.
+# The claim expires after a short lease, so a key held by a crashed worker can be claimed again;
+# completing the request extends it to the replay TTL.
+CLAIM_REQUEST = """
+INSERT INTO coral_idempotency_keys (key, fingerprint, expires_at) VALUES ($1, $2, now() + make_interval(secs => $3))
+ON CONFLICT (key) DO UPDATE SET fingerprint = EXCLUDED.fingerprint, status_code = NULL, body = NULL, expires_at = EXCLUDED.expires_at
+WHERE coral_idempotency_keys.expires_at < now()
+RETURNING key
+"""
+
+UPSERT_AGENT = """
+INSERT INTO coral_agents (name, capabilities) VALUES ($1, $2)
+ON CONFLICT (name) DO UPDATE SET capabilities = EXCLUDED.capabilities, updated_at = now()
+"""
+
+class RegistryUnavailable(Exception):
+    """The registry is not configured or its database could not be reached."""
+
+def _thread(row) -> Dict[str, Any]:
+    return {
+        "thread_id": row["id"],
+        "participants": list(row["participants"]),
+        "created_at": row["created_at"].isoformat()
+    }
+
+class Registry:
+    """
+    Postgres-backed registry of agents and threads.
+
+    Agent capabilities and thread participants are stored as arrays with GIN
+    indexes, so lookups by capability or participant use the index.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = DEFAULT_REGISTRY_POOL_MIN,
+        max_size: int = DEFAULT_REGISTRY_POOL_MAX,
+        command_timeout: float = DEFAULT_REGISTRY_COMMAND_TIMEOUT,
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            dsn: Postgres connection string; built from the DB_* variables if not given
+            min_size: Connections kept open in the pool
+            max_size: Maximum connections in the pool
+            command_timeout: Seconds a query may take
+        """
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        # Whether the agent table holds a full copy of the upstream agent list
+        self.seeded = False
+        self._pool = None
+
+    @staticmethod
+    def configured() -> bool:
+        """Whether a database is configured for the registry."""
+        return bool(os.getenv("DB_HOST")) and asyncpg is not None
+
+    @property
+    def available(self) -> bool:
+        """Whether the connection pool is open."""
+        return self._pool is not None
+
+    async def start(self):
+        """Open the connection pool and create the schema."""
+        if asyncpg is None:
+            raise RegistryUnavailable("asyncpg is not installed")
+        connect_args = {"dsn": self.dsn} if self.dsn else {
+            "host": os.getenv("DB_HOST"),
+            "port": int(os.getenv("DB_PORT", "5432")),
+            "user": os.getenv("DB_USER", "angus"),
+            "password": os.getenv("DB_PASSWORD", "angus"),
+            "database": os.getenv("DB_NAME", "angus")
+        }
+        pool = await asyncpg.create_pool(
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=self.command_timeout,
+            **connect_args
+        )
+        async with pool.acquire() as conn:
+            # Serialize schema creation between worker processes starting together
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('coral_registry_schema'))")
+                await conn.execute(SCHEMA)
+        self._pool = pool
+        logger.info(f"Opened agent registry with up to {self.max_size} connections")
+
+    async def stop(self):
+        """Close the connection pool."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    def _require_pool(self):
+        if self._pool is None:
+            raise RegistryUnavailable("Agent registry is not available")
+        return self._pool
+
+    async def ping(self) -> Dict[str, Any]:
+        """
+        Verify the database answers.
+
+        Returns:
+            Dict: Connection pool size and idle connections
+        """
+        pool = self._require_pool()
+        await pool.fetchval("SELECT 1")
+        return {"pool_size": pool.get_size(), "pool_idle": pool.get_idle_size()}
+
+    async def upsert_agents(self, agents: Iterable[Tuple[str, List[str]]]):
+        """
+        Insert or update agents.
+
+        Args:
+            agents: (name, capabilities) pairs
+        """
+        rows = [(name, list(capabilities or [])) for name, capabilities in agents]
+        if rows:
+            await self._require_pool().executemany(UPSERT_AGENT, rows)
+
+    async def now(self) -> datetime:
+        """Current database time, used to mark the start of a sync."""
+        return await self._require_pool().fetchval("SELECT now()")
+
+    async def sync_agents(self, agents: Iterable[Tuple[str, List[str]]], started_at: datetime):
+        """
+        Make the agent table match an upstream agent list.
+
+        Agents missing from the list are removed unless they were registered
+        or updated after `started_at`, so registrations that race with the
+        sync are kept.
+
+        Args:
+            agents: (name, capabilities) pairs of the full upstream list
+            started_at: Database time taken before the upstream list was fetched
+        """
+        rows = [(name, list(capabilities or [])) for name, capabilities in agents]
+        async with self._require_pool().acquire() as conn:
+            async with conn.transaction():
+                if rows:
+                    await conn.executemany(UPSERT_AGENT, rows)
+                await conn.execute(
+                    "DELETE FROM coral_agents WHERE NOT (name = ANY($1::text[])) AND updated_at < $2",
+                    [name for name, _ in rows], started_at
+                )
+
+    async def list_agents(self) -> List[Dict[str, Any]]:
+        """
+        List all registered agents.
+
+        Returns:
+            List[Dict[str, Any]]: Agents with name and capabilities, ordered by name
+        """
+        rows = await self._require_pool().fetch("SELECT name, capabilities FROM coral_agents ORDER BY name")
+        return [{"name": row["name"], "capabilities": list(row["capabilities"])} for row in rows]
+
+    async def count_agents(self) -> int:
+        """Number of registered agents."""
+        return await self._require_pool().fetchval("SELECT count(*) FROM coral_agents")
+
+    async def record_thread(self, thread_id: str, participants: List[str]):
+        """
+        Store a newly created thread.
+
+        Args:
+            thread_id: ID of the thread
+            participants: Names of the participating agents
+        """
+        await self._require_pool().execute(
+            "INSERT INTO coral_threads (id, participants) VALUES ($1, $2) ON CONFLICT (id) DO NOTHING",
+            thread_id, participants
+        )
+
+    async def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a thread by ID.
+
+        Args:
+            thread_id: ID of the thread
+
+        Returns:
+            Optional[Dict[str, Any]]: The thread, or None if unknown
+        """
+        row = await self._require_pool().fetchrow(
+            "SELECT id, participants, created_at FROM coral_threads WHERE id = $1", thread_id
+        )
+        return _thread(row) if row is not None else None
+
+    async def find_threads(
+        self,
+        participant: str,
+        limit: int = 100,
+        before: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        List the threads an agent participates in, newest first.
+
+        Args:
+            participant: Agent name
+            limit: Maximum number of threads to return
+            before: (created_at, thread_id) of the last thread of the previous page
+
+        Returns:
+            List[Dict[str, Any]]: Threads with ID, participants and creation time
+        """
+        limit = max(1, min(limit, MAX_THREAD_PAGE_SIZE))
+        if before is None:
+            rows = await self._require_pool().fetch(
+                "SELECT id, participants, created_at FROM coral_threads WHERE participants @> ARRAY[$1::text] "
+                "ORDER BY created_at DESC, id DESC LIMIT $2",
+                participant, limit
+            )
+        else:
+            rows = await self._require_pool().fetch(
+                "SELECT id, participants, created_at FROM coral_threads WHERE participants @> ARRAY[$1::text] "
+                "AND (created_at, id) < ($2, $3) ORDER BY created_at DESC, id DESC LIMIT $4",
+                participant, before[0], before[1], limit
+            )
+        return [_thread(row) for row in rows]
+
+    async def claim_request(self, key: str, fingerprint: str, lease: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Claim an idempotency key for a request about to run.
+
+        Args:
+            key: Scoped idempotency key
+            fingerprint: Hash of the request payload
+            lease: Seconds the claim holds the key while its request runs
+
+        Returns:
+            Tuple: Whether the key was claimed, and otherwise the existing entry
+                with its fingerprint, status code and body (None while in progress)
+        """
+        pool = self._require_pool()
+        # The holder may release the key between the two statements; try again then
+        for _ in range(3):
+            if await pool.fetchval(CLAIM_REQUEST, key, fingerprint, lease) is not None:
+                return True, None
+            row = await pool.fetchrow(
+                "SELECT fingerprint, status_code, body FROM coral_idempotency_keys WHERE key = $1", key
+            )
+            if row is not None:
+                return False, {
+                    "fingerprint": row["fingerprint"],
+                    "status_code": row["status_code"],
+                    "body": json.loads(row["body"]) if row["body"] is not None else None
+                }
+        raise RegistryUnavailable(f"Could not claim idempotency key '{key}'")
+
+    async def complete_request(self, key: str, status_code: int, body: Dict[str, Any], ttl: float):
+        """
+        Store the response of a claimed request for replay.
+
+        Args:
+            key: Scoped idempotency key
+            status_code: HTTP status of the response
+            body: JSON response body
+            ttl: Seconds the key and its response are kept
+        """
+        await self._require_pool().execute(
+            "UPDATE coral_idempotency_keys SET status_code = $2, body = $3::jsonb, "
+            "expires_at = now() + make_interval(secs => $4) WHERE key = $1",
+            key, status_code, json.dumps(body), ttl
+        )
+
+    async def release_request(self, key: str):
+        """
+        Release a claimed key whose request failed, so it can be retried.
+
+        Args:
+            key: Scoped idempotency key
+        """
+        await self._require_pool().execute(
+            "DELETE FROM coral_idempotency_keys WHERE key = $1 AND status_code IS NULL", key
+        )
+
+    async def purge_requests(self) -> int:
+        """
+        Delete expired idempotency keys.
+
+        Returns:
+            int: Number of keys deleted
+        """
+        result = await self._require_pool().execute("DELETE FROM coral_idempotency_keys WHERE expires_at < now()")
+        return int(result.split()[-1])
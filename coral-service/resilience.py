@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Upstream Resilience
+
+This module provides the per-operation circuit breakers and the error raised
+when an upstream call is rejected without being attempted, either because the
+operation's breaker is open or because the upstream execution layer is over
+its admission limit. The service answers such rejections with a fast 503 and
+a Retry-After header instead of letting requests queue behind a slow or
+failing Coral server.
+"""
+import os
+import time
+import logging
+from typing import Any, Dict, Optional
+
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default circuit breaker settings
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("CORAL_BREAKER_FAILURE_THRESHOLD", "5"))
+DEFAULT_RECOVERY_TIMEOUT = float(os.getenv("CORAL_BREAKER_RECOVERY_TIMEOUT", "30"))
+DEFAULT_HALF_OPEN_MAX_CALLS = int(os.getenv("CORAL_BREAKER_HALF_OPEN_MAX_CALLS", "1"))
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was rejected before reaching the Coral server."""
+
+    def __init__(self, message: str, reason: str, retry_after: float):
+        """
+        Initialize the error.
+
+        Args:
+            message: Human-readable explanation
+            reason: "circuit_open", "overloaded", "rate_limited", or "not_ready" before the client exists
+            retry_after: Seconds the caller should wait before retrying
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream operation.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `recovery_timeout` seconds. It then lets up to
+    `half_open_max_calls` probe calls through: a successful probe closes the
+    breaker, a failed one opens it again, and a cancelled one gives its slot
+    back through release_probe().
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = DEFAULT_HALF_OPEN_MAX_CALLS,
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            operation: Name of the upstream operation
+            failure_threshold: Consecutive failures that open the breaker
+            recovery_timeout: Seconds the breaker stays open before probing
+            half_open_max_calls: Probe calls allowed at once while half-open
+        """
+        self.operation = operation
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        # Incremented each time the breaker goes half-open, so a late release can't free a newer probe slot
+        self._probe_round = 0
+        self._rejected = 0
+        self._opened = 0
+        metrics.set_breaker_state(operation, self.state)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker for '{self.operation}' changed from {self.state} to {state}")
+        self.state = state
+        metrics.set_breaker_state(self.operation, state)
+
+    def before_call(self) -> Optional[int]:
+        """
+        Admit a call or reject it while the breaker is open.
+
+        Returns:
+            Optional[int]: The probe round if the call took a half-open probe slot,
+                to pass to release_probe() if it ends without an outcome
+
+        Raises:
+            UpstreamUnavailable: If the breaker is open or its probes are in flight
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                self._rejected += 1
+                raise UpstreamUnavailable(
+                    f"Circuit breaker for '{self.operation}' is open", "circuit_open", remaining
+                )
+            self._transition(HALF_OPEN)
+            self._probes = 0
+            self._probe_round += 1
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self._rejected += 1
+                raise UpstreamUnavailable(
+                    f"Circuit breaker for '{self.operation}' is probing the upstream", "circuit_open", 1.0
+                )
+            self._probes += 1
+            return self._probe_round
+        return None
+
+    def release_probe(self, probe_round: Optional[int]):
+        """
+        Give back the probe slot of a call that was cancelled before it succeeded or failed.
+
+        Args:
+            probe_round: Value returned by before_call() for the call
+        """
+        if probe_round is not None and probe_round == self._probe_round and self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self):
+        """Record a successful call."""
+        self._failures = 0
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        """Record a failed call."""
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._opened += 1
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters.
+
+        Returns:
+            Dict: State, consecutive failures, rejections and times opened
+        """
+        retry_after: Optional[float] = None
+        if self.state == OPEN:
+            retry_after = round(max(0.0, self._opened_at + self.recovery_timeout - time.monotonic()), 3)
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "rejected": self._rejected,
+            "times_opened": self._opened,
+            "retry_after_s": retry_after
+        }
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+
+This module shares one in-flight call between concurrent identical reads.
+The first caller for a key starts the call; callers arriving while it runs
+wait for the same result (or exception) instead of issuing their own, so a
+burst of identical requests, such as every angus-core worker listing agents
+after a deploy, costs one upstream call.
+
+The call runs in its own task, so a caller that is cancelled (for example by
+a client disconnecting) doesn't fail the others waiting on it.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._issued: Dict[Hashable, int] = {}
+        self._coalesced: Dict[Hashable, int] = {}
+        self._failed: Dict[Hashable, int] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run a call, or join the identical call already in flight.
+
+        Args:
+            key: Identifies calls whose results are interchangeable
+            func: Coroutine function to call when no call for the key is running
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The result of the shared call
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._coalesced[key] = self._coalesced.get(key, 0) + 1
+            return await asyncio.shield(flight)
+
+        self._issued[key] = self._issued.get(key, 0) + 1
+        flight = asyncio.ensure_future(func(*args, **kwargs))
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(flight)
+
+    def _finish(self, key: Hashable, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.cancelled() or flight.exception() is not None:
+            self._failed[key] = self._failed.get(key, 0) + 1
+
+    def forget(self, key: Hashable):
+        """
+        Stop new callers from joining the call in flight for a key.
+
+        Used when the data the call is reading has just changed: callers
+        already waiting still get its result, later ones start a new call.
+        """
+        self._flights.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing metrics.
+
+        Returns:
+            Dict: Calls issued, calls coalesced into one in flight and failed calls,
+                in total and per key
+        """
+        keys = sorted(set(self._issued) | set(self._coalesced), key=str)
+        issued = sum(self._issued.values())
+        coalesced = sum(self._coalesced.values())
+        return {
+            "in_flight": len(self._flights),
+            "issued": issued,
+            "coalesced": coalesced,
+            "failed": sum(self._failed.values()),
+            "coalesced_ratio": round(coalesced / (issued + coalesced), 3) if issued + coalesced else 0.0,
+            "keys": {
+                str(key): {
+                    "issued": self._issued.get(key, 0),
+                    "coalesced": self._coalesced.get(key, 0),
+                    "failed": self._failed.get(key, 0)
+                }
+                for key in keys
+            }
+        }
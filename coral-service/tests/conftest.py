@@ -0,0 +1,34 @@
+"""Make the Coral Protocol Service modules, those it shares with angus-core and the fake upstream importable from the tests."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "benchmarks"))
+
+@pytest.fixture
+def coral_service(monkeypatch, tmp_path):
+    """
+    Install the fake upstream client into the app module for one test.
+
+    Returns a function taking (name, capabilities) pairs for the agents
+    registered up front and fake_coral.install()'s keyword arguments, which
+    returns the app module and the fake client. The app's original client and
+    models are restored after the test.
+    """
+    monkeypatch.setenv("CORAL_QUEUE_DB_PATH", str(tmp_path / "queue.db"))
+    import app
+    import fake_coral
+
+    for name in ("coral_client", "Agent", "Thread", "HumanMessage"):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    monkeypatch.setattr(app.message_hub, "source", app.message_hub.source)
+
+    def install(agents=(), **kwargs):
+        fake = fake_coral.install(app, agents=[fake_coral.Agent(name, list(capabilities)) for name, capabilities in agents], **kwargs)
+        app.agent_cache.invalidate()
+        return app, fake
+
+    return install
@@ -0,0 +1,152 @@
+"""Tests for /agents/list representations, pages and revalidation."""
+import json
+import asyncio
+
+import httpx
+
+AGENTS = [(f"agent_{i:03d}", ["search", "summarize"]) for i in range(50)]
+
+def get(app, *requests):
+    """GET /agents/list once per (params, headers) pair, in order."""
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            return [await client.get("/agents/list", params=params, headers=headers) for params, headers in requests]
+
+    return asyncio.run(scenario())
+
+def test_each_representation_has_its_own_etag(coral_service):
+    app, _ = coral_service(AGENTS)
+    responses = get(
+        app,
+        ({}, {"Accept-Encoding": "identity"}),
+        ({}, {"Accept": "application/msgpack", "Accept-Encoding": "identity"}),
+        ({}, {"Accept-Encoding": "gzip"}),
+        ({}, {"Accept": "application/msgpack", "Accept-Encoding": "gzip"}),
+        ({}, {"Accept": "application/x-ndjson", "Accept-Encoding": "identity"}),
+        ({"include_details": "false"}, {"Accept-Encoding": "identity"}),
+    )
+    assert [response.status_code for response in responses] == [200] * 6
+    assert responses[0].headers["Content-Type"] == "application/json"
+    assert responses[1].headers["Content-Type"] == "application/msgpack"
+    assert responses[2].headers["Content-Encoding"] == "gzip"
+    etags = [response.headers["ETag"] for response in responses]
+    assert len(set(etags)) == len(etags)
+    assert etags[3].endswith('-msgpack-gzip"')
+
+def test_matching_etag_is_revalidated_per_representation(coral_service):
+    app, _ = coral_service(AGENTS)
+    msgpack = {"Accept": "application/msgpack", "Accept-Encoding": "identity"}
+    first, = get(app, ({}, msgpack))
+    etag = first.headers["ETag"]
+    same, as_json = get(app, ({}, {**msgpack, "If-None-Match": etag}), ({}, {"Accept-Encoding": "identity", "If-None-Match": etag}))
+    assert same.status_code == 304 and same.headers["ETag"] == etag
+    assert as_json.status_code == 200
+    assert as_json.headers["Content-Type"] == "application/json"
+    assert as_json.json()["agents"][0]["name"] == "agent_000"
+
+def test_pages_are_rendered_with_their_etag(coral_service):
+    app, _ = coral_service(AGENTS)
+    page, = get(app, ({"limit": 2, "include_details": "false"}, {}))
+    assert page.json() == {"status": "success", "agents": ["agent_000", "agent_001"], "next_cursor": "agent_001"}
+    revalidated, = get(app, ({"limit": 2, "include_details": "false"}, {"If-None-Match": page.headers["ETag"]}))
+    assert revalidated.status_code == 304
+
+def test_not_modified_varies_like_the_full_response(coral_service):
+    app, _ = coral_service(AGENTS)
+    gzipped, = get(app, ({}, {"Accept-Encoding": "gzip"}))
+    etag = gzipped.headers["ETag"]
+    same, plain = get(app, ({}, {"Accept-Encoding": "gzip", "If-None-Match": etag}), ({}, {"Accept-Encoding": "identity", "If-None-Match": etag}))
+    assert same.status_code == 304
+    assert same.headers["Vary"] == gzipped.headers["Vary"]
+    assert same.headers["Vary"].startswith("Accept, Accept-Encoding")
+    # A client without gzip never had the compressed bytes, so it gets the list again
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert len(plain.json()["agents"]) == len(AGENTS)
+
+def test_pages_walk_the_list_in_name_order(coral_service):
+    app, _ = coral_service(reversed(AGENTS))
+    names, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 16, "include_details": "false", **({"cursor": cursor} if cursor else {})}
+        page, = get(app, (params, {}))
+        names += page.json()["agents"]
+        cursor = page.json()["next_cursor"]
+        pages += 1
+        if cursor is None:
+            break
+    assert names == [name for name, _ in AGENTS]
+    assert pages == 4
+
+def test_page_size_is_clamped(coral_service, monkeypatch):
+    app, _ = coral_service(AGENTS)
+    monkeypatch.setattr(app, "MAX_AGENT_PAGE_SIZE", 10)
+    smallest, largest, by_cursor = get(
+        app,
+        ({"limit": 0}, {}),
+        ({"limit": 500}, {}),
+        ({"cursor": "agent_044"}, {}),
+    )
+    assert [agent["name"] for agent in smallest.json()["agents"]] == ["agent_000"]
+    assert len(largest.json()["agents"]) == 10 and largest.json()["next_cursor"] == "agent_009"
+    # A cursor without a limit gets a page of the largest size
+    assert [agent["name"] for agent in by_cursor.json()["agents"]] == [f"agent_{i:03d}" for i in range(45, 50)]
+    assert by_cursor.json()["next_cursor"] is None
+
+def test_ndjson_streams_one_agent_per_line(coral_service):
+    app, _ = coral_service(reversed(AGENTS))
+    ndjson = {"Accept": "application/x-ndjson", "Accept-Encoding": "identity"}
+    full, first, last = get(
+        app,
+        ({}, ndjson),
+        ({"limit": 30}, ndjson),
+        ({"cursor": "agent_029", "include_details": "false"}, ndjson),
+    )
+    assert full.headers["Content-Type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in full.text.splitlines()] == [{"name": name, "capabilities": caps} for name, caps in AGENTS]
+    assert "X-Next-Cursor" not in full.headers
+    assert len(first.text.splitlines()) == 30 and first.headers["X-Next-Cursor"] == "agent_029"
+    assert [json.loads(line) for line in last.text.splitlines()] == [name for name, _ in AGENTS[30:]]
+    assert "X-Next-Cursor" not in last.headers
+
+class FakeRegistry:
+    """Seeded registry whose agent reads return `agents`, or raise when it is None."""
+
+    available = True
+    seeded = True
+
+    def __init__(self, agents=None):
+        self.agents = agents
+        self.reads = 0
+
+    async def list_agents(self):
+        self.reads += 1
+        if self.agents is None:
+            raise ConnectionError("registry connection lost")
+        return self.agents
+
+def test_list_is_read_from_a_seeded_registry(coral_service, monkeypatch):
+    app, fake = coral_service(AGENTS)
+    registry = FakeRegistry([{"name": "registered", "capabilities": ["search"]}])
+    monkeypatch.setattr(app, "registry", registry)
+    response, = get(app, ({}, {}))
+    assert response.json()["agents"] == [{"name": "registered", "capabilities": ["search"]}]
+    assert registry.reads == 1
+    assert "list_agents" not in fake.calls
+
+def test_failed_registry_read_falls_back_to_upstream(coral_service, monkeypatch):
+    app, fake = coral_service(AGENTS[:2])
+    registry = FakeRegistry()
+    monkeypatch.setattr(app, "registry", registry)
+    response, = get(app, ({"include_details": "false"}, {}))
+    assert response.json()["agents"] == ["agent_000", "agent_001"]
+    assert registry.reads == 1 and fake.calls["list_agents"] == 1
+
+def test_failed_registry_read_without_a_client_is_unavailable(coral_service, monkeypatch):
+    app, _ = coral_service(AGENTS)
+    monkeypatch.setattr(app, "registry", FakeRegistry())
+    monkeypatch.setattr(app, "coral_client", None)
+    response, = get(app, ({}, {}))
+    assert response.status_code == 503
+    assert response.json()["reason"] == "not_ready"
+    assert "Retry-After" in response.headers
@@ -0,0 +1,62 @@
+"""Tests for the batch registration and send endpoints."""
+import asyncio
+import time
+
+import httpx
+
+def post(app, path, body):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            return response, time.perf_counter() - started
+
+    return asyncio.run(scenario())
+
+def test_register_batch_reports_each_agent(coral_service, monkeypatch):
+    app, fake = coral_service()
+    register_agent = fake.register_agent
+
+    def flaky_register(agent):
+        if agent.name == "bad":
+            raise RuntimeError("rejected upstream")
+        register_agent(agent)
+
+    monkeypatch.setattr(fake, "register_agent", flaky_register)
+    response, _ = post(app, "/agents/register_batch", {"agents": [
+        {"agent_name": "good", "capabilities": ["search"]},
+        {"agent_name": "bad"},
+    ]})
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["succeeded"], body["failed"]) == (1, 1)
+    assert [(item["agent_name"], item["status"]) for item in body["results"]] == [("good", "success"), ("bad", "error")]
+    assert body["results"][1]["message"] == "rejected upstream"
+    assert [agent.name for agent in fake.list_agents()] == ["good"]
+
+def test_send_batch_runs_sends_concurrently(coral_service):
+    app, fake = coral_service(latency=0.05)
+    messages = [{"recipient": f"agent_{i}", "content": "hello"} for i in range(10)]
+    response, elapsed = post(app, "/messages/send_batch", {"messages": messages})
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (10, 0)
+    assert [item["recipient"] for item in body["results"]] == [message["recipient"] for message in messages]
+    assert fake.calls["send_message"] == 10
+    # Ten sends of 50ms each, one after another, would take 500ms
+    assert elapsed < 0.35
+
+def test_send_batch_can_queue_messages(coral_service, monkeypatch):
+    app, _ = coral_service()
+    monkeypatch.setattr(app.message_queue, "enqueue", lambda recipient, *args: asyncio.sleep(0, f"queued-{recipient}"))
+    response, _ = post(app, "/messages/send_batch", {"messages": [{"recipient": "agent_1", "content": "hello", "delivery": "queued"}]})
+    assert response.json()["results"][0]["message_id"] == "queued-agent_1"
+
+def test_empty_and_oversized_batches_are_rejected(coral_service, monkeypatch):
+    app, fake = coral_service()
+    monkeypatch.setattr(app, "MAX_BATCH_SIZE", 3)
+    empty, _ = post(app, "/messages/send_batch", {"messages": []})
+    oversized, _ = post(app, "/agents/register_batch", {"agents": [{"agent_name": f"agent_{i}"} for i in range(4)]})
+    assert empty.status_code == 400
+    assert oversized.status_code == 400
+    assert "exceeds the maximum of 3" in oversized.json()["detail"]
+    assert not fake.calls
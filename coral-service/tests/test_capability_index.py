@@ -0,0 +1,155 @@
+"""Tests for the capability index behind /agents/search."""
+import asyncio
+import random
+
+import pytest
+
+from capability_index import MATCH_ALL, MATCH_ANY, MAX_SEARCH_PAGE_SIZE, CapabilityIndex
+
+AGENTS = [
+    {"name": "delta", "capabilities": ["search", "summarize"]},
+    {"name": "alpha", "capabilities": ["search"]},
+    {"name": "charlie", "capabilities": ["summarize", "translate", "search"]},
+    {"name": "bravo", "capabilities": ["translate", "translate"]},
+    {"name": "echo", "capabilities": []},
+]
+
+def build(agents=AGENTS, version=None) -> CapabilityIndex:
+    index = CapabilityIndex()
+    index.replace(agents, version=version)
+    return index
+
+def scan(agents, capabilities, match):
+    """Reference result: filter every agent."""
+    test = all if match == MATCH_ALL else any
+    return sorted(
+        agent["name"] for agent in agents
+        if capabilities and test(capability in (agent["capabilities"] or []) for capability in capabilities)
+    )
+
+def all_pages(index, capabilities, match, limit):
+    names, cursor = index.search(capabilities, match=match, limit=limit)
+    while cursor is not None:
+        page, cursor = index.search(capabilities, match=match, limit=limit, after=cursor)
+        names += page
+    return names
+
+def test_match_all_requires_every_capability():
+    index = build()
+    assert index.search(["search", "summarize"]) == (["charlie", "delta"], None)
+    assert index.search(["search", "unknown"]) == ([], None)
+    assert index.search([]) == ([], None)
+
+def test_match_any_merges_without_duplicates():
+    index = build()
+    assert index.search(["summarize", "translate"], match=MATCH_ANY) == (["bravo", "charlie", "delta"], None)
+    assert index.search(["unknown"], match=MATCH_ANY) == ([], None)
+
+def test_pages_continue_from_the_cursor():
+    index = build()
+    first, cursor = index.search(["search"], match=MATCH_ALL, limit=2)
+    assert (first, cursor) == (["alpha", "charlie"], "charlie")
+    assert index.search(["search"], limit=2, after=cursor) == (["delta"], None)
+
+def test_exact_page_reports_no_next_page():
+    assert build().search(["search"], limit=3) == (["alpha", "charlie", "delta"], None)
+
+def test_limit_is_clamped():
+    index = build([{"name": f"agent_{i:05d}", "capabilities": ["x"]} for i in range(MAX_SEARCH_PAGE_SIZE + 5)])
+    names, cursor = index.search(["x"], limit=10 ** 6)
+    assert len(names) == MAX_SEARCH_PAGE_SIZE and cursor == names[-1]
+    assert len(index.search(["x"], limit=0)[0]) == 1
+
+def test_duplicate_capabilities_are_indexed_once():
+    index = build()
+    assert index.capabilities("bravo") == ["translate"]
+    assert index.stats() == {"version": None, "agents": 5, "capabilities": 3}
+
+def test_upsert_adds_and_replaces_capabilities():
+    index = build(version="v1")
+    index.upsert("foxtrot", ["search"])
+    index.upsert("bravo", ["search"])
+    assert index.search(["search"]) == (["alpha", "bravo", "charlie", "delta", "foxtrot"], None)
+    assert index.search(["translate"]) == (["charlie"], None)
+    index.upsert("charlie", [])
+    assert index.search(["translate"], match=MATCH_ANY) == ([], None)
+    assert index.stats() == {"version": "v1", "agents": 6, "capabilities": 2}
+
+def test_replace_drops_the_previous_list():
+    index = build(version="v1")
+    index.replace([{"name": "zulu", "capabilities": ["search"]}], version="v2")
+    assert index.search(["search"]) == (["zulu"], None)
+    assert index.version == "v2"
+
+@pytest.mark.parametrize("match", [MATCH_ALL, MATCH_ANY])
+def test_paged_search_matches_a_full_scan(match):
+    rng = random.Random(7)
+    capabilities = [f"cap_{i}" for i in range(8)]
+    agents = [{"name": f"agent_{i:04d}", "capabilities": rng.sample(capabilities, rng.randint(0, 4))} for i in range(500)]
+    index = build(agents)
+    for _ in range(20):
+        wanted = rng.sample(capabilities, rng.randint(1, 3))
+        assert all_pages(index, wanted, match, limit=rng.randint(1, 50)) == scan(agents, wanted, match)
+
+def test_search_endpoint_pages_and_sees_new_agents(monkeypatch, tmp_path):
+    monkeypatch.setenv("CORAL_QUEUE_DB_PATH", str(tmp_path / "queue.db"))
+    import httpx
+
+    import app
+    import fake_coral
+
+    fake_coral.install(app, agents=[
+        fake_coral.Agent(agent["name"], agent["capabilities"]) for agent in AGENTS
+    ])
+    app.agent_cache.invalidate()
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            search = lambda **params: client.get("/agents/search", params=params)
+            first = await search(capability=["search", "summarize"], match="all", limit=1)
+            second = await search(capability=["search", "summarize"], match="all", limit=1, cursor=first.json()["next_cursor"])
+            await client.post("/agents/register", json={"agent_name": "foxtrot", "capabilities": ["summarize"]})
+            details = await search(capability="summarize", match="any", include_details="true")
+            return first.json(), second.json(), details.json()
+
+    first, second, details = asyncio.run(scenario())
+    assert (first["agents"], first["next_cursor"]) == (["charlie"], "charlie")
+    assert (second["agents"], second["next_cursor"]) == (["delta"], None)
+    assert [agent["name"] for agent in details["agents"]] == ["charlie", "delta", "foxtrot"]
+    assert details["agents"][-1]["capabilities"] == ["summarize"]
+
+def test_index_is_rebuilt_only_from_newer_lists(coral_service, monkeypatch):
+    import httpx
+
+    app, _ = coral_service([(agent["name"], agent["capabilities"]) for agent in AGENTS])
+    builds = []
+    replace = app.capability_index.replace
+    monkeypatch.setattr(app.capability_index, "replace", lambda agents, version=None: (builds.append(version), replace(agents, version)))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            search = lambda: client.get("/agents/search", params={"capability": "summarize"})
+            results = [(await search()).json()["agents"]]
+            await client.post("/agents/register", json={"agent_name": "foxtrot", "capabilities": ["summarize"]})
+            results.append((await search()).json()["agents"])
+            # A change from elsewhere, such as a registry sync, is loaded and indexed
+            app.coral_client.register_agent(app.Agent(name="golf", capabilities=["summarize"]))
+            app.agent_cache.invalidate()
+            results.append((await search()).json()["agents"])
+            return results
+
+    first, registered, synced = asyncio.run(scenario())
+    assert first == ["charlie", "delta"]
+    assert registered == ["charlie", "delta", "foxtrot"]
+    assert synced == ["charlie", "delta", "foxtrot", "golf"]
+    # The list loaded after the registration already matched the patched index
+    assert len(builds) == 2 and builds[0] < builds[1]
+
+def test_older_snapshot_does_not_replace_the_index(coral_service):
+    from agent_cache import AgentSnapshot
+
+    app, _ = coral_service()
+    app.capability_index.replace([{"name": "newer", "capabilities": ["search"]}], version=app.agent_cache.sequence + 2)
+    app.agent_cache._snapshot = AgentSnapshot([{"name": "older", "capabilities": ["search"]}], app.agent_cache.sequence + 1)
+    response = asyncio.run(app.search_agents(capability=["search"], match=MATCH_ALL, limit=100, cursor=None, include_details=False))
+    assert response["agents"] == ["newer"]
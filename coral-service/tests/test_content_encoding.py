@@ -0,0 +1,103 @@
+"""Tests for request decompression and response compression."""
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from content_encoding import (
+    CompressionMiddleware,
+    DecompressedSizeExceeded,
+    available_encodings,
+    choose_encoding,
+    compress,
+    decompress,
+)
+
+ENCODINGS = available_encodings()
+
+async def echo(request: Request):
+    body = await request.body()
+    return JSONResponse({"size": len(body), "content_length": request.headers.get("content-length")})
+
+async def large(request: Request):
+    return PlainTextResponse("x" * 4096)
+
+def post(body: bytes, headers: dict, max_decompressed_size: int = 1024, path: str = "/echo"):
+    app = CompressionMiddleware(
+        Starlette(routes=[Route("/echo", echo, methods=["POST"]), Route("/large", large)]),
+        encodings=ENCODINGS,
+        max_decompressed_size=max_decompressed_size,
+    )
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://coral") as client:
+            if path == "/echo":
+                return await client.post(path, content=body, headers=headers)
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_decompress_round_trips(encoding):
+    data = b"coral " * 1000
+    assert decompress(compress(data, encoding), encoding) == data
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_decompress_stops_at_the_size_limit(encoding):
+    # Highly compressible, so the compressed body is far smaller than the limit
+    data = b"\0" * (1024 * 1024)
+    with pytest.raises(DecompressedSizeExceeded):
+        decompress(compress(data, encoding), encoding, max_size=64 * 1024)
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_decompress_rejects_invalid_body(encoding):
+    with pytest.raises(ValueError):
+        decompress(b"not compressed", encoding)
+
+def test_decompress_rejects_truncated_gzip():
+    with pytest.raises(ValueError):
+        decompress(gzip.compress(b"coral " * 100)[:-8], "gzip")
+
+def test_choose_encoding_follows_quality_then_service_preference():
+    assert choose_encoding(None, ["zstd", "gzip"]) is None
+    assert choose_encoding("gzip, zstd", ["zstd", "gzip"]) == "zstd"
+    assert choose_encoding("zstd;q=0.5, gzip", ["zstd", "gzip"]) == "gzip"
+    assert choose_encoding("*;q=0.1, gzip;q=0", ["gzip"]) is None
+    assert choose_encoding("br", ["zstd", "gzip"]) is None
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_compressed_request_reaches_the_endpoint_decompressed(encoding):
+    response = post(compress(b"a" * 1000, encoding), {"Content-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000, "content_length": "1000"}
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_request_expanding_past_the_limit_is_rejected_with_413(encoding):
+    response = post(compress(b"a" * 4096, encoding), {"Content-Encoding": encoding}, max_decompressed_size=1024)
+    assert response.status_code == 413
+    assert response.json()["status"] == "error"
+    assert response.headers["Accept-Encoding"] == ", ".join(ENCODINGS)
+
+def test_unsupported_request_encoding_is_rejected_with_415():
+    response = post(b"a", {"Content-Encoding": "br"})
+    assert response.status_code == 415
+
+def test_invalid_compressed_request_is_rejected_with_400():
+    response = post(b"not compressed", {"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+def test_large_response_is_compressed_when_accepted():
+    response = post(b"", {"Accept-Encoding": "gzip"}, path="/large")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.text == "x" * 4096
+
+def test_small_response_is_sent_uncompressed():
+    response = post(b"a", {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Accept-Encoding"] == ", ".join(ENCODINGS)
@@ -0,0 +1,183 @@
+"""Tests for fair send scheduling."""
+import asyncio
+
+import pytest
+
+from fair_scheduler import FairScheduler
+from resilience import UpstreamUnavailable
+
+async def send(order: list, name: str, delay: float = 0.01):
+    order.append(name)
+    await asyncio.sleep(delay)
+
+def test_burst_from_one_sender_does_not_starve_another():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, weights={})
+        order = []
+        burst = [asyncio.create_task(scheduler.run("a", "x", send, order, "a")) for _ in range(5)]
+        await asyncio.sleep(0)
+        other = asyncio.create_task(scheduler.run("b", "x", send, order, "b"))
+        await asyncio.gather(*burst, other)
+        return order
+
+    order = asyncio.run(scenario())
+    # The first send of the burst already holds the slot; b goes next
+    assert order[:3] == ["a", "b", "a"]
+
+def test_weights_share_capacity():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, weights={"heavy": 2})
+        order = []
+        tasks = [asyncio.create_task(scheduler.run("light", "x", send, order, "light", 0.001)) for _ in range(6)]
+        tasks += [asyncio.create_task(scheduler.run("heavy", "x", send, order, "heavy", 0.001)) for _ in range(6)]
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order[:9].count("heavy") == 6
+
+def test_waiting_too_long_is_rejected():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, max_queue_wait=0.05, weights={})
+        blocker = asyncio.create_task(scheduler.run("a", "x", asyncio.sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(UpstreamUnavailable) as e:
+            await scheduler.run("b", "x", asyncio.sleep, 0)
+        blocker.cancel()
+        return e.value, scheduler.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.reason == "rate_limited"
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 0
+
+def test_too_many_waiting_is_rejected():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, max_queued_per_sender=2, weights={})
+        tasks = [asyncio.create_task(scheduler.run("a", "x", asyncio.sleep, 0.01)) for _ in range(4)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [isinstance(result, UpstreamUnavailable) for result in results] == [False, False, False, True]
+
+def test_recipient_rate_limit_throttles():
+    async def scenario():
+        scheduler = FairScheduler(recipient_rate=50, recipient_burst=1, weights={})
+        await asyncio.gather(*(scheduler.run("a", "x", asyncio.sleep, 0) for _ in range(3)))
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["sent"] == 3
+    assert stats["recipients"]["x"] == {"sent": 3, "throttled": 2}
+
+def test_idle_senders_and_recipients_are_forgotten():
+    async def scenario():
+        scheduler = FairScheduler(sender_rate=100, recipient_rate=100, idle_timeout=0.05, weights={})
+        for i in range(5):
+            await scheduler.run(f"sender-{i}", f"recipient-{i}", asyncio.sleep, 0)
+        await asyncio.sleep(0.1)
+        await scheduler.run("last", "x", asyncio.sleep, 0)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    stats = scheduler.stats()
+    assert list(stats["senders"]) == ["last"]
+    assert list(stats["recipients"]) == ["x"]
+    assert list(scheduler._sender_buckets) == ["last"]
+    assert list(scheduler._recipient_buckets) == ["x"]
+    # Totals still count the forgotten ones
+    assert stats["sent"] == 6
+
+def test_tracked_senders_are_capped():
+    async def scenario():
+        scheduler = FairScheduler(sender_rate=1000, max_tracked=3, weights={})
+        for i in range(20):
+            await scheduler.run(f"sender-{i}", f"recipient-{i}", asyncio.sleep, 0)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    stats = scheduler.stats()
+    assert list(stats["senders"]) == ["sender-17", "sender-18", "sender-19"]
+    assert len(stats["recipients"]) == 3
+    assert len(scheduler._sender_buckets) == 3
+    assert stats["sent"] == 20
+    assert stats["evicted"] > 0
+
+def test_senders_with_waiting_sends_are_kept():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, max_tracked=1, weights={})
+        blocker = asyncio.create_task(scheduler.run("a", "x", asyncio.sleep, 0.05))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.run("b", "x", asyncio.sleep, 0))
+        await asyncio.sleep(0)
+        await asyncio.gather(blocker, waiting, scheduler.run("c", "x", asyncio.sleep, 0))
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["sent"] == 3
+    assert stats["queued"] == 0
+
+def test_concurrency_defaults_to_upstream_limit():
+    from upstream import DEFAULT_UPSTREAM_CONCURRENCY
+    assert FairScheduler().concurrency == DEFAULT_UPSTREAM_CONCURRENCY
+
+def test_zero_concurrency_does_not_cap_sends():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=0, weights={})
+        running = []
+
+        async def hold():
+            running.append(scheduler.stats()["in_flight"])
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(scheduler.run(f"sender-{i % 3}", "x", hold) for i in range(50)))
+        return max(running)
+
+    assert asyncio.run(scenario()) == 50
+
+def test_throttled_head_does_not_hold_back_other_senders():
+    async def scenario():
+        scheduler = FairScheduler(recipient_rate=5, recipient_burst=1, weights={})
+        order = []
+        await scheduler.run("a", "busy", send, order, "a", 0)
+        throttled = asyncio.create_task(scheduler.run("a", "busy", send, order, "a", 0))
+        await asyncio.sleep(0)
+        await scheduler.run("b", "idle", send, order, "b", 0)
+        await throttled
+        return order
+
+    assert asyncio.run(scenario()) == ["a", "b", "a"]
+
+def test_cancelled_head_lets_its_sender_continue():
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, weights={})
+        order = []
+        blocker = asyncio.create_task(scheduler.run("a", "x", send, order, "blocker", 0.02))
+        await asyncio.sleep(0)
+        head = asyncio.create_task(scheduler.run("b", "x", send, order, "cancelled"))
+        await asyncio.sleep(0)
+        rest = [asyncio.create_task(scheduler.run("b", "x", send, order, f"b{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        head.cancel()
+        await asyncio.gather(blocker, *rest)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["blocker", "b0", "b1"]
+    assert stats["queued"] == 0 and stats["in_flight"] == 0
+
+def test_picking_the_next_sender_does_not_scan_every_sender():
+    senders = 500
+
+    async def scenario():
+        scheduler = FairScheduler(concurrency=1, sender_rate=1000, weights={})
+        checks = []
+        delay = scheduler._delay
+        scheduler._delay = lambda waiter, now: (checks.append(1), delay(waiter, now))[1]
+        await asyncio.gather(*(scheduler.run(f"sender-{i}", "x", asyncio.sleep, 0) for i in range(senders)))
+        return len(checks), scheduler.stats()
+
+    checks, stats = asyncio.run(scenario())
+    assert stats["sent"] == senders
+    # One bucket check per send, not one per waiting sender per send
+    assert checks <= 2 * senders
@@ -0,0 +1,62 @@
+"""Tests for JSON and MessagePack response negotiation."""
+import asyncio
+
+import httpx
+import msgpack
+import pytest
+
+from fast_json import MSGPACK_MEDIA_TYPE, is_msgpack, prefers_msgpack, render
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("application/json", False),
+    ("*/*", False),
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("application/msgpack, application/json;q=0.5", True),
+    ("application/msgpack;q=0.5, application/json", False),
+    ("application/json, application/msgpack", True),
+    ("application/msgpack;q=0", False),
+])
+def test_prefers_msgpack(accept, expected):
+    assert prefers_msgpack(accept) is expected
+
+def test_is_msgpack():
+    assert is_msgpack("application/msgpack")
+    assert is_msgpack("Application/X-MsgPack; charset=binary")
+    assert not is_msgpack("application/json")
+    assert not is_msgpack(None)
+
+def test_render():
+    content = {"status": "success", "agents": ["agent_1"], 1: "non-string key"}
+    assert msgpack.unpackb(render(content, MSGPACK_MEDIA_TYPE), raw=False, strict_map_key=False) == content
+    assert render({"status": "success", "message": "é"}) == '{"status":"success","message":"é"}'.encode("utf-8")
+
+def send(app, body: bytes, headers: dict):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            return await client.post("/messages/send", content=body, headers=headers)
+
+    return asyncio.run(scenario())
+
+def test_msgpack_request_is_answered_in_msgpack(coral_service):
+    app, fake = coral_service([("agent_1", [])])
+    body = msgpack.packb({"recipient": "agent_1", "content": "hello"})
+    response = send(app, body, {"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content, raw=False)["status"] == "success"
+    assert fake.calls["send_message"] == 1
+
+def test_msgpack_request_without_msgpack_accept_is_answered_in_json(coral_service):
+    app, _ = coral_service([("agent_1", [])])
+    response = send(app, msgpack.packb({"recipient": "agent_1", "content": "hello"}), {"Content-Type": MSGPACK_MEDIA_TYPE})
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.json()["status"] == "success"
+
+def test_invalid_msgpack_request_is_validated_like_json(coral_service):
+    app, fake = coral_service([("agent_1", [])])
+    response = send(app, msgpack.packb({"recipient": "agent_1"}), {"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "content"]
+    assert "send_message" not in fake.calls
@@ -0,0 +1,95 @@
+"""Tests for the cached readiness checks and the /live and /ready probes."""
+import asyncio
+import time
+
+import httpx
+
+from health import HealthChecker, tcp_check
+
+async def up():
+    return {"pool": "ok"}
+
+async def down():
+    raise RuntimeError("connection refused")
+
+async def hangs():
+    await asyncio.sleep(10)
+
+def test_report_is_starting_until_the_first_round():
+    checker = HealthChecker()
+    checker.add("coral_server", up)
+    assert not checker.ready
+    assert checker.report()["status"] == "starting"
+
+def test_critical_failures_make_the_service_not_ready():
+    checker = HealthChecker(timeout=0.05)
+    checker.add("coral_server", up)
+    checker.add("message_queue", hangs)
+    checker.add("postgres", down, critical=False)
+    asyncio.run(checker.check_now())
+    report = checker.report()
+    assert not checker.ready and report["status"] == "not_ready"
+    dependencies = report["dependencies"]
+    assert (dependencies["coral_server"]["status"], dependencies["coral_server"]["details"]) == ("up", {"pool": "ok"})
+    assert (dependencies["message_queue"]["status"], dependencies["message_queue"]["error"]) == ("down", "Timed out after 0.05s")
+    assert (dependencies["postgres"]["status"], dependencies["postgres"]["error"]) == ("down", "connection refused")
+
+def test_non_critical_failures_do_not_affect_readiness():
+    checker = HealthChecker()
+    checker.add("coral_server", up)
+    checker.add("postgres", down, critical=False)
+    asyncio.run(checker.check_now())
+    assert checker.ready and checker.report()["status"] == "ready"
+
+def test_old_results_are_reported_stale():
+    checker = HealthChecker(interval=1, timeout=1)
+    checker.add("coral_server", up)
+    asyncio.run(checker.check_now())
+    checker._checked_at = time.time() - 5
+    assert not checker.ready
+    assert checker.report()["status"] == "stale"
+
+def test_tcp_check_connects_to_a_listening_port():
+    async def scenario():
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        await tcp_check("127.0.0.1", port)()
+        server.close()
+        await server.wait_closed()
+        try:
+            await tcp_check("127.0.0.1", port)()
+        except OSError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+
+def test_probes(coral_service, monkeypatch):
+    app, _ = coral_service()
+    checker = HealthChecker()
+    monkeypatch.setattr(app, "health", checker)
+    healthy = {"coral_server": True}
+
+    async def coral_server():
+        if not healthy["coral_server"]:
+            raise RuntimeError("unreachable")
+
+    checker.add("coral_server", coral_server)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            responses = [await client.get("/live"), await client.get("/ready")]
+            await checker.check_now()
+            responses.append(await client.get("/ready"))
+            healthy["coral_server"] = False
+            await checker.check_now()
+            responses += [await client.get("/ready"), await client.get("/live")]
+            return responses
+
+    first_live, starting, ready, not_ready, live = asyncio.run(scenario())
+    assert (starting.status_code, starting.json()["status"]) == (503, "starting")
+    assert (ready.status_code, ready.json()["status"]) == (200, "ready")
+    assert (not_ready.status_code, not_ready.json()["status"]) == (503, "not_ready")
+    assert not_ready.json()["dependencies"]["coral_server"]["error"] == "unreachable"
+    # Liveness doesn't depend on the checks
+    assert first_live.status_code == live.status_code == 200 and live.json() == {"status": "ok"}
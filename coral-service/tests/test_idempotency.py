@@ -0,0 +1,224 @@
+"""Tests for idempotency keys."""
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyError, IdempotencyStore, fingerprint
+
+class FakeBackend:
+    """In-memory stand-in for the registry's idempotency table."""
+
+    available = True
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = []
+
+    async def claim_request(self, key, request_fingerprint, lease):
+        self.calls.append(("claim", key, lease))
+        if key in self.rows:
+            return False, self.rows[key]
+        self.rows[key] = {"fingerprint": request_fingerprint, "status_code": None, "body": None}
+        return True, None
+
+    async def complete_request(self, key, status_code, body, ttl):
+        self.calls.append(("complete", key, ttl))
+        self.rows[key].update(status_code=status_code, body=body)
+
+    async def release_request(self, key):
+        self.calls.append(("release", key))
+        del self.rows[key]
+
+def counting_call(calls: list, status_code: int = 200, fail: bool = False):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("upstream failed")
+        return status_code, {"status": "success", "call": len(calls)}
+    return call
+
+def test_repeated_key_replays_the_response():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        first = await store.run("key", "send", {"content": "hi"}, counting_call(calls))
+        second = await store.run("key", "send", {"content": "hi"}, counting_call(calls))
+        return first, second, calls, store.stats()
+
+    first, second, calls, stats = asyncio.run(scenario())
+    assert first == (200, {"status": "success", "call": 1}, False)
+    assert second == (200, {"status": "success", "call": 1}, True)
+    assert len(calls) == 1
+    assert (stats["executed"], stats["replayed"]) == (1, 1)
+
+def test_keys_of_different_endpoints_do_not_collide():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        await store.run("key", "send", {"content": "hi"}, counting_call(calls))
+        _, _, replayed = await store.run("key", "thread", {"content": "hi"}, counting_call(calls))
+        return replayed, calls
+
+    replayed, calls = asyncio.run(scenario())
+    assert not replayed
+    assert len(calls) == 2
+
+def test_key_reused_for_another_request_is_rejected():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        await store.run("key", "send", {"content": "hi"}, counting_call(calls))
+        await store.run("key", "send", {"content": "bye"}, counting_call(calls))
+
+    with pytest.raises(IdempotencyError) as e:
+        asyncio.run(scenario())
+    assert e.value.status_code == 422
+
+@pytest.mark.parametrize("key", ["", "k" * 256])
+def test_invalid_key_is_rejected(key):
+    async def scenario():
+        await IdempotencyStore().run(key, "send", {}, counting_call([]))
+
+    with pytest.raises(IdempotencyError) as e:
+        asyncio.run(scenario())
+    assert e.value.status_code == 400
+
+def test_failed_request_releases_its_key():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        with pytest.raises(RuntimeError):
+            await store.run("key", "send", {"content": "hi"}, counting_call(calls, fail=True))
+        return await store.run("key", "send", {"content": "hi"}, counting_call(calls)), calls
+
+    (status_code, body, replayed), calls = asyncio.run(scenario())
+    assert (status_code, replayed) == (200, False)
+    assert len(calls) == 2
+
+def test_concurrent_repeats_wait_for_the_first_request():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        return await asyncio.gather(*(store.run("key", "send", {"content": "hi"}, counting_call(calls)) for _ in range(5))), calls
+
+    results, calls = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [replayed for _, _, replayed in results].count(False) == 1
+    assert {body["call"] for _, body, _ in results} == {1}
+
+def test_concurrent_repeats_run_again_after_a_failure():
+    async def scenario():
+        store, calls = IdempotencyStore(), []
+        first = asyncio.create_task(store.run("key", "send", {}, counting_call(calls, fail=True)))
+        await asyncio.sleep(0)
+        repeat = asyncio.create_task(store.run("key", "send", {}, counting_call(calls)))
+        with pytest.raises(RuntimeError):
+            await first
+        return await repeat, calls
+
+    (status_code, _, replayed), calls = asyncio.run(scenario())
+    assert (status_code, replayed) == (200, False)
+    assert len(calls) == 2
+
+def test_store_never_holds_more_than_max_keys():
+    async def scenario():
+        store, calls, sizes = IdempotencyStore(max_keys=2), [], []
+        for key in ("a", "b", "c", "a"):
+            await store.run(key, "send", {"content": "hi"}, counting_call(calls))
+            sizes.append(store.stats()["keys"])
+        return sizes, calls
+
+    sizes, calls = asyncio.run(scenario())
+    assert sizes == [1, 2, 2, 2]
+    # "a" was the least recently used key when "c" arrived, so it runs again
+    assert len(calls) == 4
+
+def test_keys_in_progress_are_skipped_not_evicted():
+    async def scenario():
+        store, calls, release = IdempotencyStore(max_keys=2), [], asyncio.Event()
+
+        async def slow_call():
+            await release.wait()
+            return 200, {"status": "success", "call": "slow"}
+
+        first = asyncio.ensure_future(store.run("a", "send", {"content": "hi"}, slow_call))
+        await asyncio.sleep(0)
+        await store.run("b", "send", {"content": "hi"}, counting_call(calls))
+        await store.run("c", "send", {"content": "hi"}, counting_call(calls))
+        keys = store.stats()["keys"]
+        release.set()
+        repeat = await store.run("a", "send", {"content": "hi"}, counting_call(calls))
+        return keys, await first, repeat, calls
+
+    keys, first, repeat, calls = asyncio.run(scenario())
+    assert keys == 2
+    assert repeat == (200, first[1], True)
+    assert len(calls) == 2
+
+def test_backend_claims_with_lease_and_stores_with_ttl():
+    async def scenario():
+        backend = FakeBackend()
+        store = IdempotencyStore(ttl=3600, lease=30, backend=backend)
+        await store.run("key", "send", {"content": "hi"}, counting_call([]))
+        return backend
+
+    backend = asyncio.run(scenario())
+    assert backend.calls == [("claim", "send:key", 30), ("complete", "send:key", 3600)]
+    assert backend.rows["send:key"]["status_code"] == 200
+
+def test_backend_replays_response_stored_by_another_process():
+    async def scenario():
+        backend, calls = FakeBackend(), []
+        backend.rows["send:key"] = {"fingerprint": fingerprint({"content": "hi"}), "status_code": 202, "body": {"status": "queued"}}
+        return await IdempotencyStore(backend=backend).run("key", "send", {"content": "hi"}, counting_call(calls)), calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == (202, {"status": "queued"}, True)
+    assert calls == []
+
+def test_backend_rejects_key_in_progress_elsewhere():
+    async def scenario():
+        backend = FakeBackend()
+        backend.rows["send:key"] = {"fingerprint": fingerprint({"content": "hi"}), "status_code": None, "body": None}
+        store = IdempotencyStore(backend=backend)
+        try:
+            await store.run("key", "send", {"content": "hi"}, counting_call([]))
+        finally:
+            # The rejected key is not kept in memory, so a later retry asks the backend again
+            assert store.stats()["keys"] == 0
+
+    with pytest.raises(IdempotencyError) as e:
+        asyncio.run(scenario())
+    assert e.value.status_code == 409
+    assert e.value.retry_after is not None
+
+def test_backend_key_is_released_on_failure():
+    async def scenario():
+        backend = FakeBackend()
+        with pytest.raises(RuntimeError):
+            await IdempotencyStore(backend=backend).run("key", "send", {}, counting_call([], fail=True))
+        return backend
+
+    backend = asyncio.run(scenario())
+    assert backend.calls[-1] == ("release", "send:key")
+    assert backend.rows == {}
+
+def test_send_endpoint_replays_and_rejects_reused_keys(monkeypatch, tmp_path):
+    monkeypatch.setenv("CORAL_QUEUE_DB_PATH", str(tmp_path / "queue.db"))
+    import httpx
+
+    import app
+    import fake_coral
+
+    fake = fake_coral.install(app, agents=[fake_coral.Agent("agent_1")])
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            send = lambda content: client.post(
+                "/messages/send", json={"recipient": "agent_1", "content": content}, headers={"Idempotency-Key": "send-replay-test"}
+            )
+            return await send("hello"), await send("hello"), await send("goodbye")
+
+    first, replay, conflict = asyncio.run(scenario())
+    assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers
+    assert replay.status_code == 200 and replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+    assert conflict.status_code == 422
+    assert conflict.json()["reason"] == "idempotency_key"
+    assert fake.calls["send_message"] == 1
@@ -0,0 +1,147 @@
+"""Tests for the durable outbound message queue."""
+import asyncio
+import time
+
+import pytest
+
+from message_queue import MessageQueue
+from resilience import UpstreamUnavailable
+
+async def wait_for_status(queue: MessageQueue, message_id: str, status: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        message = await queue.get(message_id)
+        if message is not None and message["status"] == status:
+            return message
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Message {message_id} did not reach status {status}: {await queue.get(message_id)}")
+
+def new_queue(tmp_path, **kwargs) -> MessageQueue:
+    kwargs.setdefault("poll_interval", 0.02)
+    kwargs.setdefault("base_delay", 0.01)
+    kwargs.setdefault("max_delay", 0.02)
+    return MessageQueue(path=str(tmp_path / "queue.db"), **kwargs)
+
+def test_not_ready_delivery_is_retried_without_using_an_attempt(tmp_path):
+    async def scenario():
+        queue = new_queue(tmp_path, max_attempts=1)
+        calls = []
+
+        async def deliver(recipient, content, thread_id, sender):
+            calls.append(recipient)
+            if len(calls) < 3:
+                raise UpstreamUnavailable("Coral Protocol Client not initialized", "not_ready", 0.01)
+
+        await queue.start(deliver)
+        try:
+            message_id = await queue.enqueue("agent_1", "hello")
+            message = await wait_for_status(queue, message_id, "delivered")
+            assert message["attempts"] == 1
+            assert len(calls) == 3
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_deliver_message_waits_for_the_client(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "coral_client", None)
+    with pytest.raises(UpstreamUnavailable) as e:
+        asyncio.run(app.deliver_message("agent_1", "hello"))
+    assert e.value.reason == "not_ready"
+
+def test_lease_is_renewed_while_delivery_runs(tmp_path):
+    async def scenario():
+        first, second = new_queue(tmp_path, lease=0.3), new_queue(tmp_path, lease=0.3)
+        calls = []
+
+        async def deliver(recipient, content, thread_id, sender):
+            calls.append(recipient)
+            await asyncio.sleep(1.0)
+
+        await first.start(deliver)
+        try:
+            message_id = await first.enqueue("agent_1", "slow")
+            while not calls:
+                await asyncio.sleep(0.01)
+            # Another process polls the same database while the delivery outlives the lease
+            await second.start(deliver)
+            await wait_for_status(first, message_id, "delivered")
+            assert calls == ["agent_1"]
+        finally:
+            await first.stop()
+            await second.stop()
+
+    asyncio.run(scenario())
+
+def test_expired_lease_of_crashed_process_is_reclaimed(tmp_path):
+    async def scenario():
+        # Leave a message claimed, as a process that died mid-delivery would
+        crashed = new_queue(tmp_path)
+        crashed._connect()
+        now = time.time()
+        crashed._execute(
+            "INSERT INTO outbound_messages (id, recipient, content, status, next_attempt_at, created_at, claimed_until) "
+            "VALUES ('m1', 'agent_1', 'hello', 'sending', ?, ?, ?)",
+            (now, now, now - 1)
+        )
+        crashed._conn.close()
+
+        delivered = []
+
+        async def deliver(recipient, content, thread_id, sender):
+            delivered.append(content)
+
+        queue = new_queue(tmp_path)
+        await queue.start(deliver)
+        try:
+            await wait_for_status(queue, "m1", "delivered")
+            assert delivered == ["hello"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_messages_to_one_recipient_are_delivered_in_order(tmp_path):
+    async def scenario():
+        queue = new_queue(tmp_path, workers=4)
+        delivered = []
+        failed_once = set()
+
+        async def deliver(recipient, content, thread_id, sender):
+            if content == "1" and content not in failed_once:
+                failed_once.add(content)
+                raise RuntimeError("upstream failed")
+            delivered.append(content)
+
+        await queue.start(deliver)
+        try:
+            ids = [await queue.enqueue("agent_1", str(i)) for i in range(4)]
+            await wait_for_status(queue, ids[-1], "delivered")
+            assert delivered == ["0", "1", "2", "3"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+def test_dead_letter_keeps_sender(tmp_path):
+    async def scenario():
+        queue = new_queue(tmp_path, max_attempts=2)
+
+        async def deliver(recipient, content, thread_id, sender):
+            raise RuntimeError("upstream failed")
+
+        await queue.start(deliver)
+        try:
+            message_id = await queue.enqueue("agent_1", "hello", "thread_1", sender="agent_0")
+            message = await wait_for_status(queue, message_id, "dead_letter")
+            assert message["attempts"] == 2
+            assert message["last_error"] == "upstream failed"
+            row = queue._execute("SELECT sender, thread_id FROM dead_letter_messages WHERE id = ?", (message_id,))[0]
+            assert (row["sender"], row["thread_id"]) == ("agent_0", "thread_1")
+            assert (await queue.stats())["dead_letter"] == 1
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,102 @@
+"""Tests for the /messages/stream fan-out hub."""
+import asyncio
+import json
+import threading
+
+from message_stream import MessageHub
+
+def drain(subscription) -> list:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+def test_subscribers_get_only_matching_messages():
+    async def scenario():
+        hub = MessageHub()
+        everyone = hub.subscribe()
+        agent_1 = hub.subscribe(agent="agent_1")
+        thread_a = hub.subscribe(thread_id="a")
+        hub.publish({"recipient": "agent_1", "thread_id": "a", "content": "1"})
+        hub.publish({"recipients": ["agent_2", "agent_1"], "threadId": "b", "content": "2"})
+        hub.publish({"to": "agent_2", "thread_id": "a", "content": "3"})
+        return [[event["message"]["content"] for event in drain(s)] for s in (everyone, agent_1, thread_a)]
+
+    assert asyncio.run(scenario()) == [["1", "2", "3"], ["1", "2"], ["1", "3"]]
+
+def test_last_event_id_replays_buffered_events():
+    async def scenario():
+        hub = MessageHub(buffer_size=3)
+        for i in range(5):
+            hub.publish({"recipient": "agent_1" if i % 2 else "agent_2", "content": str(i)})
+        resumed = hub.subscribe(agent="agent_1", last_event_id=2)
+        # Only the last three events are buffered; ids 1 and 2 are gone anyway
+        evicted = hub.subscribe(last_event_id=0)
+        return drain(resumed), drain(evicted)
+
+    resumed, evicted = asyncio.run(scenario())
+    assert [event["id"] for event in resumed] == [4]
+    assert [event["id"] for event in evicted] == [3, 4, 5]
+
+def test_slow_subscriber_drops_its_oldest_events():
+    async def scenario():
+        hub = MessageHub(queue_size=2)
+        slow = hub.subscribe()
+        for i in range(5):
+            hub.publish({"content": str(i)})
+        events = drain(slow)
+        stats = hub.stats()
+        hub.unsubscribe(slow)
+        return events, stats, hub.stats()
+
+    events, stats, after = asyncio.run(scenario())
+    assert [event["message"]["content"] for event in events] == ["3", "4"]
+    assert (stats["subscribers"], stats["events_received"], stats["events_dropped"], stats["last_event_id"]) == (1, 5, 3, 5)
+    assert (after["subscribers"], after["events_dropped"]) == (0, 3)
+
+def test_sse_renders_events_and_keep_alives_until_disconnect():
+    async def scenario():
+        hub = MessageHub(keepalive=0.01, reconnect_delay=2)
+        subscription = hub.subscribe()
+        hub.publish({"recipient": "agent_1", "content": "hello"})
+        polls = []
+
+        async def is_disconnected():
+            polls.append(1)
+            return len(polls) > 3
+
+        chunks = [chunk async for chunk in hub.sse(subscription, is_disconnected)]
+        return chunks, hub.stats()["subscribers"]
+
+    chunks, subscribers = asyncio.run(scenario())
+    assert chunks[0] == "retry: 2000\n\n"
+    assert chunks[1] == f"id: 1\nevent: message\ndata: {json.dumps({'recipient': 'agent_1', 'content': 'hello'})}\n\n"
+    assert chunks[2:] == [": keep-alive\n\n", ": keep-alive\n\n"]
+    assert subscribers == 0
+
+def test_reader_reconnects_after_the_upstream_fails():
+    connections, finished = [], threading.Event()
+
+    def source():
+        connections.append(1)
+        yield {"content": f"connection {len(connections)}"}
+        if len(connections) == 1:
+            raise ConnectionError("upstream went away")
+        # The second connection stays open, idle, until the test is done
+        finished.wait(5)
+
+    async def scenario():
+        hub = MessageHub(source=source, queue_size=10, reconnect_delay=0.01)
+        subscription = hub.subscribe()
+        try:
+            first = await asyncio.wait_for(subscription.queue.get(), 2)
+            second = await asyncio.wait_for(subscription.queue.get(), 2)
+            return first, second, hub.stats()
+        finally:
+            hub.stop()
+            finished.set()
+
+    first, second, stats = asyncio.run(scenario())
+    assert first["message"] == {"content": "connection 1"}
+    assert second["message"] == {"content": "connection 2"}
+    assert stats["upstream_reconnects"] == 1
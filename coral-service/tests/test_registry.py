@@ -0,0 +1,111 @@
+"""Tests for the Postgres idempotency key claims, against a throwaway server."""
+import asyncio
+import shutil
+import tempfile
+
+import pytest
+
+pgserver = pytest.importorskip("pgserver")
+pytest.importorskip("asyncpg")
+
+from idempotency import IdempotencyError, IdempotencyStore, fingerprint
+from registry import Registry
+
+@pytest.fixture(scope="module")
+def postgres_dsn():
+    """URI of a Postgres server running for this module, in a short path so its socket fits the path limit."""
+    directory = tempfile.mkdtemp(prefix="coral-pg-")
+    server = pgserver.get_server(directory, cleanup_mode="stop")
+    yield server.get_uri()
+    server.cleanup()
+    shutil.rmtree(directory, ignore_errors=True)
+
+def with_registry(dsn, scenario):
+    """Run scenario(registry) with an empty idempotency table."""
+    async def run():
+        registry = Registry(dsn=dsn, min_size=1, max_size=4)
+        await registry.start()
+        try:
+            await registry._pool.execute("TRUNCATE coral_idempotency_keys")
+            return await scenario(registry)
+        finally:
+            await registry.stop()
+
+    return asyncio.run(run())
+
+def test_claim_complete_and_replay(postgres_dsn):
+    async def scenario(registry):
+        claimed = await registry.claim_request("send:key", "f1", 30)
+        in_progress = await registry.claim_request("send:key", "f1", 30)
+        await registry.complete_request("send:key", 200, {"status": "success"}, 3600)
+        done = await registry.claim_request("send:key", "f2", 30)
+        return claimed, in_progress, done
+
+    claimed, in_progress, done = with_registry(postgres_dsn, scenario)
+    assert claimed == (True, None)
+    assert in_progress == (False, {"fingerprint": "f1", "status_code": None, "body": None})
+    assert done == (False, {"fingerprint": "f1", "status_code": 200, "body": {"status": "success"}})
+
+def test_expired_lease_can_be_claimed_again(postgres_dsn):
+    async def scenario(registry):
+        await registry.claim_request("send:key", "f1", 0.05)
+        await asyncio.sleep(0.1)
+        return await registry.claim_request("send:key", "f2", 30), await registry.claim_request("send:key", "f2", 30)
+
+    taken_over, held = with_registry(postgres_dsn, scenario)
+    assert taken_over == (True, None)
+    assert held[1]["fingerprint"] == "f2"
+
+def test_release_frees_only_keys_in_progress(postgres_dsn):
+    async def scenario(registry):
+        await registry.claim_request("send:failed", "f1", 30)
+        await registry.release_request("send:failed")
+        await registry.claim_request("send:done", "f1", 30)
+        await registry.complete_request("send:done", 200, {"status": "success"}, 3600)
+        await registry.release_request("send:done")
+        return await registry.claim_request("send:failed", "f1", 30), await registry.claim_request("send:done", "f1", 30)
+
+    failed, done = with_registry(postgres_dsn, scenario)
+    assert failed == (True, None)
+    assert done[1]["status_code"] == 200
+
+def test_concurrent_claims_have_one_winner(postgres_dsn):
+    async def scenario(registry):
+        return await asyncio.gather(*(registry.claim_request("send:key", "f1", 30) for _ in range(8)))
+
+    results = with_registry(postgres_dsn, scenario)
+    assert sorted(claimed for claimed, _ in results) == [False] * 7 + [True]
+
+def test_purge_deletes_expired_keys(postgres_dsn):
+    async def scenario(registry):
+        await registry.claim_request("send:expired", "f1", 0.01)
+        await registry.claim_request("send:held", "f1", 30)
+        await asyncio.sleep(0.05)
+        return await registry.purge_requests(), await registry.claim_request("send:held", "f1", 30)
+
+    purged, held = with_registry(postgres_dsn, scenario)
+    assert purged == 1
+    assert held[0] is False
+
+def test_stores_of_different_workers_share_keys(postgres_dsn):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return 200, {"status": "success", "message": "sent"}
+
+    async def scenario(registry):
+        # Each worker process has its own store in front of the shared registry
+        first, second = IdempotencyStore(backend=registry), IdempotencyStore(backend=registry)
+        sent = await first.run("key", "send", {"content": "hi"}, call)
+        replayed = await second.run("key", "send", {"content": "hi"}, call)
+        await registry.claim_request("send:busy", fingerprint({"content": "hi"}), 30)
+        with pytest.raises(IdempotencyError) as e:
+            await second.run("busy", "send", {"content": "hi"}, call)
+        return sent, replayed, e.value.status_code
+
+    sent, replayed, busy = with_registry(postgres_dsn, scenario)
+    assert sent == (200, {"status": "success", "message": "sent"}, False)
+    assert replayed == (200, {"status": "success", "message": "sent"}, True)
+    assert busy == 409
+    assert len(calls) == 1
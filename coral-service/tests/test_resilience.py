@@ -0,0 +1,189 @@
+"""Tests for the circuit breaker, its use by the upstream execution layer and the 503s it causes."""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, UpstreamUnavailable
+from upstream import UpstreamExecutor
+
+async def op(delay: float = 0.0, fail: bool = False):
+    await asyncio.sleep(delay)
+    if fail:
+        raise RuntimeError("upstream failed")
+    return "ok"
+
+async def other(delay: float = 0.0):
+    await asyncio.sleep(delay)
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("op", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(UpstreamUnavailable) as e:
+        breaker.before_call()
+    assert e.value.reason == "circuit_open"
+    assert 0 < e.value.retry_after <= 30
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("op", failure_threshold=2, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("op", failure_threshold=1, recovery_timeout=0, half_open_max_calls=1)
+    breaker.record_failure()
+    assert breaker.before_call() is not None
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is None
+
+def test_release_probe_frees_slot():
+    breaker = CircuitBreaker("op", failure_threshold=1, recovery_timeout=0, half_open_max_calls=1)
+    breaker.record_failure()
+    probe = breaker.before_call()
+    breaker.release_probe(probe)
+    assert breaker.before_call() is not None
+
+def test_stale_release_does_not_free_newer_probe():
+    breaker = CircuitBreaker("op", failure_threshold=1, recovery_timeout=0, half_open_max_calls=1)
+    breaker.record_failure()
+    stale = breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.release_probe(stale)
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+
+def half_open_executor(**kwargs) -> UpstreamExecutor:
+    executor = UpstreamExecutor(**kwargs)
+    breaker = executor.breaker("op")
+    breaker.failure_threshold = 1
+    breaker.recovery_timeout = 0
+    return executor
+
+def test_cancelled_probe_while_running_releases_slot():
+    async def scenario():
+        executor = half_open_executor()
+        with pytest.raises(RuntimeError):
+            await executor.call(op, fail=True)
+        assert executor.breaker("op").state == OPEN
+
+        probe = asyncio.create_task(executor.call(op, delay=10))
+        await asyncio.sleep(0.01)
+        assert executor.breaker("op").state == HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert await executor.call(op) == "ok"
+        assert executor.breaker("op").state == CLOSED
+
+    asyncio.run(scenario())
+
+def test_cancelled_probe_while_queued_releases_slot():
+    async def scenario():
+        executor = half_open_executor(max_concurrency=1)
+        with pytest.raises(RuntimeError):
+            await executor.call(op, fail=True)
+
+        blocker = asyncio.create_task(executor.call(other, delay=0.05))
+        await asyncio.sleep(0.01)
+        probe = asyncio.create_task(executor.call(op))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        await blocker
+
+        assert await executor.call(op) == "ok"
+        assert executor.breaker("op").state == CLOSED
+
+    asyncio.run(scenario())
+
+def test_sheds_beyond_max_pending():
+    async def scenario():
+        executor = UpstreamExecutor(max_concurrency=1, max_pending=2)
+        running = [asyncio.create_task(executor.call(other, delay=0.05)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(UpstreamUnavailable) as e:
+            await executor.call(other)
+        assert e.value.reason == "overloaded"
+        await asyncio.gather(*running)
+
+    asyncio.run(scenario())
+
+def test_cancelled_thread_call_holds_its_slot_until_the_thread_returns():
+    async def scenario():
+        executor = UpstreamExecutor(max_concurrency=1)
+        release = threading.Event()
+        running = asyncio.create_task(executor.call(release.wait, 5))
+        await asyncio.sleep(0.01)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        # The thread is still running the call, so it still counts against the limit
+        assert executor.stats()["in_flight"] == 1
+        waiting = asyncio.create_task(executor.call(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert executor.stats()["queue_depth"] == 1
+
+        release.set()
+        await waiting
+        stats = executor.stats()
+        executor.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue_depth"], stats["completed"]) == (0, 0, 2)
+
+def post_messages(app, count: int, concurrent: bool = False):
+    """POST `count` messages to /messages/send, one after another or all at once."""
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            requests = [client.post("/messages/send", json={"recipient": "agent_1", "content": f"hello {i}"}) for i in range(count)]
+            if concurrent:
+                return await asyncio.gather(*requests)
+            return [await request for request in requests]
+
+    return asyncio.run(scenario())
+
+def test_open_breaker_answers_with_a_fast_503(coral_service, monkeypatch):
+    app, fake = coral_service([("agent_1", [])], error_rate=1.0)
+    monkeypatch.setattr(app, "upstream", UpstreamExecutor())
+    threshold = app.upstream.breaker("send_message").failure_threshold
+    responses = post_messages(app, threshold + 2)
+    assert [response.status_code for response in responses] == [500] * threshold + [503, 503]
+    assert responses[-1].json()["reason"] == "circuit_open"
+    assert int(responses[-1].headers["Retry-After"]) >= 1
+    # Rejected calls never reach the upstream
+    assert fake.calls["send_message"] == threshold
+    app.upstream.shutdown()
+
+def test_calls_beyond_max_pending_are_shed_with_a_503(coral_service, monkeypatch):
+    app, fake = coral_service([("agent_1", [])], latency=0.2)
+    monkeypatch.setattr(app, "upstream", UpstreamExecutor(max_concurrency=1, max_pending=1, shed_retry_after=2))
+    responses = post_messages(app, 2, concurrent=True)
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    shed, = [response for response in responses if response.status_code == 503]
+    assert (shed.json()["reason"], shed.headers["Retry-After"]) == ("overloaded", "2")
+    assert fake.calls["send_message"] == 1
+    app.upstream.shutdown()
@@ -0,0 +1,121 @@
+"""Tests for single-flight request coalescing."""
+import asyncio
+
+import pytest
+
+from agent_cache import AgentListCache
+from singleflight import SingleFlight
+
+def counting_load(calls: list, result=None, fail: bool = False, delay: float = 0.01):
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("upstream failed")
+        return result if result is not None else len(calls)
+    return load
+
+def test_concurrent_calls_share_one_flight():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        load = counting_load(calls)
+        results = await asyncio.gather(*(flights.do("agents", load) for _ in range(10)))
+        return results, calls, flights.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == [1] * 10
+    assert len(calls) == 1
+    assert (stats["issued"], stats["coalesced"], stats["in_flight"]) == (1, 9, 0)
+    assert stats["coalesced_ratio"] == 0.9
+
+def test_different_keys_do_not_share():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        await asyncio.gather(flights.do("a", counting_load(calls)), flights.do("b", counting_load(calls)))
+        return calls, flights.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert stats["keys"]["a"] == stats["keys"]["b"] == {"issued": 1, "coalesced": 0, "failed": 0}
+
+def test_call_after_the_flight_lands_starts_a_new_one():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        return await flights.do("agents", counting_load(calls)), await flights.do("agents", counting_load(calls))
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+def test_failure_is_shared_and_not_cached():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        failing = counting_load(calls, fail=True)
+        results = await asyncio.gather(*(flights.do("agents", failing) for _ in range(3)), return_exceptions=True)
+        retry = await flights.do("agents", counting_load(calls))
+        return results, retry, calls, flights.stats()
+
+    results, retry, calls, stats = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry == 2
+    assert (stats["issued"], stats["failed"]) == (2, 1)
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        load = counting_load(calls, result="agents", delay=0.05)
+        first = asyncio.create_task(flights.do("agents", load))
+        second = asyncio.create_task(flights.do("agents", load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, calls, flights.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == "agents"
+    assert len(calls) == 1
+    assert stats["failed"] == 0
+
+def test_forget_starts_a_new_flight_for_later_callers():
+    async def scenario():
+        flights, calls = SingleFlight(), []
+        load = counting_load(calls, delay=0.02)
+        before = asyncio.create_task(flights.do("agents", load))
+        await asyncio.sleep(0)
+        flights.forget("agents")
+        after = asyncio.create_task(flights.do("agents", load))
+        return await before, await after
+
+    assert asyncio.run(scenario()) == (2, 2)
+
+def test_agent_cache_misses_share_one_load():
+    async def scenario():
+        cache, calls = AgentListCache(ttl=60, stale_ttl=0), []
+        load = counting_load(calls, result=[{"name": "agent_1", "capabilities": []}])
+        snapshots = await asyncio.gather(*(cache.get(load) for _ in range(5)))
+        return snapshots, calls, cache.stats()
+
+    snapshots, calls, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert len({id(snapshot) for snapshot in snapshots}) == 1
+    assert (stats["misses"], stats["loads"]["coalesced"]) == (5, 4)
+
+def test_agent_cache_invalidation_does_not_join_an_older_load():
+    async def scenario():
+        cache, calls = AgentListCache(ttl=60, stale_ttl=0), []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return [{"name": f"agent_{len(calls)}", "capabilities": []}]
+
+        stale = asyncio.create_task(cache.get(load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        fresh = await cache.get(load)
+        await stale
+        return fresh, (await cache.get(load)), calls
+
+    fresh, cached, calls = asyncio.run(scenario())
+    assert len(calls) == 2
+    # The load started before the invalidation doesn't replace the newer snapshot
+    assert cached is fresh
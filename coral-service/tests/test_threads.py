@@ -0,0 +1,86 @@
+"""Tests for thread creation and the delivery of its initial message."""
+import asyncio
+import time
+
+import httpx
+
+PARTICIPANTS = [f"agent_{i}" for i in range(10)]
+
+def call(app, scenario):
+    """Run scenario(client) against the app."""
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://coral") as client:
+            return await scenario(client)
+
+    return asyncio.run(run())
+
+def create(client, delivery="sync"):
+    return client.post("/threads/create", json={"participants": PARTICIPANTS, "initial_message": "hello", "delivery": delivery})
+
+def test_initial_message_is_delivered_to_participants_concurrently(coral_service):
+    app, fake = coral_service(latency=0.05)
+
+    async def scenario(client):
+        started = time.perf_counter()
+        created = await create(client)
+        elapsed = time.perf_counter() - started
+        delivery = await client.get(f"/threads/{created.json()['thread_id']}/delivery")
+        return created, elapsed, delivery.json()
+
+    created, elapsed, delivery = call(app, scenario)
+    assert created.status_code == 200
+    assert created.json()["delivery"] == "sync"
+    # Nine sends of 50ms each, one after another, would take 450ms
+    assert elapsed < 0.3
+    assert fake.calls["send_message"] == 9
+    assert delivery["complete"]
+    # The first participant is the sender
+    assert sorted(delivery["participants"]) == PARTICIPANTS[1:]
+    assert {status["status"] for status in delivery["participants"].values()} == {"delivered"}
+
+def test_failed_recipients_are_reported_with_the_thread(coral_service, monkeypatch):
+    app, fake = coral_service()
+    send_message = fake.send_message
+
+    def flaky_send(recipient, message, thread_id=None):
+        if recipient == "agent_3":
+            raise RuntimeError("agent_3 is unreachable")
+        return send_message(recipient, message, thread_id)
+
+    monkeypatch.setattr(fake, "send_message", flaky_send)
+
+    async def scenario(client):
+        created = await create(client)
+        delivery = await client.get(f"/threads/{created.json()['thread_id']}/delivery")
+        return created, delivery.json()
+
+    created, delivery = call(app, scenario)
+    assert created.status_code == 207
+    body = created.json()
+    assert (body["status"], body["failed"]) == ("partial", ["agent_3"])
+    assert body["participants"]["agent_3"] == {"status": "failed", "error": "agent_3 is unreachable"}
+    assert delivery["participants"]["agent_4"]["status"] == "delivered"
+
+def test_background_delivery_returns_before_the_sends_finish(coral_service):
+    app, fake = coral_service(latency=0.1)
+
+    async def scenario(client):
+        created = await create(client, delivery="background")
+        thread_id = created.json()["thread_id"]
+        pending = (await client.get(f"/threads/{thread_id}/delivery")).json()
+        await asyncio.gather(*app.background_tasks)
+        done = (await client.get(f"/threads/{thread_id}/delivery")).json()
+        return created, pending, done
+
+    created, pending, done = call(app, scenario)
+    assert created.status_code == 200 and created.json()["delivery"] == "background"
+    assert not pending["complete"]
+    assert done["complete"] and fake.calls["send_message"] == 9
+
+def test_unknown_thread_has_no_delivery_status(coral_service):
+    app, _ = coral_service()
+
+    async def scenario(client):
+        return await client.get("/threads/unknown/delivery")
+
+    assert call(app, scenario).status_code == 404
@@ -0,0 +1,99 @@
+"""Tests for traceparent parsing, span propagation and the ASGI tracing middleware."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from tracing import InMemoryExporter, NOOP_SPAN, SpanContext, Tracer, TracingMiddleware, parse_traceparent
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+@pytest.mark.parametrize("value, expected", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", SpanContext(TRACE_ID, PARENT_ID, True)),
+    (f"00-{TRACE_ID.upper()}-{PARENT_ID}-00", SpanContext(TRACE_ID, PARENT_ID, False)),
+    # Later versions may append fields
+    (f"01-{TRACE_ID}-{PARENT_ID}-03-extra", SpanContext(TRACE_ID, PARENT_ID, True)),
+    (None, None),
+    ("", None),
+    ("garbage", None),
+    (f"00-{TRACE_ID}-{PARENT_ID}-01-extra", None),
+    (f"ff-{TRACE_ID}-{PARENT_ID}-01", None),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{'0' * 16}-01", None),
+])
+def test_parse_traceparent(value, expected):
+    assert parse_traceparent(value) == expected
+
+def test_child_spans_continue_the_callers_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer("coral-service", exporter, sample_rate=0)
+    parent = SpanContext(TRACE_ID, PARENT_ID, True)
+    with tracer.span("POST /messages/send", "server", parent=parent) as server:
+        with tracer.span("send_message", "client") as client:
+            headers = tracer.inject({"Accept": "application/json"})
+    assert (server.trace_id, server.parent_span_id) == (TRACE_ID, PARENT_ID)
+    assert (client.trace_id, client.parent_span_id) == (TRACE_ID, server.span_id)
+    assert headers == {"Accept": "application/json", "traceparent": f"00-{TRACE_ID}-{client.span_id}-01"}
+    assert [span["name"] for span in exporter.spans(TRACE_ID)] == ["send_message", "POST /messages/send"]
+    assert tracer.current_span() is None
+
+def test_unsampled_traces_propagate_without_exporting():
+    exporter = InMemoryExporter()
+    tracer = Tracer("coral-service", exporter, sample_rate=1)
+    with tracer.span("request", "server", parent=SpanContext(TRACE_ID, PARENT_ID, False)) as span:
+        headers = tracer.inject()
+    assert headers["traceparent"] == f"00-{TRACE_ID}-{span.span_id}-00"
+    assert exporter.spans() == []
+
+def test_tracing_off_creates_nothing():
+    tracer = Tracer("coral-service")
+    headers = {"Accept": "application/json"}
+    with tracer.span("request") as span:
+        assert span is NOOP_SPAN
+        assert tracer.inject(headers) is headers
+    assert tracer.inject() is None
+
+def test_failures_are_recorded_on_the_span():
+    exporter = InMemoryExporter()
+    tracer = Tracer("coral-service", exporter, sample_rate=1)
+    with pytest.raises(ValueError):
+        with tracer.span("request"):
+            raise ValueError("bad payload")
+    span, = exporter.spans()
+    assert span["status"] == "error"
+    assert span["attributes"] == {"error.type": "ValueError", "error.message": "bad payload"}
+
+def traced_app(tracer):
+    """App answering with the traceparent it would send upstream."""
+    app = FastAPI()
+
+    @app.get("/threads/{thread_id}", response_class=PlainTextResponse)
+    async def get_thread(thread_id: str):
+        return (tracer.inject() or {}).get("traceparent", "")
+
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    return app
+
+def call(app, headers=None):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://coral") as client:
+            return await client.get("/threads/t1", headers=headers)
+
+    return asyncio.run(scenario())
+
+def test_middleware_continues_an_incoming_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer("coral-service", exporter, sample_rate=0)
+    response = call(traced_app(tracer), {"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    span, = exporter.spans(TRACE_ID)
+    assert (span["parent_span_id"], span["kind"], span["service"]) == (PARENT_ID, "server", "coral-service")
+    assert span["name"] == "GET /threads/{thread_id}"
+    assert span["attributes"]["http.status_code"] == 200
+    assert response.text == f"00-{TRACE_ID}-{span['span_id']}-01"
+
+def test_middleware_without_a_trace_or_exporter_passes_through():
+    response = call(traced_app(Tracer("coral-service")))
+    assert response.status_code == 200 and response.text == ""
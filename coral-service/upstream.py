@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Upstream Execution Layer
+
+This module runs calls to the upstream Coral Protocol client without blocking
+the FastAPI event loop. Coroutine methods (or an `a`-prefixed async variant of
+a method, e.g. `alist_agents`) are awaited directly; synchronous methods run
+in a bounded thread pool with its own concurrency limit and queue metrics.
+
+Every operation has its own circuit breaker, and calls beyond the admission
+limit of running plus waiting calls are shed immediately with
+UpstreamUnavailable rather than queued.
+
+Each call runs in a client span of the current trace, and synchronous calls
+run in the caller's context, so spans they start belong to the same trace.
+"""
+import os
+import time
+import asyncio
+import inspect
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+from resilience import CircuitBreaker, UpstreamUnavailable
+from tracing import tracer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default execution layer settings
+DEFAULT_UPSTREAM_WORKERS = int(os.getenv("CORAL_UPSTREAM_WORKERS", "32"))
+DEFAULT_UPSTREAM_CONCURRENCY = int(os.getenv("CORAL_UPSTREAM_CONCURRENCY", str(DEFAULT_UPSTREAM_WORKERS)))
+DEFAULT_UPSTREAM_MAX_PENDING = int(os.getenv("CORAL_UPSTREAM_MAX_PENDING", str(DEFAULT_UPSTREAM_CONCURRENCY * 4)))
+DEFAULT_SHED_RETRY_AFTER = float(os.getenv("CORAL_SHED_RETRY_AFTER", "1"))
+
+class UpstreamExecutor:
+    """
+    Executes upstream Coral Protocol calls off the event loop.
+
+    At most `max_concurrency` calls run at once; further callers wait in a
+    queue whose depth and wait time are reported by stats(). Once
+    `max_pending` calls are running or waiting, new calls are rejected.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_UPSTREAM_WORKERS,
+        max_concurrency: int = DEFAULT_UPSTREAM_CONCURRENCY,
+        max_pending: int = DEFAULT_UPSTREAM_MAX_PENDING,
+        shed_retry_after: float = DEFAULT_SHED_RETRY_AFTER,
+    ):
+        """
+        Initialize the execution layer.
+
+        Args:
+            max_workers: Number of threads for synchronous upstream calls
+            max_concurrency: Maximum number of upstream calls in flight
+            max_pending: Maximum number of upstream calls running or waiting
+            shed_retry_after: Retry-After seconds suggested for shed calls
+        """
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.shed_retry_after = shed_retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="coral-upstream")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queued = 0
+        self._in_flight = 0
+        self._max_queue_depth = 0
+        self._completed = 0
+        self._failed = 0
+        self._queue_wait_seconds = 0.0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._shed: Dict[str, int] = {}
+
+    @staticmethod
+    def _resolve_async(func: Callable) -> Optional[Callable]:
+        """Return a coroutine function to use instead of `func`, if there is one."""
+        if inspect.iscoroutinefunction(func):
+            return func
+        owner = getattr(func, "__self__", None)
+        name = getattr(func, "__name__", None)
+        if owner is not None and name:
+            async_func = getattr(owner, f"a{name}", None)
+            if async_func is not None and inspect.iscoroutinefunction(async_func):
+                return async_func
+        return None
+
+    def breaker(self, operation: str) -> CircuitBreaker:
+        """Get the circuit breaker of an upstream operation, creating it on first use."""
+        breaker = self._breakers.get(operation)
+        if breaker is None:
+            breaker = self._breakers[operation] = CircuitBreaker(operation)
+        return breaker
+
+    def _admit(self, operation: str, breaker: CircuitBreaker) -> Optional[int]:
+        if self._in_flight + self._queued >= self.max_pending:
+            self._shed[operation] = self._shed.get(operation, 0) + 1
+            metrics.observe_rejected(operation, "overloaded")
+            raise UpstreamUnavailable(
+                f"Upstream is overloaded ({self.max_pending} calls pending)", "overloaded", self.shed_retry_after
+            )
+        try:
+            return breaker.before_call()
+        except UpstreamUnavailable as e:
+            metrics.observe_rejected(operation, e.reason)
+            raise
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run an upstream call without blocking the event loop.
+
+        Args:
+            func: Upstream client method to call
+            *args: Positional arguments for the call
+            **kwargs: Keyword arguments for the call
+
+        Returns:
+            Any: Result of the upstream call
+
+        Raises:
+            UpstreamUnavailable: If the call was shed or its circuit breaker is open
+        """
+        operation = getattr(func, "__name__", "unknown")
+        with tracer.span(f"upstream {operation}", "client") as span:
+            return await self._call(operation, span, func, *args, **kwargs)
+
+    async def _call(self, operation: str, span, func: Callable, *args, **kwargs) -> Any:
+        breaker = self.breaker(operation)
+        probe = self._admit(operation, breaker)
+        self._queued += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            # Cancelled while queued: the call has no outcome for the breaker
+            breaker.release_probe(probe)
+            raise
+        finally:
+            self._queued -= 1
+        started = time.perf_counter()
+        self._queue_wait_seconds += started - queued_at
+        metrics.observe_queue_wait(operation, started - queued_at)
+        span.set_attribute("queue_wait_ms", round((started - queued_at) * 1000, 3))
+
+        self._in_flight += 1
+        async_func = self._resolve_async(func)
+        if async_func is None:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._pool, context.run, functools.partial(func, *args, **kwargs))
+            future.add_done_callback(lambda done: self._finish(operation, breaker, started, done.cancelled() or done.exception() is not None))
+            # Cancelling the caller, e.g. by a client disconnect or a scheduler timeout,
+            # doesn't stop the thread, so the call keeps its slot until the thread returns
+            return await asyncio.shield(future)
+
+        try:
+            result = await async_func(*args, **kwargs)
+        except Exception:
+            self._finish(operation, breaker, started, True)
+            raise
+        except BaseException:
+            # Cancelled while running: the call has no outcome for the breaker
+            breaker.release_probe(probe)
+            self._release(operation, "error", started)
+            raise
+        self._finish(operation, breaker, started, False)
+        return result
+
+    def _finish(self, operation: str, breaker: CircuitBreaker, started: float, failed: bool):
+        """Record the outcome of a call that ran to completion and free its slot."""
+        if failed:
+            self._failed += 1
+            breaker.record_failure()
+        else:
+            self._completed += 1
+            breaker.record_success()
+        self._release(operation, "error" if failed else "success", started)
+
+    def _release(self, operation: str, outcome: str, started: float):
+        metrics.observe_upstream(operation, outcome, time.perf_counter() - started)
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get execution layer metrics.
+
+        Returns:
+            Dict: Concurrency limits, queue depth and call counters
+        """
+        started = self._completed + self._failed + self._in_flight
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "queue_depth": self._queued,
+            "max_queue_depth": self._max_queue_depth,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_queue_wait_ms": round(self._queue_wait_seconds / started * 1000, 3) if started else 0.0,
+            "shed": sum(self._shed.values())
+        }
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """
+        Get circuit breaker states and shed counts.
+
+        Returns:
+            Dict: Admission limit, shed calls per operation and breaker stats per operation
+        """
+        return {
+            "admission": {
+                "max_pending": self.max_pending,
+                "pending": self._in_flight + self._queued,
+                "shed": dict(self._shed)
+            },
+            "breakers": {operation: breaker.stats() for operation, breaker in self._breakers.items()}
+        }
+
+    def shutdown(self):
+        """Stop the thread pool without waiting for running calls."""
+        self._pool.shutdown(wait=False)
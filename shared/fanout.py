@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Bounded Fan-out
+
+This module runs independent awaitables concurrently with a cap on how many
+are in flight at once. coral-service uses it for its batch endpoints and
+thread fan-out, and angus-core's AsyncCoralProtocolClient for send_many() and
+health_check_many(). Both services import it from this directory.
+"""
+import asyncio
+from typing import Any, Awaitable, List
+
+async def gather_bounded(awaitables: List[Awaitable], concurrency: int) -> List[Any]:
+    """
+    Await several awaitables in parallel with at most `concurrency` running at once.
+
+    Args:
+        awaitables: Awaitables to run
+        concurrency: Maximum number running at the same time
+
+    Returns:
+        List: Results in input order; failures are returned as exception instances
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(run(awaitable) for awaitable in awaitables), return_exceptions=True)
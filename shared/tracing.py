@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Distributed Tracing
+
+This module records spans for requests to the Agent Angus Core Service and
+the Coral Protocol Service, for the calls between them and for coral-service's
+upstream calls. Both services import it from this directory. CoralProtocolClient
+sends the current span in a W3C `traceparent` header, and an incoming
+traceparent makes the request's span a child of the caller's span, with the
+same trace ID and sampling decision, so one trace covers both services.
+
+init_app() instruments a Flask app (angus-core) and TracingMiddleware an ASGI
+app (coral-service).
+
+Traces that don't arrive with a decision are sampled at TRACE_SAMPLE_RATE.
+Unsampled spans only carry IDs for propagation and are never exported, so
+tracing costs next to nothing for the requests it skips.
+
+Finished sampled spans go to the exporter named by TRACE_EXPORTER:
+
+    none     nothing is recorded (the default)
+    memory   the most recent spans are kept in memory, for tests and benchmarks
+    file     one JSON object per span is appended to TRACE_FILE
+    log      one JSON object per span is logged
+    pkg.module:Class  any exporter class with export(span) and shutdown()
+"""
+import os
+import re
+import json
+import time
+import random
+import logging
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, Iterator, List, Optional, Union
+
+try:
+    from flask import Flask, g, request
+except ImportError:
+    Flask = g = request = None
+
+try:
+    from starlette.routing import Match, Mount
+except ImportError:
+    Match = Mount = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default tracing settings
+# Without TRACE_SERVICE_NAME, each service names itself with Tracer.set_default_service()
+DEFAULT_TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "")
+DEFAULT_TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").strip()
+DEFAULT_TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+DEFAULT_TRACE_FILE = os.getenv("TRACE_FILE", "data/traces.jsonl")
+DEFAULT_TRACE_MEMORY_MAX_SPANS = int(os.getenv("TRACE_MEMORY_MAX_SPANS", "10000"))
+
+# W3C trace context header
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+
+# Trace and parent span IDs of a span, as received in a traceparent header
+SpanContext = namedtuple("SpanContext", ["trace_id", "span_id", "sampled"])
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Parse a W3C traceparent header.
+
+    Args:
+        value: Header value, e.g. 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01
+
+    Returns:
+        Optional[SpanContext]: The caller's span, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest) or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+class Span:
+    """
+    One timed operation of a trace.
+
+    Unsampled spans keep only their IDs, for propagation; attributes set on
+    them are dropped.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "sampled", "recording",
+                 "attributes", "status", "start_time", "duration", "_started")
+
+    def __init__(self, trace_id: str, span_id: str, parent_span_id: Optional[str], name: str, kind: str, sampled: bool, recording: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.recording = recording
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.start_time = time.time() if recording else 0.0
+        self.duration: Optional[float] = None
+        self._started = time.perf_counter() if recording else 0.0
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value naming this span as the parent."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach a key/value pair to a sampled span."""
+        if self.recording:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        """Mark a sampled span as failed with the given exception."""
+        if self.recording:
+            self.status = "error"
+            self.attributes["error.type"] = type(error).__name__
+            self.attributes["error.message"] = str(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form of a finished span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+# Stand-in span for blocks run while tracing is off; it records nothing
+NOOP_SPAN = Span("0" * 32, "0" * 16, None, "", "internal", False, False)
+
+class SpanExporter(ABC):
+    """Receives finished sampled spans."""
+
+    @abstractmethod
+    def export(self, span: Dict[str, Any]):
+        """Export one finished span, given as Span.to_dict() plus its service name."""
+
+    def shutdown(self):
+        """Flush and release resources."""
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, max_spans: int = DEFAULT_TRACE_MEMORY_MAX_SPANS):
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, span: Dict[str, Any]):
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Exported spans, optionally only those of one trace, oldest first."""
+        return [span for span in list(self._spans) if trace_id is None or span["trace_id"] == trace_id]
+
+    def clear(self):
+        """Forget all exported spans."""
+        self._spans.clear()
+
+class FileExporter(SpanExporter):
+    """Appends spans to a file as JSON lines."""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+class LogExporter(SpanExporter):
+    """Logs spans as JSON."""
+
+    def export(self, span: Dict[str, Any]):
+        logger.info(f"span {json.dumps(span, default=str)}")
+
+def create_exporter(name: str) -> Optional[SpanExporter]:
+    """
+    Create the exporter named by TRACE_EXPORTER.
+
+    Args:
+        name: "none", "memory", "file", "log", or "package.module:Class"
+
+    Returns:
+        Optional[SpanExporter]: The exporter, or None when tracing is off
+    """
+    if not name or name == "none":
+        return None
+    if name == "memory":
+        return InMemoryExporter()
+    if name == "file":
+        return FileExporter()
+    if name == "log":
+        return LogExporter()
+    module_name, _, class_name = name.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)()
+    except Exception as e:
+        logger.error(f"Failed to create trace exporter '{name}', tracing is off: {str(e)}")
+        return None
+
+class Tracer:
+    """
+    Creates spans, tracks the current one per task or thread and hands
+    finished sampled spans to the exporter.
+    """
+
+    def __init__(self, service: str, exporter: Optional[SpanExporter] = None, sample_rate: float = DEFAULT_TRACE_SAMPLE_RATE):
+        """
+        Initialize the tracer.
+
+        Args:
+            service: Service name recorded on every span
+            exporter: Destination of finished spans, None to record nothing
+            sample_rate: Fraction of new traces sampled, from 0 to 1
+        """
+        self.service = service
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._current: ContextVar[Optional[Union[Span, SpanContext]]] = ContextVar("current_span", default=None)
+        self._exported = 0
+        self._export_errors = 0
+
+    def set_default_service(self, service: str):
+        """Name the service recorded on spans, unless TRACE_SERVICE_NAME already named it."""
+        if not self.service:
+            self.service = service
+
+    def active(self) -> bool:
+        """Whether a span started now would be exported or continue a caller's trace."""
+        return self.exporter is not None or self._current.get() is not None
+
+    def current_span(self) -> Optional[Union[Span, SpanContext]]:
+        """The span active in this task or thread, if any."""
+        return self._current.get()
+
+    def activate(self, span: Union[Span, SpanContext]) -> Token:
+        """
+        Make a span current in this task or thread.
+
+        Args:
+            span: Span to make current
+
+        Returns:
+            Token: Token to pass to deactivate() when the span is done
+        """
+        return self._current.set(span)
+
+    def deactivate(self, token: Token):
+        """Restore the span that was current before activate()."""
+        self._current.reset(token)
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Union[Span, SpanContext]] = None,
+        attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        """
+        Start a span without making it current.
+
+        Args:
+            name: Operation name
+            kind: "server", "client" or "internal"
+            parent: Parent span, defaults to the current span; a new trace is started without one
+            attributes: Initial attributes
+
+        Returns:
+            Span: The started span
+        """
+        if parent is None:
+            parent = self._current.get()
+        if parent is not None:
+            trace_id, parent_span_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        span = Span(trace_id, f"{random.getrandbits(64):016x}", parent_span_id, name, kind, sampled,
+                    sampled and self.exporter is not None)
+        if attributes and span.recording:
+            span.attributes.update(attributes)
+        return span
+
+    def end_span(self, span: Span):
+        """Finish a span and export it if it is sampled."""
+        if not span.recording:
+            return
+        span.duration = time.perf_counter() - span._started
+        exported = span.to_dict()
+        exported["service"] = self.service
+        try:
+            self.exporter.export(exported)
+            self._exported += 1
+        except Exception as e:
+            self._export_errors += 1
+            logger.error(f"Failed to export span '{span.name}': {str(e)}")
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Union[Span, SpanContext]] = None,
+        attributes: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Span]:
+        """
+        Run a block in a new current span, recording any exception it raises.
+
+        With no exporter and no trace to continue, the block runs with
+        NOOP_SPAN and nothing is created or made current.
+
+        Args:
+            name: Operation name
+            kind: "server", "client" or "internal"
+            parent: Parent span, defaults to the current span
+            attributes: Initial attributes
+
+        Yields:
+            Span: The span
+        """
+        if parent is None and not self.active():
+            yield NOOP_SPAN
+            return
+        span = self.start_span(name, kind, parent, attributes)
+        token = self.activate(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self.deactivate(token)
+            self.end_span(span)
+
+    def inject(self, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """
+        Add the current span's traceparent to outgoing request headers.
+
+        Args:
+            headers: Headers of the request, left unmodified
+
+        Returns:
+            Optional[Dict]: A copy of the headers with the traceparent, or the
+                headers themselves when there is no current span
+        """
+        span = self._current.get()
+        if span is None:
+            return headers
+        headers = dict(headers or {})
+        headers[TRACEPARENT_HEADER] = f"00-{span.trace_id}-{span.span_id}-{'01' if span.sampled else '00'}"
+        return headers
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get tracing settings and export counters.
+
+        Returns:
+            Dict: Exporter, sample rate and spans exported or failed to export
+        """
+        return {
+            "service": self.service,
+            "exporter": type(self.exporter).__name__ if self.exporter is not None else None,
+            "sample_rate": self.sample_rate,
+            "exported": self._exported,
+            "export_errors": self._export_errors
+        }
+
+    def shutdown(self):
+        """Flush and close the exporter."""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+# This process's tracer
+tracer = Tracer(DEFAULT_TRACE_SERVICE_NAME, create_exporter(DEFAULT_TRACE_EXPORTER), DEFAULT_TRACE_SAMPLE_RATE)
+
+def _before_request():
+    parent = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    if parent is None and tracer.exporter is None:
+        # Nothing to record and no trace to continue
+        return
+    rule = request.url_rule
+    span = tracer.start_span(f"{request.method} {rule.rule if rule is not None else 'unmatched'}", "server", parent)
+    span.set_attribute("http.method", request.method)
+    span.set_attribute("http.target", request.path)
+    g.trace_span = span
+    g.trace_token = tracer.activate(span)
+
+def _after_request(response):
+    span = g.get("trace_span")
+    if span is not None:
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.status = "error"
+    return response
+
+def _teardown_request(exc):
+    span = g.pop("trace_span", None)
+    if span is None:
+        return
+    if exc is not None:
+        span.record_exception(exc)
+    tracer.deactivate(g.pop("trace_token"))
+    tracer.end_span(span)
+
+def init_app(app: Flask, service: str):
+    """
+    Run each request of a Flask app in a server span, continuing the
+    caller's trace when the request carries a traceparent header.
+
+    Args:
+        app: Flask application to instrument
+        service: Service name recorded on spans, unless TRACE_SERVICE_NAME is set
+    """
+    tracer.set_default_service(service)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+class RouteTemplates:
+    """
+    Finds the route template of an ASGI request, such as /threads/{thread_id},
+    without matching it against every route: routes without path parameters
+    are looked up by path, and only the others are matched.
+    """
+
+    def __init__(self):
+        self._router = None
+        self._static: Dict[str, str] = {}
+        self._dynamic: List[Any] = []
+
+    def _load(self, router):
+        self._static, self._dynamic = {}, []
+        for route in router.routes:
+            path = getattr(route, "path", None)
+            if path is None or "{" in path or isinstance(route, Mount):
+                self._dynamic.append(route)
+            else:
+                self._static.setdefault(path, path)
+        self._router = router
+
+    def __call__(self, scope) -> str:
+        """
+        Get the template of the route a request is for.
+
+        Args:
+            scope: ASGI scope of the request
+
+        Returns:
+            str: The route's path template, or "unmatched"
+        """
+        route = scope.get("route")
+        if route is not None:
+            # Set by FastAPI once the router has matched the request
+            return route.path
+        router = scope["app"].router
+        if router is not self._router:
+            self._load(router)
+        template = self._static.get(scope["path"])
+        if template is not None:
+            return template
+        for route in self._dynamic:
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                return route.path
+        return "unmatched"
+
+class TracingMiddleware:
+    """
+    ASGI middleware running each HTTP request in a server span, continuing
+    the caller's trace when the request carries a traceparent header.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+        self._route = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is None and self.tracer.exporter is None:
+            # Nothing to record and no trace to continue
+            await self.app(scope, receive, send)
+            return
+
+        span = self.tracer.start_span("request", "server", parent)
+        if span.recording:
+            # Matching the route is only worth it for spans that are exported
+            span.name = f"{scope['method']} {self._route(scope)}"
+            span.set_attribute("http.method", scope["method"])
+            span.set_attribute("http.target", scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and span.recording:
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = "error"
+            await send(message)
+
+        token = self.tracer.activate(span)
+        try:
+            await self.app(scope, receive, send_wrapper if span.recording else send)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self.tracer.deactivate(token)
+            self.tracer.end_span(span)